@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import hashlib
+import argparse
+from typing import Any, Dict, List, Set
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+asset_trees = ["grp_objects", "single_objects"]
+
+asset_index_file_name = "asset_index.json"
+
+asset_index_version = 1
+
+
+def get_trees_signature(root_dir: str) -> str:
+    # Adding, removing or renaming a file changes the mtime of its parent directory,
+    # so the directory mtimes are enough to tell when the trees have to be indexed again
+    sha = hashlib.sha1()
+    for asset_tree in asset_trees:
+        asset_tree_dir = os.path.join(root_dir, asset_tree)
+        if not os.path.isdir(asset_tree_dir):
+            sha.update(f"{asset_tree}:missing\n".encode())
+            continue
+        for root, dirs, _ in os.walk(asset_tree_dir):
+            dirs.sort()
+            rel_root = os.path.relpath(root, root_dir)
+            sha.update(f"{rel_root}:{os.stat(root).st_mtime_ns}\n".encode())
+    return sha.hexdigest()
+
+
+class AssetIndex:
+    def __init__(self, root_dir: str, signature: str, trees: Dict[str, Dict[str, Any]]):
+        self.root_dir = root_dir
+        self.signature = signature
+        self.trees = trees
+
+        self._entries: Dict[str, Set[str]] = {}
+        self._paths: Dict[str, List[str]] = {}
+        self._stems: Dict[str, List[str]] = {}
+        self._stem_to_ids: Dict[str, Dict[str, List[int]]] = {}
+        self._dir_to_paths: Dict[str, List[str]] = {}
+        self._all_paths: Set[str] = set()
+        self._containing_cache: Dict[str, List[str]] = {}
+        self._contained_cache: Dict[str, List[str]] = {}
+
+        for asset_tree in asset_trees:
+            tree = trees.get(asset_tree, {"exists": False, "entries": [], "files": []})
+            asset_tree_dir = os.path.join(root_dir, asset_tree)
+            self._entries[asset_tree] = set(tree["entries"])
+            self._paths[asset_tree] = []
+            self._stems[asset_tree] = []
+            self._stem_to_ids[asset_tree] = {}
+            for file_id, rel_path in enumerate(tree["files"]):
+                asset_path = os.path.join(asset_tree_dir, rel_path)
+                file_name = os.path.splitext(os.path.basename(rel_path))[0]
+                self._paths[asset_tree].append(asset_path)
+                self._stems[asset_tree].append(file_name)
+                self._stem_to_ids[asset_tree].setdefault(file_name, []).append(file_id)
+                self._all_paths.add(asset_path)
+
+                # Register the file under every ancestor directory, in walk order,
+                # so that a lookup below any directory matches os.walk(directory)
+                asset_dir = os.path.dirname(asset_path)
+                while True:
+                    self._dir_to_paths.setdefault(asset_dir, []).append(asset_path)
+                    if asset_dir == asset_tree_dir:
+                        break
+                    asset_dir = os.path.dirname(asset_dir)
+
+    @classmethod
+    def build(cls, root_dir: str = source_dir) -> "AssetIndex":
+        signature = get_trees_signature(root_dir)
+        trees = {}
+        for asset_tree in asset_trees:
+            asset_tree_dir = os.path.join(root_dir, asset_tree)
+            exists = os.path.isdir(asset_tree_dir)
+            entries = []
+            files = []
+            if exists:
+                entries = os.listdir(asset_tree_dir)
+                for root, dirs, file_names in os.walk(asset_tree_dir):
+                    for file in file_names:
+                        if file.endswith('.stl'):
+                            files.append(os.path.relpath(os.path.join(root, file), asset_tree_dir))
+            trees[asset_tree] = {"exists": exists, "entries": entries, "files": files}
+        return cls(root_dir, signature, trees)
+
+    @classmethod
+    def load(cls, root_dir: str = source_dir, rebuild: bool = False) -> "AssetIndex":
+        asset_index_file_path = os.path.join(root_dir, asset_index_file_name)
+        if not rebuild and os.path.exists(asset_index_file_path):
+            try:
+                with open(asset_index_file_path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            if (data.get("version") == asset_index_version
+                    and data.get("signature") == get_trees_signature(root_dir)):
+                return cls(root_dir, data["signature"], data["trees"])
+
+        print(f"Building asset index in {asset_index_file_path}")
+        asset_index = cls.build(root_dir)
+        asset_index.save(asset_index_file_path)
+        return asset_index
+
+    def save(self, asset_index_file_path: str) -> None:
+        data = {
+            "version": asset_index_version,
+            "signature": self.signature,
+            "trees": self.trees
+        }
+        tmp_asset_index_file_path = f"{asset_index_file_path}.{os.getpid()}.tmp"
+        with open(tmp_asset_index_file_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_asset_index_file_path, asset_index_file_path)
+
+    def has_entry(self, asset_tree: str, name: str) -> bool:
+        # An empty name refers to the tree directory itself, as os.path.join(asset_tree_dir, "") does
+        if name == "":
+            return asset_tree in self.trees and self.trees[asset_tree]["exists"]
+        return name in self._entries[asset_tree]
+
+    def has_file(self, asset_path: str) -> bool:
+        return asset_path in self._all_paths
+
+    def find_containing(self, asset_tree: str, asset_name: str) -> List[str]:
+        # STL files whose name contains asset_name
+        key = f"{asset_tree}/{asset_name}"
+        if key not in self._containing_cache:
+            self._containing_cache[key] = [asset_path for asset_path, file_name in
+                                           zip(self._paths[asset_tree], self._stems[asset_tree])
+                                           if asset_name in file_name]
+        return list(self._containing_cache[key])
+
+    def find_contained(self, asset_tree: str, asset_name: str) -> List[str]:
+        # STL files whose name is contained in asset_name, found by looking up every substring of asset_name
+        key = f"{asset_tree}/{asset_name}"
+        if key not in self._contained_cache:
+            stem_to_ids = self._stem_to_ids[asset_tree]
+            file_ids = set()
+            for start in range(len(asset_name) + 1):
+                for end in range(start, len(asset_name) + 1):
+                    file_ids.update(stem_to_ids.get(asset_name[start:end], []))
+            self._contained_cache[key] = [self._paths[asset_tree][file_id] for file_id in sorted(file_ids)]
+        return list(self._contained_cache[key])
+
+    def find_in_dir(self, asset_dir: str, file_text: str) -> List[str]:
+        # STL files below asset_dir whose name contains file_text, in os.walk order
+        return [asset_path for asset_path in self._dir_to_paths.get(asset_dir, [])
+                if file_text in os.path.splitext(os.path.basename(asset_path))[0]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the index of the extracted assets")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild even if the asset trees did not change")
+    args = parser.parse_args()
+    asset_index = AssetIndex.load(source_dir, rebuild=args.rebuild)
+    for asset_tree in asset_trees:
+        print(f"{asset_tree}: {len(asset_index.trees[asset_tree]['files'])} STL files")
+
+
+if __name__ == "__main__":
+    main()
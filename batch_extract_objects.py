@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+from typing import Dict, List
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def run_shards(python: str, shard_count: int, retries: int, force: bool, log_dir: str,
+               extract_args: List[str]) -> List[int]:
+    # Returns the shards that still failed after the retries, a rerun resumes from the manifest of extract_objects.py
+    os.makedirs(log_dir, exist_ok=True)
+    pending_shards = list(range(shard_count))
+    for attempt in range(retries + 1):
+        processes: Dict[int, subprocess.Popen] = {}
+        for shard_index in pending_shards:
+            command = [python, os.path.join(source_dir, "extract_objects.py"), f"--shard={shard_index}/{shard_count}"]
+            command += extract_args
+            if force and attempt == 0:
+                command.append("--force")
+            log_file = open(os.path.join(log_dir, f"shard_{shard_index}.log"), "a")
+            processes[shard_index] = subprocess.Popen(command, cwd=source_dir, stdout=log_file,
+                                                      stderr=subprocess.STDOUT)
+            log_file.close()
+        pending_shards = []
+        for shard_index, process in processes.items():
+            if process.wait() != 0:
+                pending_shards.append(shard_index)
+        if len(pending_shards) == 0:
+            break
+        print(f"Shards {', '.join(str(shard_index) for shard_index in pending_shards)} failed "
+              f"(attempt {attempt + 1} of {retries + 1})")
+    return pending_shards
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract the objects of the ProcTHOR FBX files with several "
+                                                 "Blender processes")
+    parser.add_argument("--shards", type=int, default=os.cpu_count(), help="Number of Blender processes")
+    parser.add_argument("--python", type=str, default="python3.11", help="Python interpreter that has bpy")
+    parser.add_argument("--retries", type=int, default=1,
+                        help="Number of times a failed shard is started again, it skips what it already extracted")
+    parser.add_argument("--force", action="store_true", help="Extract the FBX files that are in the manifest again")
+    parser.add_argument("--mode", type=str, default="ops", choices=["ops", "data"],
+                        help="Extract with the Blender operators or with the data API, which is faster")
+    parser.add_argument("--out_dir", type=str, default=source_dir,
+                        help="Directory of grp_objects, single_objects and the manifest")
+    parser.add_argument("--log_dir", type=str, default=os.path.join(source_dir, "extract_logs"),
+                        help="Directory of the logs of the shards")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    failed_shards = run_shards(args.python, args.shards, args.retries, args.force, args.log_dir,
+                               [f"--mode={args.mode}", f"--out_dir={args.out_dir}"])
+    print(f"Ran {args.shards} shards in {time.time() - start_time:.2f}s, {len(failed_shards)} failed, "
+          f"logs in {args.log_dir}")
+    if len(failed_shards) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import argparse
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from get_house import parse_houses
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+# Set in every worker process by init_worker, so that the heavy imports and the mesh cache are paid once per worker
+mesh_cache = None
+
+
+def init_worker(mesh_cache_dir: Optional[str], mesh_cache_size: int) -> None:
+    global mesh_cache
+    import procthor_to_scene
+    if mesh_cache_dir is not None:
+        mesh_cache = procthor_to_scene.MeshCache(cache_dir=mesh_cache_dir, max_size=mesh_cache_size)
+
+
+def convert_house(house_number: int, conversion_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    from procthor_to_scene import convert_house as convert
+    house_name = f"house_{house_number}"
+    start_time = time.time()
+    result = {"house": house_number}
+    try:
+        result["output"] = convert(house_name, mesh_cache=mesh_cache, **conversion_kwargs)
+        result["status"] = "success"
+    except Exception as e:
+        result["status"] = "failure"
+        result["error"] = repr(e)
+        result["traceback"] = traceback.format_exc()
+    result["time"] = time.time() - start_time
+    return result
+
+
+def run_pool(house_numbers: List[int], workers: int, mesh_cache_dir: Optional[str], mesh_cache_size: int,
+             conversion_kwargs: Dict[str, Any], results: List[Dict[str, Any]], num_houses: int) -> List[int]:
+    # Converts the houses in one pool and adds their results, returns the houses that were lost because a worker
+    # died (e.g. killed for its memory or a segfault in pxr), which breaks the pool for every house still in it
+    lost_houses = []
+    # Spawned, the parent imported procthor_to_scene and pxr threads must not be forked
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker,
+                             initargs=(mesh_cache_dir, mesh_cache_size)) as executor:
+        futures = {executor.submit(convert_house, house_number, conversion_kwargs): house_number
+                   for house_number in house_numbers}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                lost_houses.append(futures[future])
+                continue
+            except Exception as e:
+                result = {"house": futures[future], "status": "failure", "error": repr(e), "time": 0.0}
+            results.append(result)
+            print(f"house_{result['house']}: {result['status']} in {result['time']:.2f}s "
+                  f"({len(results)}/{num_houses})")
+    return sorted(lost_houses)
+
+
+def run_isolated(house_numbers: List[int], workers: int, mesh_cache_dir: Optional[str], mesh_cache_size: int,
+                 conversion_kwargs: Dict[str, Any], results: List[Dict[str, Any]], num_houses: int) -> List[int]:
+    # Every house in a pool of its own, so that a house that crashes its worker takes no other house down,
+    # returns the houses that crashed
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        lost_houses = executor.map(lambda house_number: run_pool([house_number], 1, mesh_cache_dir, mesh_cache_size,
+                                                                 conversion_kwargs, results, num_houses),
+                                   house_numbers)
+        return sorted(house_number for houses in lost_houses for house_number in houses)
+
+
+def main():
+    from procthor_to_scene import add_conversion_arguments, get_conversion_kwargs
+
+    parser = argparse.ArgumentParser(description="Convert many houses with a process pool")
+    parser.add_argument("--houses", type=str, nargs="+", required=True,
+                        help="House numbers and ranges, e.g. 0-99 105 110,120")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="How often the houses lost with a crashed worker are converted again in a new pool")
+    add_conversion_arguments(parser)
+    parser.add_argument("--summary", type=str, default=os.path.join(source_dir, "batch_summary.json"),
+                        help="Output JSON with the result and time of every house")
+    args = parser.parse_args()
+
+    house_numbers = parse_houses(args.houses)
+    conversion_kwargs = get_conversion_kwargs(args)
+    mesh_cache_dir = None if args.no_mesh_cache else args.mesh_cache_dir
+
+    # Build the asset index once before the workers start, so they don't all build it at the same time
+    from asset_index import AssetIndex
+    AssetIndex.load(source_dir)
+
+    start_time = time.time()
+    results = []
+    try:
+        pending_houses = house_numbers
+        isolated = False
+        for attempt in range(args.retries + 1):
+            # The last retry finds the houses that crash their worker
+            isolated = 0 < attempt == args.retries
+            if attempt > 0:
+                print(f"A worker crashed, converting the {len(pending_houses)} houses it took down "
+                      f"{'each in a pool of its own' if isolated else 'in a new pool'}")
+            run = run_isolated if isolated else run_pool
+            pending_houses = run(pending_houses, args.workers, mesh_cache_dir, args.mesh_cache_size * 1024 ** 2,
+                                 conversion_kwargs, results, len(house_numbers))
+            if len(pending_houses) == 0:
+                break
+        if isolated:
+            results += [{"house": house_number, "status": "failure", "error": "Crashed its worker", "time": 0.0}
+                        for house_number in pending_houses]
+        else:
+            # Which of them crashed the worker is not known, any of them may never have run
+            results += [{"house": house_number, "status": "not_converted", "error": "Lost with a crashed worker",
+                         "time": 0.0} for house_number in pending_houses]
+    finally:
+        write_summary(args.summary, args.workers, house_numbers, results, time.time() - start_time)
+
+
+def write_summary(summary_file_path: str, workers: int, house_numbers: List[int], results: List[Dict[str, Any]],
+                  total_time: float) -> None:
+    # Houses without a result were not converted, because the batch was interrupted
+    done_houses = {result["house"] for result in results}
+    results = results + [{"house": house_number, "status": "not_converted", "error": "Interrupted", "time": 0.0}
+                         for house_number in house_numbers if house_number not in done_houses]
+    results.sort(key=lambda result: result["house"])
+    successes = [result["house"] for result in results if result["status"] == "success"]
+    failures = [result["house"] for result in results if result["status"] == "failure"]
+    not_converted = [result["house"] for result in results if result["status"] == "not_converted"]
+    summary = {
+        "workers": workers,
+        "total_time": total_time,
+        "successes": successes,
+        "failures": failures,
+        "not_converted": not_converted,
+        "houses": results
+    }
+    with open(summary_file_path, "w") as f:
+        json.dump(summary, f, indent=4)
+    print(f"Converted {len(successes)} houses, {len(failures)} failed, {len(not_converted)} not converted "
+          f"in {summary['total_time']:.2f}s, summary written to {summary_file_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from typing import Any, Dict, List, Optional
+
+from clean_up_usd import clean_up_modes
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def run_clean_up(in_usd: str, out_usd: str, mode: str) -> Dict[str, Any]:
+    # Every mode runs in its own process, so that its peak memory is not hidden by the one that ran before
+    start_time = time.time()
+    process = subprocess.Popen([sys.executable, os.path.join(source_dir, "clean_up_usd.py"),
+                                f"--in_usd={in_usd}", f"--out_usd={out_usd}", f"--mode={mode}"],
+                               stdout=subprocess.DEVNULL)
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise RuntimeError(f"Clean up of {in_usd} in {mode} mode failed with exit code {process.returncode}")
+    return {"time": time.time() - start_time, "peak_memory": rusage.ru_maxrss / 1024}
+
+
+def make_synthetic_flatten_usd(out_dir: str, num_prims: int, in_TBox_usd: Optional[str] = None) -> str:
+    # Tagged with the synthetic TBox of the house or with in_TBox_usd, e.g. the shipped ontology
+    from benchmark_usd_authoring import make_synthetic_house
+    from post_process_usd import post_process
+    house = make_synthetic_house(out_dir, num_prims)
+    if in_TBox_usd is not None:
+        house["TBox"] = os.path.abspath(in_TBox_usd)
+    flatten_raw_usd = os.path.join(out_dir, "house_flatten_raw.usda")
+    with contextlib.redirect_stdout(io.StringIO()):
+        post_process(house["ABox"], house["TBox"], out_flatten_raw_usd=flatten_raw_usd)
+    return flatten_raw_usd
+
+
+def benchmark(in_usd: str, tmp_dir: str) -> Dict[str, Any]:
+    result = {"usd": in_usd}
+    outputs = []
+    for mode in clean_up_modes:
+        out_usd = os.path.join(tmp_dir, f"{mode}{os.path.splitext(in_usd)[1]}")
+        result[mode] = run_clean_up(in_usd, out_usd, mode)
+        with open(out_usd, "rb") as f:
+            outputs.append(f.read())
+    result["same_output"] = all(output == outputs[0] for output in outputs)
+    print(f"{in_usd}: " + ", ".join(f"{mode} {result[mode]['time']:.2f}s {result[mode]['peak_memory']:.1f} MB"
+                                     for mode in clean_up_modes) + f", same output: {result['same_output']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the time and the peak memory of the clean up modes")
+    parser.add_argument("--in_usd", type=str, nargs="*", default=[], help="Flattened USD files to clean up")
+    parser.add_argument("--prims", type=int, nargs="*", default=[],
+                        help="Numbers of Xforms of synthetic houses to clean up")
+    parser.add_argument("--in_TBox_usd", type=str, required=False,
+                        help="TBox to tag the synthetic houses with, e.g. ontology/SOMA_DFL_module.usda, "
+                             "a synthetic one by default")
+    parser.add_argument("--out", type=str, default=os.path.join(source_dir, "benchmark_clean_up.json"),
+                        help="Output JSON with the results")
+    args = parser.parse_args()
+    if len(args.in_usd) == 0 and len(args.prims) == 0:
+        parser.error("Nothing to benchmark, give --in_usd or --prims")
+
+    results: List[Dict[str, Any]] = []
+    tmp_dir = tempfile.mkdtemp(prefix="clean_up_")
+    try:
+        for in_usd in args.in_usd:
+            results.append(benchmark(in_usd, tmp_dir))
+        for num_prims in args.prims:
+            house_dir = os.path.join(tmp_dir, f"house_{num_prims}")
+            os.makedirs(house_dir)
+            result = benchmark(make_synthetic_flatten_usd(house_dir, num_prims, args.in_TBox_usd), tmp_dir)
+            result["prims"] = num_prims
+            results.append(result)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
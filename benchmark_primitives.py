@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Any, Dict, Optional
+from multiverse_parser import Configuration, MjcfExporter
+
+from procthor_to_scene import ProcthorImporter, run_exporter
+from get_house import parse_houses
+from benchmark_usd_formats import measure_load
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+# The settings of ProcthorImporter that are compared, everything else keeps its default
+variants = {
+    "mesh": {"wall_geom": "mesh", "box_assets": False},
+    "box": {"wall_geom": "box", "box_assets": True}
+}
+
+
+def count_files(out_dir: str) -> Dict[str, int]:
+    num_files = 0
+    num_bytes = 0
+    for root, _, files in os.walk(out_dir):
+        for file in files:
+            num_files += 1
+            num_bytes += os.path.getsize(os.path.join(root, file))
+    return {"files": num_files, "bytes": num_bytes}
+
+
+def measure_mujoco(mjcf_file_path: str, steps: int, repeats: int) -> Optional[Dict[str, float]]:
+    # MuJoCo is only needed for this measurement, the houses are converted without it
+    try:
+        import mujoco
+    except ImportError:
+        return None
+    load_times = []
+    for _ in range(repeats):
+        start_time = time.time()
+        model = mujoco.MjModel.from_xml_path(mjcf_file_path)
+        load_times.append(time.time() - start_time)
+    data = mujoco.MjData(model)
+    start_time = time.time()
+    for _ in range(steps):
+        mujoco.mj_step(model, data)
+    return {
+        "load_time": min(load_times),
+        "step_time": (time.time() - start_time) / steps,
+        "geoms": model.ngeom,
+        "meshes": model.nmesh
+    }
+
+
+def benchmark_house(house_name: str, out_dir: str, settings: Dict[str, Any], steps: int,
+                    repeats: int) -> Dict[str, Any]:
+    house_dir = os.path.join(out_dir, house_name)
+    os.makedirs(house_dir)
+    start_time = time.time()
+    factory = ProcthorImporter(file_path=os.path.join(source_dir, f"{house_name}.json"), config=Configuration(),
+                               house_name=house_name, **settings)
+    usd_file_path = os.path.join(house_dir, f"{house_name}.usda")
+    factory.save_tmp_model(usd_file_path)
+    mjcf_file_path = os.path.join(house_dir, f"{house_name}.xml")
+    run_exporter(MjcfExporter, mjcf_file_path, factory)
+    result = {"convert_time": time.time() - start_time}
+    result.update(count_files(house_dir))
+    result["usd_load_time"] = measure_load(usd_file_path, repeats)
+    result["mujoco"] = measure_mujoco(mjcf_file_path, steps, repeats)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare houses with walls and box-like assets as meshes and as boxes")
+    parser.add_argument("--houses", type=str, nargs="+", required=True,
+                        help="House numbers and ranges, e.g. 0-9, the house JSON files must exist")
+    parser.add_argument("--steps", type=int, default=1000, help="MuJoCo steps to time")
+    parser.add_argument("--repeats", type=int, default=3, help="Loads per house, the fastest one counts")
+    parser.add_argument("--out", type=str, default=os.path.join(source_dir, "benchmark_primitives.json"),
+                        help="Output JSON with the results")
+    args = parser.parse_args()
+
+    results = []
+    for house_number in parse_houses(args.houses):
+        house_name = f"house_{house_number}"
+        result = {"house": house_number}
+        for variant, settings in variants.items():
+            tmp_dir = tempfile.mkdtemp(prefix=f"primitives_{variant}_")
+            try:
+                result[variant] = benchmark_house(house_name, tmp_dir, settings, args.steps, args.repeats)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        results.append(result)
+        line = f"{house_name}: " + ", ".join(f"{variant} {result[variant]['files']} files "
+                                             f"{result[variant]['usd_load_time']:.3f}s USD load"
+                                             for variant in variants)
+        if all(result[variant]["mujoco"] is not None for variant in variants):
+            line += ", " + ", ".join(f"{variant} {result[variant]['mujoco']['load_time']:.3f}s MuJoCo load "
+                                     f"{result[variant]['mujoco']['step_time'] * 1e6:.1f}us/step"
+                                     for variant in variants)
+        print(line)
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import functools
+import contextlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy
+
+import multiverse_stand_in
+from collision_mesh import collision_modes
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+# The object names of benchmark_usd_authoring.py, whose TBox has a class for each of them
+object_names = ["Chair", "Table", "Sofa", "Fridge", "ArmChair", "CoffeeTable", "FloorLamp", "Bed", "Shelf", "Plant"]
+
+room_types = ["Kitchen", "LivingRoom", "Bedroom", "Bathroom"]
+
+room_size = 4.0
+
+wall_height = 2.5
+
+# Doors are cut into the middle of the wall between two rooms
+door_width = 1.0
+
+door_height = 2.1
+
+door_asset_id = "Doorway_1"
+
+# Distinct assets per object name, so that the mesh cache of the importer has hits and misses
+assets_per_object = 3
+
+# The methods of ProcthorImporter and the functions of procthor_to_scene that are timed. The times include the
+# stages called from within, e.g. import_object includes the import_asset of its asset
+importer_stages = ["import_room", "import_objects", "import_object", "import_door", "import_wall", "import_asset",
+                   "import_asset_box", "import_asset_meshes", "import_collision_geoms"]
+
+module_stages = ["get_asset_paths", "get_wall_boxes"]
+
+
+def make_objects(room_idx: int, origin: numpy.ndarray, rng: random.Random, objects_per_room: int,
+                 children_per_object: int, child_depth: int) -> List[Dict[str, Any]]:
+    # Objects spread over the room, every object has children_per_object children on it down to child_depth
+    def make_object(object_id: str, depth: int) -> Dict[str, Any]:
+        object_name = rng.choice(object_names)
+        obj = {
+            "id": object_id.replace("<name>", object_name),
+            "assetId": f"{object_name}_{rng.randrange(assets_per_object)}",
+            "position": {"x": float(origin[0] + rng.uniform(0.5, room_size - 0.5)),
+                         "y": float(0.5 * depth),
+                         "z": float(origin[2] + rng.uniform(0.5, room_size - 0.5))},
+            "rotation": {"x": 0.0, "y": float(rng.choice([0, 90, 180, 270])), "z": 0.0},
+            "children": []
+        }
+        if depth < child_depth:
+            obj["children"] = [make_object(f"<name>|surface|{obj['id'].split('|', 1)[1]}|{child_idx}", depth + 1)
+                               for child_idx in range(children_per_object)]
+        return obj
+
+    return [make_object(f"<name>|{room_idx}|{object_idx}", 0) for object_idx in range(objects_per_room)]
+
+
+def make_wall(room_id: str, start: Tuple[float, float], end: Tuple[float, float]) -> Dict[str, Any]:
+    # Both sides of a wall have the same coordinates at the end of the id, as in ProcTHOR
+    coordinates = sorted([start, end])
+    return {
+        "id": f"wall|{room_id}|" + "|".join(f"{value:.2f}" for point in coordinates for value in point),
+        "polygon": [{"x": start[0], "y": 0.0, "z": start[1]},
+                    {"x": end[0], "y": 0.0, "z": end[1]},
+                    {"x": start[0], "y": wall_height, "z": start[1]},
+                    {"x": end[0], "y": wall_height, "z": end[1]}]
+    }
+
+
+def make_house_json(num_rooms: int, objects_per_room: int, children_per_object: int, child_depth: int,
+                    seed: int = 0) -> Dict[str, Any]:
+    # A ProcTHOR-like house of square rooms in a grid, with a door between every room and the room on its right
+    rng = random.Random(seed)
+    num_cols = int(numpy.ceil(numpy.sqrt(num_rooms)))
+    house = {"rooms": [], "walls": [], "doors": [], "windows": [], "objects": []}
+    room_walls: Dict[int, Dict[str, Dict[str, Any]]] = {}
+    for room_idx in range(num_rooms):
+        row, col = divmod(room_idx, num_cols)
+        room_id = f"room|{room_idx}"
+        x0, z0 = col * room_size, row * room_size
+        x1, z1 = x0 + room_size, z0 + room_size
+        house["rooms"].append({"id": room_id, "roomType": room_types[room_idx % len(room_types)]})
+        # Counterclockwise seen from above, so that the walls of neighbouring rooms face each other
+        room_walls[room_idx] = {
+            "south": make_wall(room_id, (x0, z0), (x1, z0)),
+            "east": make_wall(room_id, (x1, z0), (x1, z1)),
+            "north": make_wall(room_id, (x1, z1), (x0, z1)),
+            "west": make_wall(room_id, (x0, z1), (x0, z0))
+        }
+        house["walls"] += room_walls[room_idx].values()
+        house["objects"] += make_objects(room_idx, numpy.array([x0, 0.0, z0]), rng, objects_per_room,
+                                         children_per_object, child_depth)
+
+    for room_idx in range(num_rooms):
+        right_room_idx = room_idx + 1
+        if right_room_idx % num_cols == 0 or right_room_idx >= num_rooms:
+            continue
+        hole_start = (room_size - door_width) / 2
+        house["doors"].append({
+            "id": f"door|{room_idx}|{right_room_idx}",
+            "assetId": door_asset_id,
+            "wall0": room_walls[room_idx]["east"]["id"],
+            "wall1": room_walls[right_room_idx]["west"]["id"],
+            "holePolygon": [{"x": hole_start, "y": 0.0, "z": 0.0},
+                            {"x": hole_start + door_width, "y": door_height, "z": 0.0}],
+            "assetPosition": {"x": room_size / 2, "y": door_height / 2, "z": 0.0}
+        })
+    return house
+
+
+def count_objects(objects: List[Dict[str, Any]]) -> int:
+    return sum(1 + count_objects(obj["children"]) for obj in objects)
+
+
+def get_sphere_triangles(num_segments: int) -> numpy.ndarray:
+    # (N, 3, 3) triangles of a UV sphere of radius 0.5, which never fits a box
+    theta = numpy.linspace(0, numpy.pi, num_segments + 1)
+    phi = numpy.linspace(0, 2 * numpy.pi, 2 * num_segments + 1)
+    grid = 0.5 * numpy.stack([numpy.sin(theta)[:, None] * numpy.cos(phi)[None, :],
+                              numpy.sin(theta)[:, None] * numpy.sin(phi)[None, :],
+                              numpy.cos(theta)[:, None].repeat(len(phi), axis=1)], axis=2)
+    p_00, p_01 = grid[:-1, :-1], grid[:-1, 1:]
+    p_10, p_11 = grid[1:, :-1], grid[1:, 1:]
+    triangles = numpy.concatenate([numpy.stack([p_00, p_10, p_11], axis=2).reshape(-1, 3, 3),
+                                   numpy.stack([p_00, p_11, p_01], axis=2).reshape(-1, 3, 3)])
+    # The triangles at the poles have two equal corners
+    normals = numpy.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    return triangles[numpy.linalg.norm(normals, axis=1) > 1e-12]
+
+
+def get_box_triangles() -> numpy.ndarray:
+    from wall_geometry import box_corner_signs, box_face_vertex_indices
+    return 0.5 * box_corner_signs[box_face_vertex_indices].astype(float)
+
+
+def write_stl(stl_file_path: str, triangles: numpy.ndarray) -> None:
+    record_dtype = numpy.dtype([("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+    records = numpy.zeros(len(triangles), dtype=record_dtype)
+    normals = numpy.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    records["normal"] = normals / numpy.linalg.norm(normals, axis=1, keepdims=True)
+    records["vertices"] = triangles
+    os.makedirs(os.path.dirname(stl_file_path), exist_ok=True)
+    with open(stl_file_path, "wb") as f:
+        f.write(b"\0" * 80)
+        f.write(numpy.uint32(len(triangles)).tobytes())
+        f.write(records.tobytes())
+
+
+def make_asset_tree(root_dir: str, asset_names: List[str], sphere_segments: int) -> None:
+    # Every other asset is a group object with one STL, the others are single objects with a box and a sphere part,
+    # so that the importer takes both of its paths and writes boxes as well as meshes
+    sphere_triangles = get_sphere_triangles(sphere_segments)
+    box_triangles = get_box_triangles()
+    for asset_idx, asset_name in enumerate(sorted(asset_names)):
+        if asset_idx % 2 == 0:
+            write_stl(os.path.join(root_dir, "grp_objects", asset_name, f"{asset_name}.stl"), sphere_triangles)
+        else:
+            asset_dir = os.path.join(root_dir, "single_objects", asset_name)
+            write_stl(os.path.join(asset_dir, f"{asset_name}_0.stl"), box_triangles)
+            write_stl(os.path.join(asset_dir, f"{asset_name}_1.stl"), sphere_triangles)
+
+
+def time_calls(owner: Any, name: str, timings: Dict[str, Dict[str, float]]) -> Callable[[], None]:
+    # Wraps owner.name to add up its calls and time, nested calls of the same stage count once.
+    # Returns the function that puts the original back
+    function = owner.__dict__[name]
+    is_static = isinstance(function, staticmethod)
+    wrapped = function.__func__ if is_static else function
+    timing = timings.setdefault(name, {"calls": 0, "time": 0.0})
+    depth = [0]
+
+    @functools.wraps(wrapped)
+    def timed(*args, **kwargs):
+        timing["calls"] += 1
+        if depth[0] > 0:
+            return wrapped(*args, **kwargs)
+        depth[0] += 1
+        start_time = time.perf_counter()
+        try:
+            return wrapped(*args, **kwargs)
+        finally:
+            timing["time"] += time.perf_counter() - start_time
+            depth[0] -= 1
+
+    setattr(owner, name, staticmethod(timed) if is_static else timed)
+    return lambda: setattr(owner, name, function)
+
+
+def run_import(house_file_path: str, usd_file_path: str, settings: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    import procthor_to_scene
+    from procthor_to_scene import ProcthorImporter, Configuration
+
+    timings: Dict[str, Dict[str, float]] = {}
+    restores = [time_calls(ProcthorImporter, name, timings) for name in importer_stages]
+    restores += [time_calls(procthor_to_scene, name, timings) for name in module_stages]
+    try:
+        start_time = time.perf_counter()
+        # The importer prints a line per asset, which is not what is measured
+        with contextlib.redirect_stdout(io.StringIO()):
+            factory = ProcthorImporter(file_path=house_file_path, config=Configuration(), **settings)
+        timings["total"] = {"calls": 1, "time": time.perf_counter() - start_time}
+        start_time = time.perf_counter()
+        factory.save_tmp_model(usd_file_path)
+        timings["save"] = {"calls": 1, "time": time.perf_counter() - start_time}
+    finally:
+        for restore in restores:
+            restore()
+    if isinstance(factory, multiverse_stand_in.Factory):
+        shutil.rmtree(factory.tmp_dir, ignore_errors=True)
+    return timings
+
+
+def has_usd_ontology() -> bool:
+    # Semantic tagging and clean up need the USD build of Multiverse, the stand-in does not replace it
+    try:
+        from pxr import UsdOntology
+    except ImportError:
+        return False
+    return True
+
+
+def make_TBox(out_dir: str) -> str:
+    from benchmark_usd_authoring import make_synthetic_house
+    os.makedirs(out_dir)
+    return make_synthetic_house(out_dir, 0)["TBox"]
+
+
+def run_post_process(usd_file_path: str, TBox_usd_file_path: str) -> Dict[str, Dict[str, float]]:
+    # The stages of post_process_usd.post_process, timed one by one
+    from semantic_tagging import load_sem_TBox, open_ABox_in_memory, sem_tag_stage
+    from clean_up_usd import clean_up_layer
+
+    timings: Dict[str, Dict[str, float]] = {}
+
+    def timed(name: str, function: Callable, *args) -> Any:
+        start_time = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = function(*args)
+        timings[name] = {"calls": 1, "time": time.perf_counter() - start_time}
+        return result
+
+    timed("load_TBox", load_sem_TBox, TBox_usd_file_path, True)
+    stage_ABox = open_ABox_in_memory(usd_file_path)
+    timed("sem_tag", sem_tag_stage, stage_ABox, usd_file_path, TBox_usd_file_path)
+    flatten_layer = timed("flatten", stage_ABox.Flatten)
+    timed("clean_up", clean_up_layer, flatten_layer)
+    return timings
+
+
+def get_best_timings(runs: List[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    # The fastest run of every stage, the calls are the same in every run
+    return {name: {"calls": runs[0][name]["calls"], "time": min(run[name]["time"] for run in runs)}
+            for name in runs[0]}
+
+
+def benchmark_house(tmp_dir: str, house: Dict[str, Any], settings: Dict[str, Any], repeats: int, seed: int,
+                    post_process: bool) -> Dict[str, Dict[str, float]]:
+    import procthor_to_scene
+
+    TBox_usd_file_path = make_TBox(os.path.join(tmp_dir, "ontology")) if post_process else None
+    house_file_path = os.path.join(tmp_dir, "house.json")
+    with open(house_file_path, "w") as f:
+        json.dump(house, f)
+    import_runs = []
+    post_process_runs = []
+    for repeat in range(repeats):
+        # Every run starts from an empty asset index and picks the same random assets
+        procthor_to_scene.asset_index = None
+        random.seed(seed)
+        usd_file_path = os.path.join(tmp_dir, f"house_{repeat}.usda")
+        import_runs.append(run_import(house_file_path, usd_file_path, settings))
+        if post_process:
+            post_process_runs.append(run_post_process(usd_file_path, TBox_usd_file_path))
+    timings = get_best_timings(import_runs)
+    if post_process:
+        timings.update(get_best_timings(post_process_runs))
+    return timings
+
+
+def compare_to_baseline(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+                        max_slowdown: float, min_time: float) -> List[str]:
+    # Returns the stages of the houses of the same size that became slower than max_slowdown times the baseline.
+    # Stages faster than min_time in both runs are too noisy to compare
+    baseline_by_size = {json.dumps(result["size"], sort_keys=True): result for result in baseline}
+    regressions = []
+    for result in results:
+        baseline_result = baseline_by_size.get(json.dumps(result["size"], sort_keys=True))
+        if baseline_result is None:
+            print(f"No baseline for {result['size']}")
+            continue
+        if baseline_result["multiverse_parser"] != result["multiverse_parser"]:
+            print(f"The baseline of {result['size']} ran with {baseline_result['multiverse_parser']}, "
+                  f"this run with {result['multiverse_parser']}")
+        print(f"{result['size']['rooms']} rooms compared to the baseline:")
+        for name, timing in result["timings"].items():
+            baseline_timing = baseline_result["timings"].get(name)
+            if baseline_timing is None or max(timing["time"], baseline_timing["time"]) < min_time:
+                continue
+            ratio = timing["time"] / max(baseline_timing["time"], 1e-9)
+            print(f"  {name}: {baseline_timing['time']:.4f}s -> {timing['time']:.4f}s ({ratio:.2f}x)")
+            if ratio > max_slowdown:
+                regressions.append(f"{result['size']['rooms']} rooms {name} {ratio:.2f}x")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the stages of ProcthorImporter and of the post processing "
+                                                 "on synthetic houses")
+    parser.add_argument("--rooms", type=int, nargs="+", default=[4, 16, 64], help="Numbers of rooms of the houses")
+    parser.add_argument("--objects_per_room", type=int, default=8, help="Objects on the floor of every room")
+    parser.add_argument("--children", type=int, default=2, help="Children of every object on each level")
+    parser.add_argument("--child_depth", type=int, default=1, help="Levels of children below the floor objects")
+    parser.add_argument("--sphere_segments", type=int, default=16,
+                        help="Segments of the sphere meshes of the synthetic assets")
+    parser.add_argument("--collision", type=str, default="visual", choices=collision_modes,
+                        help="Collision geoms of the assets, as in procthor_to_scene.py")
+    parser.add_argument("--stl_loader", type=str, default="numpy", choices=["numpy", "import_mesh"],
+                        help="STL loader of the importer, import_mesh needs Multiverse")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per house, the fastest one counts per stage")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the house generator and of the asset choice")
+    parser.add_argument("--stand_in", action="store_true",
+                        help="Use the multiverse_parser stand-in even if Multiverse is installed")
+    parser.add_argument("--out", type=str, default=os.path.join(source_dir, "benchmark_procthor_importer.json"),
+                        help="Output JSON with the results, to be used as the baseline of later runs")
+    parser.add_argument("--baseline", type=str, required=False, help="Results of an earlier run to compare with")
+    parser.add_argument("--max_slowdown", type=float, default=1.25,
+                        help="Exit with an error if a stage is this many times slower than in the baseline")
+    parser.add_argument("--min_time", type=float, default=0.01,
+                        help="Stages faster than this in seconds are not compared to the baseline")
+    args = parser.parse_args()
+
+    baseline: Optional[List[Dict[str, Any]]] = None
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    # multiverse_parser has to be chosen before procthor_to_scene is imported
+    use_stand_in = multiverse_stand_in.install(force=args.stand_in)
+    if use_stand_in and args.stl_loader == "import_mesh":
+        parser.error("--stl_loader=import_mesh needs Multiverse, the stand-in can't convert meshes")
+    import procthor_to_scene
+    settings = {"collision": args.collision, "use_mesh_binary": False, "stl_loader": args.stl_loader}
+    post_process = has_usd_ontology()
+    if not post_process:
+        print("pxr has no UsdOntology, semantic tagging and clean up are not timed")
+
+    results = []
+    for num_rooms in args.rooms:
+        house = make_house_json(num_rooms, args.objects_per_room, args.children, args.child_depth, args.seed)
+        tmp_dir = tempfile.mkdtemp(prefix="procthor_importer_")
+        # The importer looks the assets up next to procthor_to_scene.py, the synthetic ones are found there instead
+        original_source_dir = procthor_to_scene.source_dir
+        try:
+            asset_names = [procthor_to_scene.snake_to_camel(f"{object_name}_{asset_idx}")
+                           for object_name in object_names for asset_idx in range(assets_per_object)]
+            make_asset_tree(tmp_dir, asset_names + [door_asset_id], args.sphere_segments)
+            procthor_to_scene.source_dir = tmp_dir
+            timings = benchmark_house(tmp_dir, house, settings, args.repeats, args.seed, post_process)
+        finally:
+            procthor_to_scene.source_dir = original_source_dir
+            procthor_to_scene.asset_index = None
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        result = {
+            "size": {"rooms": num_rooms, "walls": len(house["walls"]), "doors": len(house["doors"]),
+                     "objects": count_objects(house["objects"]), "objects_per_room": args.objects_per_room,
+                     "children": args.children, "child_depth": args.child_depth,
+                     "sphere_segments": args.sphere_segments, "collision": args.collision,
+                     "stl_loader": args.stl_loader},
+            "multiverse_parser": "stand_in" if use_stand_in else "multiverse",
+            "timings": timings
+        }
+        results.append(result)
+        print(f"{num_rooms} rooms, {result['size']['objects']} objects: " +
+              ", ".join(f"{name} {timing['time']:.3f}s ({timing['calls']})" for name, timing in timings.items()))
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.out}")
+
+    if baseline is not None:
+        regressions = compare_to_baseline(results, baseline, args.max_slowdown, args.min_time)
+        if len(regressions) > 0:
+            print(f"Slower than {args.max_slowdown}x the baseline: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
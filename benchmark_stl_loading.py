@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import json
+import time
+import argparse
+import contextlib
+from typing import Any, Callable, Dict, List, Tuple
+from multiverse_parser import Configuration, Factory, MeshProperty
+
+from procthor_to_scene import ProcthorImporter
+from mesh_binary import load_stl_mesh, read_mesh_binary
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def get_largest_stl_files(objects_dir: str, count: int) -> List[str]:
+    stl_files = []
+    for root, _, files in os.walk(objects_dir):
+        for file in files:
+            if file.endswith(".stl"):
+                stl_files.append(os.path.join(root, file))
+    return sorted(stl_files, key=lambda stl_file: (-os.path.getsize(stl_file), stl_file))[:count]
+
+
+def load_with_import_mesh(factory: Factory, stl_file_path: str) -> List[Tuple[str, MeshProperty]]:
+    # The path import_asset_meshes takes without mesh binaries and with --stl_loader=import_mesh
+    tmp_usd_mesh_file_path, _ = factory.import_mesh(mesh_file_path=stl_file_path, merge_mesh=True)
+    return ProcthorImporter.read_usd_meshes(tmp_usd_mesh_file_path)
+
+
+def load_with_numpy(stl_file_path: str) -> List[Tuple[str, MeshProperty]]:
+    return [ProcthorImporter.get_array_mesh(stl_file_path, load_stl_mesh(stl_file_path))]
+
+
+def load_from_mesh_binary(stl_file_path: str) -> List[Tuple[str, MeshProperty]]:
+    return [ProcthorImporter.get_array_mesh(stl_file_path, read_mesh_binary(stl_file_path))]
+
+
+def time_loader(loader: Callable[[str], List[Tuple[str, MeshProperty]]], stl_file_path: str,
+                repeat: int) -> Dict[str, Any]:
+    # The best of repeat runs, import_mesh prints the Blender output, which is not what is measured
+    load_times = []
+    for _ in range(repeat):
+        start_time = time.time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            meshes = loader(stl_file_path)
+        load_times.append(time.time() - start_time)
+    return {
+        "time": min(load_times),
+        "points": sum(len(mesh_property.points) for _, mesh_property in meshes),
+        "faces": sum(len(mesh_property.face_vertex_counts) for _, mesh_property in meshes)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the STL loaders of procthor_to_scene.py on the largest meshes")
+    parser.add_argument("--objects_dir", type=str, default=os.path.join(source_dir, "grp_objects"),
+                        help="Directory of the extracted STL files")
+    parser.add_argument("--count", type=int, default=10, help="Number of the largest STL files to load")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per STL file and loader, the best one counts")
+    parser.add_argument("--out", type=str, default=os.path.join(source_dir, "benchmark_stl_loading.json"),
+                        help="Output JSON with the results")
+    args = parser.parse_args()
+
+    stl_files = get_largest_stl_files(args.objects_dir, args.count)
+    if len(stl_files) == 0:
+        parser.error(f"No STL files in {args.objects_dir}, run extract_objects.py first")
+    factory = Factory(file_path=stl_files[0], config=Configuration())
+    loaders = {
+        "import_mesh": lambda stl_file_path: load_with_import_mesh(factory, stl_file_path),
+        "numpy": load_with_numpy
+    }
+
+    results = []
+    for stl_file_path in stl_files:
+        result = {"stl": stl_file_path, "size": os.path.getsize(stl_file_path)}
+        for loader_name, loader in loaders.items():
+            result[loader_name] = time_loader(loader, stl_file_path, args.repeat)
+        if read_mesh_binary(stl_file_path) is not None:
+            result["mesh_binary"] = time_loader(load_from_mesh_binary, stl_file_path, args.repeat)
+        results.append(result)
+        print(f"{stl_file_path} ({result['size'] / 1024 ** 2:.1f} MB): " +
+              ", ".join(f"{loader_name} {result[loader_name]['time']:.3f}s "
+                        f"({result[loader_name]['points']} points, {result[loader_name]['faces']} faces)"
+                        for loader_name in ["import_mesh", "numpy", "mesh_binary"] if loader_name in result))
+
+    total_times = {loader_name: sum(result[loader_name]["time"] for result in results)
+                   for loader_name in ["import_mesh", "numpy"]}
+    print(", ".join(f"{loader_name} {total_time:.2f}s in total" for loader_name, total_time in total_times.items()))
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
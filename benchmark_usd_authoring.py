@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import json
+import contextlib
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Any, Dict
+from pxr import Usd, UsdGeom, UsdOntology, Sdf
+
+import semantic_tagging
+from semantic_tagging import load_sem_TBox, open_ABox_in_memory, sem_tag_stage, get_sem_classes
+from clean_up_usd import clean_up_stage
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+object_names = ["Chair", "Table", "Sofa", "Fridge", "ArmChair", "CoffeeTable", "FloorLamp", "Bed", "Shelf", "Plant"]
+
+
+def make_synthetic_house(out_dir: str, num_prims: int) -> Dict[str, str]:
+    # A TBox with SOMA and SOMA_DFL classes and an ABox with num_prims Xforms that each reference a mesh file
+    TBox_usd_file = os.path.join(out_dir, "TBox.usda")
+    stage_TBox = Usd.Stage.CreateNew(TBox_usd_file)
+    for namespace in ["SOMA", "SOMA_DFL"]:
+        stage_TBox.DefinePrim(f"/{namespace}")
+        for object_name in object_names:
+            class_name = f"_class_{object_name}" if namespace == "SOMA" else f"_class_{object_name.lower()}nwn1"
+            class_prim = stage_TBox.CreateClassPrim(f"/{namespace}/{class_name}")
+            rdf_api = UsdOntology.RdfAPI.Apply(class_prim)
+            rdf_api.CreateRdfConceptNameAttr().Set(class_name)
+            rdf_api.CreateRdfNamespaceAttr().Set(f"http://www.ease-crc.org/ont/{namespace}.owl#")
+    stage_TBox.GetRootLayer().Save()
+
+    os.makedirs(os.path.join(out_dir, "meshes"))
+    for object_name in object_names:
+        stage_mesh = Usd.Stage.CreateNew(os.path.join(out_dir, "meshes", f"{object_name}.usda"))
+        mesh = UsdGeom.Mesh.Define(stage_mesh, f"/SM_{object_name}")
+        mesh.CreatePointsAttr([(0, 0, 0), (1, 0, 0), (0, 1, 0)])
+        mesh.CreateFaceVertexCountsAttr([3])
+        mesh.CreateFaceVertexIndicesAttr([0, 1, 2])
+        stage_mesh.SetDefaultPrim(mesh.GetPrim())
+        stage_mesh.GetRootLayer().Save()
+
+    ABox_usd_file = os.path.join(out_dir, "house.usda")
+    stage_ABox = Usd.Stage.CreateNew(ABox_usd_file)
+    world = UsdGeom.Xform.Define(stage_ABox, "/house")
+    stage_ABox.SetDefaultPrim(world.GetPrim())
+    with Sdf.ChangeBlock():
+        layer = stage_ABox.GetRootLayer()
+        for prim_idx in range(num_prims):
+            object_name = object_names[prim_idx % len(object_names)]
+            prim_spec = Sdf.CreatePrimInLayer(layer, f"/house/{object_name}_{prim_idx}")
+            prim_spec.specifier = Sdf.SpecifierDef
+            prim_spec.typeName = "Xform"
+            mesh_spec = Sdf.CreatePrimInLayer(layer, f"/house/{object_name}_{prim_idx}/SM_{object_name}")
+            mesh_spec.specifier = Sdf.SpecifierDef
+            mesh_spec.typeName = "Mesh"
+            mesh_spec.referenceList.prependedItems.append(Sdf.Reference(f"./meshes/{object_name}.usda"))
+    layer.Save()
+    return {"ABox": ABox_usd_file, "TBox": TBox_usd_file}
+
+
+def sem_tag_stage_per_prim(stage_ABox: Usd.Stage, in_ABox_usd_file: str, in_TBox_Usd_file: str) -> None:
+    # The tagging as it was before, every edit goes through the composed stage
+    stage_ABox.GetRootLayer().subLayerPaths = [in_TBox_Usd_file]
+    for prim in stage_ABox.Traverse():
+        prepended_items = prim.GetPrim().GetPrimStack()[0].referenceList.prependedItems
+        if len(prepended_items) > 0:
+            references = semantic_tagging.get_abs_references(prim.GetPrim().GetPrimStack()[0], in_ABox_usd_file)
+            prim.GetPrim().GetReferences().ClearReferences()
+            for reference in references:
+                prim.GetPrim().GetReferences().AddReference(reference.assetPath, reference.primPath)
+
+        if prim.IsA(UsdGeom.Xform):
+            prim_name = ''.join(filter(str.isalpha, prim.GetName().replace("surface", "")))
+            prim_name = semantic_tagging.synonyms.get(prim_name, prim_name)
+            SOMA_DFL_sem_classes, SOMA_sem_classes = get_sem_classes(prim_name)
+            semanticTagAPI = UsdOntology.SemanticTagAPI.Apply(prim)
+            for sem_classes in [SOMA_sem_classes, SOMA_DFL_sem_classes]:
+                if len(sem_classes) > 0:
+                    semanticTagAPI.CreateSemanticLabelsRel().AddTarget(sem_classes[0])
+
+
+def clean_up_stage_per_prim(stage: Usd.Stage) -> None:
+    # The clean up as it was before, every edit goes through the composed stage
+    keep_prims = {}
+    for xform_prim in [prim for prim in stage.TraverseAll() if prim.IsA(UsdGeom.Xform)]:
+        if xform_prim.HasAPI(UsdOntology.SemanticTagAPI):
+            for prim_path in UsdOntology.SemanticTagAPI(xform_prim).GetSemanticLabelsRel().GetTargets():
+                prim = stage.GetPrimAtPath(prim_path)
+                if prim not in keep_prims:
+                    rdf_api = UsdOntology.RdfAPI(prim)
+                    keep_prims[prim] = [rdf_api.GetRdfConceptNameAttr().Get(),
+                                        rdf_api.GetRdfNamespaceAttr().Get(),
+                                        rdf_api.GetRdfDefinitionAttr().Get()]
+    for prim in stage.GetPseudoRoot().GetChildren():
+        if any([child_prim.IsAbstract() for child_prim in prim.GetAllChildren()]):
+            stage.RemovePrim(prim.GetPath())
+    for prim in keep_prims:
+        class_prim = stage.CreateClassPrim(prim.GetPath())
+        rdf_api = UsdOntology.RdfAPI.Apply(class_prim)
+        rdf_api.CreateRdfConceptNameAttr().Set(keep_prims[prim][0])
+        rdf_api.CreateRdfNamespaceAttr().Set(keep_prims[prim][1])
+        if isinstance(keep_prims[prim][2], str):
+            rdf_api.CreateRdfDefinitionAttr().Set(keep_prims[prim][2])
+
+
+def run(house: Dict[str, str], batched: bool) -> Dict[str, Any]:
+    result = {}
+    stage_ABox = open_ABox_in_memory(house["ABox"])
+    start_time = time.time()
+    # The tagging prints a line per prim, which is not what is measured
+    with contextlib.redirect_stdout(io.StringIO()):
+        if batched:
+            sem_tag_stage(stage_ABox, house["ABox"], house["TBox"])
+        else:
+            sem_tag_stage_per_prim(stage_ABox, house["ABox"], house["TBox"])
+    result["sem_tag_time"] = time.time() - start_time
+
+    stage_flatten = Usd.Stage.Open(stage_ABox.Flatten())
+    start_time = time.time()
+    if batched:
+        clean_up_stage(stage_flatten)
+    else:
+        clean_up_stage_per_prim(stage_flatten)
+    result["clean_up_time"] = time.time() - start_time
+    # The documentation of a flattened layer names the anonymous layer it came from
+    stage_flatten.GetRootLayer().documentation = ""
+    result["output"] = stage_flatten.GetRootLayer().ExportToString()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the per prim and the batched authoring of tagging and clean up")
+    parser.add_argument("--prims", type=int, nargs="+", default=[1000, 5000, 20000],
+                        help="Numbers of Xforms of the synthetic houses")
+    parser.add_argument("--out", type=str, default=os.path.join(source_dir, "benchmark_usd_authoring.json"),
+                        help="Output JSON with the results")
+    args = parser.parse_args()
+
+    results = []
+    for num_prims in args.prims:
+        tmp_dir = tempfile.mkdtemp(prefix="usd_authoring_")
+        try:
+            house = make_synthetic_house(tmp_dir, num_prims)
+            load_sem_TBox(house["TBox"], rebuild=True)
+            per_prim = run(house, batched=False)
+            batched = run(house, batched=True)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        result = {
+            "prims": num_prims,
+            "same_output": per_prim.pop("output") == batched.pop("output"),
+            "per_prim": per_prim,
+            "batched": batched
+        }
+        results.append(result)
+        print(f"{num_prims} prims: tagging {per_prim['sem_tag_time']:.2f}s -> {batched['sem_tag_time']:.2f}s, "
+              f"clean up {per_prim['clean_up_time']:.2f}s -> {batched['clean_up_time']:.2f}s, "
+              f"same output: {result['same_output']}")
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import os
+import gc
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Any, Dict, List
+from pxr import Usd, Sdf, UsdUtils
+
+from pipeline import usd_formats
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def get_usd_layer_files(usd_file_path: str) -> List[str]:
+    layers, _, _ = UsdUtils.ComputeAllDependencies(usd_file_path)
+    return [os.path.realpath(layer.realPath) for layer in layers
+            if layer.realPath and os.path.splitext(layer.realPath)[1] in usd_formats]
+
+
+def copy_as_format(usd_file_path: str, out_dir: str, usd_format: str) -> str:
+    # Writes the house and every USD layer it depends on in usd_format, with the asset paths renamed to match
+    layer_files = get_usd_layer_files(usd_file_path)
+    root_dir = os.path.commonpath([os.path.dirname(layer_file) for layer_file in layer_files])
+
+    def get_out_file(layer_file: str) -> str:
+        return os.path.join(out_dir, os.path.splitext(os.path.relpath(layer_file, root_dir))[0] + usd_format)
+
+    for layer_file in layer_files:
+        out_file = get_out_file(layer_file)
+        os.makedirs(os.path.dirname(out_file), exist_ok=True)
+        layer = Sdf.Layer.FindOrOpen(layer_file)
+        out_layer = Sdf.Layer.CreateNew(out_file)
+        out_layer.TransferContent(layer)
+
+        def rename(asset_path: str) -> str:
+            if os.path.splitext(asset_path)[1] not in usd_formats:
+                return asset_path
+            return os.path.splitext(asset_path)[0] + usd_format
+
+        UsdUtils.ModifyAssetPaths(out_layer, rename)
+        out_layer.Save()
+    return get_out_file(os.path.realpath(usd_file_path))
+
+
+def measure_load(usd_file_path: str, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start_time = time.time()
+        stage = Usd.Stage.Open(usd_file_path)
+        for _ in stage.Traverse():
+            pass
+        times.append(time.time() - start_time)
+        del stage
+    return min(times)
+
+
+def benchmark(usd_file_path: str, repeats: int) -> Dict[str, Any]:
+    result = {"usd": usd_file_path}
+    tmp_dir = tempfile.mkdtemp(prefix="usd_formats_")
+    try:
+        for usd_format in usd_formats:
+            out_dir = os.path.join(tmp_dir, usd_format[1:])
+            out_file = copy_as_format(usd_file_path, out_dir, usd_format)
+            layer_files = get_usd_layer_files(out_file)
+            result[usd_format] = {
+                "layers": len(layer_files),
+                "size": sum(os.path.getsize(layer_file) for layer_file in layer_files),
+                "load_time": measure_load(out_file, repeats)
+            }
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    usda, usdc = result[".usda"], result[".usdc"]
+    print(f"{usd_file_path}: {usda['layers']} layers, "
+          f".usda {usda['size'] / 1024 ** 2:.2f} MB in {usda['load_time']:.3f}s, "
+          f".usdc {usdc['size'] / 1024 ** 2:.2f} MB in {usdc['load_time']:.3f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the file size and the load time of .usda and .usdc houses")
+    parser.add_argument("--houses", type=str, nargs="*", default=[],
+                        help="House numbers and ranges of converted houses, e.g. 0-9 12")
+    parser.add_argument("--in_usd", type=str, nargs="*", default=[], help="Input USD files")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of loads, the fastest one is reported")
+    parser.add_argument("--out", type=str, default=os.path.join(source_dir, "benchmark_usd_formats.json"),
+                        help="Output JSON with the results")
+    args = parser.parse_args()
+
+    from get_house import parse_houses
+    usd_file_paths = list(args.in_usd)
+    for house_number in parse_houses(args.houses):
+        for usd_format in usd_formats:
+            usd_file_path = os.path.join(source_dir, f"house_{house_number}", f"house_{house_number}{usd_format}")
+            if os.path.exists(usd_file_path):
+                usd_file_paths.append(usd_file_path)
+                break
+        else:
+            print(f"house_{house_number} is not converted, skipping it")
+    if len(usd_file_paths) == 0:
+        parser.error("No USD files to benchmark, give --houses or --in_usd")
+
+    results = [benchmark(usd_file_path, args.repeats) for usd_file_path in usd_file_paths]
+    total = {usd_format: {key: sum(result[usd_format][key] for result in results) for key in ["size", "load_time"]}
+             for usd_format in usd_formats}
+    with open(args.out, "w") as f:
+        json.dump({"total": total, "results": results}, f, indent=4)
+    print(f"Total .usda {total['.usda']['size'] / 1024 ** 2:.2f} MB in {total['.usda']['load_time']:.3f}s, "
+          f".usdc {total['.usdc']['size'] / 1024 ** 2:.2f} MB in {total['.usdc']['load_time']:.3f}s, "
+          f"results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
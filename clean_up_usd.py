@@ -1,14 +1,52 @@
 #!/usr/bin/env python3
 
 import argparse
-import shutil
-import os
-import re
-from pxr import Usd, UsdGeom, UsdOntology
+import resource
+from typing import Any, Dict, List, Tuple
+from pxr import Usd, UsdGeom, UsdOntology, Sdf
 
-def clean_up(in_usd: str, out_usd: str) -> None:
-    stage = Usd.Stage.Open(in_usd)
+from usd_layer_edit import get_applied_schema_name, create_prim_spec, apply_api_schema, set_attribute
+from usd_layer_edit import get_class_parent_root_paths
+from semantic_tagging import get_sem_tag_names
 
+clean_up_modes = ["layer", "stage"]
+
+
+def get_peak_memory() -> float:
+    # Peak resident memory of this process in MB, ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def clean_up(in_usd: str, out_usd: str, mode: str = "layer") -> None:
+    if mode == "layer":
+        layer = Sdf.Layer.FindOrOpen(in_usd)
+        clean_up_layer(layer)
+        print(f"Writing to {out_usd}")
+        layer.Export(out_usd)
+    elif mode == "stage":
+        stage = Usd.Stage.Open(in_usd)
+        clean_up_stage(stage)
+        print(f"Writing to {out_usd}")
+        stage.GetRootLayer().Export(out_usd)
+    else:
+        raise ValueError(f"Unknown mode {mode}, choose from {', '.join(clean_up_modes)}")
+    print(f"Peak memory of the {mode} clean up: {get_peak_memory():.1f} MB")
+
+
+def get_rdf_names() -> Tuple[str, List[Tuple[str, Sdf.ValueTypeName, Sdf.Variability]]]:
+    # The name RdfAPI is applied with and the name, type and variability of its concept name, namespace and
+    # definition attributes, to author them on the layer
+    stage = Usd.Stage.CreateInMemory()
+    prim = stage.DefinePrim("/Probe")
+    rdf_api = UsdOntology.RdfAPI.Apply(prim)
+    rdf_attributes = [rdf_api.CreateRdfConceptNameAttr(),
+                      rdf_api.CreateRdfNamespaceAttr(),
+                      rdf_api.CreateRdfDefinitionAttr()]
+    return (get_applied_schema_name(UsdOntology.RdfAPI),
+            [(attribute.GetName(), attribute.GetTypeName(), attribute.GetVariability()) for attribute in rdf_attributes])
+
+
+def clean_up_stage(stage: Usd.Stage) -> None:
     keep_prims = {}
 
     for xform_prim in [prim for prim in stage.TraverseAll() if prim.IsA(UsdGeom.Xform)]:
@@ -30,28 +68,80 @@ def clean_up(in_usd: str, out_usd: str) -> None:
                                         rdf_api.GetRdfNamespaceAttr().Get(),
                                         rdf_api.GetRdfDefinitionAttr().Get()]
 
-    for prim in stage.GetPseudoRoot().GetChildren():
-        if any([child_prim.IsAbstract() for child_prim in prim.GetAllChildren()]):
-            stage.RemovePrim(prim.GetPath())
+    remove_prim_paths = [prim.GetPath() for prim in stage.GetPseudoRoot().GetChildren()
+                         if any([child_prim.IsAbstract() for child_prim in prim.GetAllChildren()])]
+
+    write_class_prims(stage.GetRootLayer(), remove_prim_paths,
+                      {prim.GetPath(): rdf_values for prim, rdf_values in keep_prims.items()}, get_rdf_names())
+
+
+def get_list_op_items(list_op: Any) -> List[Any]:
+    # The items a list op adds in the order they compose, for a layer that has no weaker layers
+    if list_op.isExplicit:
+        return list(list_op.explicitItems)
+    return list(list_op.prependedItems) + list(list_op.appendedItems)
+
+
+def clean_up_layer(layer: Sdf.Layer) -> None:
+    # The same clean up as clean_up_stage on a flattened layer, read and written on the layer without composing it
+    sem_tag_schema_name, sem_labels_name, sem_reports_name = get_sem_tag_names()
+    rdf_names = get_rdf_names()
+    rdf_attribute_names = [attribute_name for attribute_name, _, _ in rdf_names[1]]
+
+    keep_prims = {}
+    # Depth first in the order of the children, like TraverseAll
+    prim_specs = list(reversed(layer.rootPrims))
+    while len(prim_specs) > 0:
+        prim_spec = prim_specs.pop()
+        prim_specs += reversed(prim_spec.nameChildren)
+        if prim_spec.typeName != "Xform":
+            continue
+        if sem_tag_schema_name not in get_list_op_items(prim_spec.GetInfo("apiSchemas")):
+            continue
+        for relationship_name in [sem_labels_name, sem_reports_name]:
+            relationship_spec = prim_spec.relationships.get(relationship_name)
+            if relationship_spec is None:
+                continue
+            for prim_path in get_list_op_items(relationship_spec.targetPathList):
+                if prim_path not in keep_prims:
+                    rdf_values = []
+                    class_prim_spec = layer.GetPrimAtPath(prim_path)
+                    for attribute_name in rdf_attribute_names:
+                        attribute_spec = None if class_prim_spec is None \
+                            else class_prim_spec.attributes.get(attribute_name)
+                        rdf_values.append(None if attribute_spec is None else attribute_spec.default)
+                    keep_prims[prim_path] = rdf_values
+
+    write_class_prims(layer, get_class_parent_root_paths(layer), keep_prims, rdf_names)
+
 
-    for prim in keep_prims:
-        class_prim = stage.CreateClassPrim(prim.GetPath())
-        rdf_api = UsdOntology.RdfAPI.Apply(class_prim)
-        rdf_api.CreateRdfConceptNameAttr().Set(keep_prims[prim][0])
-        rdf_api.CreateRdfNamespaceAttr().Set(keep_prims[prim][1])
-        if isinstance(keep_prims[prim][2], str):
-            rdf_api.CreateRdfDefinitionAttr().Set(keep_prims[prim][2])
+def write_class_prims(layer: Sdf.Layer, remove_prim_paths: List[Sdf.Path], keep_prims: Dict[Sdf.Path, List[Any]],
+                      rdf_names: Tuple[str, List[Tuple[str, Sdf.ValueTypeName, Sdf.Variability]]]) -> None:
+    # Removes the ontology roots and writes the kept classes back with only their RdfAPI attributes,
+    # all in one change block
+    rdf_schema_name, rdf_attributes = rdf_names
+    with Sdf.ChangeBlock():
+        for prim_path in remove_prim_paths:
+            if layer.GetPrimAtPath(prim_path) is not None:
+                del layer.rootPrims[prim_path.name]
 
-    print(f"Writing to {out_usd}")
-    stage.GetRootLayer().Export(out_usd)
+        for prim_path, rdf_values in keep_prims.items():
+            class_prim_spec = create_prim_spec(layer, prim_path, Sdf.SpecifierClass, Sdf.SpecifierDef)
+            apply_api_schema(class_prim_spec, rdf_schema_name)
+            for (attribute_name, type_name, variability), value in zip(rdf_attributes, rdf_values):
+                # A missing definition is left unauthored, as before
+                if value is not None:
+                    set_attribute(class_prim_spec, attribute_name, type_name, value, variability)
 
 
 def main():
     parser = argparse.ArgumentParser(description="Auto semantic tagging based on object names")
     parser.add_argument("--in_usd", type=str, required=True, help="Input USD")
     parser.add_argument("--out_usd", type=str, required=True, help="Output USD")
+    parser.add_argument("--mode", type=str, default="layer", choices=clean_up_modes,
+                        help="Clean up the layer directly or through a composed stage")
     args = parser.parse_args()
-    clean_up(args.in_usd, args.out_usd)
+    clean_up(args.in_usd, args.out_usd, args.mode)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy
+from scipy.spatial import ConvexHull, QhullError
+from scipy.ndimage import binary_fill_holes
+
+# "visual" collides with the visual meshes, "decimated" with a decimated copy of every asset
+# and "convex" with a few convex hulls of the decimated copy. MuJoCo collides with the convex hull of every mesh geom,
+# so only "convex" changes the contacts there, "decimated" only makes the meshes smaller
+collision_modes = ["visual", "decimated", "convex"]
+
+# Bump when the collision meshes change, older cache entries are not used anymore
+collision_mesh_version = 1
+
+default_collision_max_triangles = 2000
+
+default_collision_triangle_budget = 200000
+
+default_collision_max_hulls = 8
+
+# A box, the fewest triangles a collision mesh is decimated to
+min_collision_triangles = 12
+
+# A part is split while this fraction of its hull is empty and the empty volume is not negligible
+# compared to the hull of the whole mesh
+min_concavity = 0.1
+
+min_concavity_volume = 0.01
+
+# Voxels along the longest side of a mesh for its convex decomposition
+decomposition_resolution = 32
+
+max_cluster_resolution = 4096
+
+# Largest distance in meters of the surface of an asset from the faces of its oriented box to be written as a box
+default_box_tolerance = 0.005
+
+# Directions of the largest faces of the hull that are tried as an axis of the oriented box
+max_box_axes = 20
+
+Mesh = Tuple[numpy.ndarray, numpy.ndarray]
+
+
+def cluster_vertices(points: numpy.ndarray, face_vertex_indices: numpy.ndarray, resolution: int) -> Mesh:
+    # Merge the points that fall into the same cell of a grid with resolution cells along the longest side,
+    # the faces that collapse and the faces that end up twice are dropped
+    lower = points.min(axis=0)
+    extent = float((points.max(axis=0) - lower).max())
+    if extent == 0.0:
+        return points[:0], face_vertex_indices[:0]
+    cells = numpy.minimum(numpy.floor((points - lower) / (extent / resolution)), resolution - 1).astype(numpy.int64)
+    cell_keys = (cells[:, 0] * resolution + cells[:, 1]) * resolution + cells[:, 2]
+    _, clusters = numpy.unique(cell_keys, return_inverse=True)
+    clusters = clusters.ravel()
+    cluster_sizes = numpy.bincount(clusters)
+    cluster_points = numpy.stack([numpy.bincount(clusters, weights=points[:, axis]) / cluster_sizes
+                                  for axis in range(3)], axis=1)
+
+    faces = clusters[face_vertex_indices]
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])]
+    _, first_faces = numpy.unique(numpy.sort(faces, axis=1), axis=0, return_index=True)
+    faces = faces[numpy.sort(first_faces)]
+
+    used_clusters, faces = numpy.unique(faces, return_inverse=True)
+    return cluster_points[used_clusters].astype(numpy.float32), faces.reshape(-1, 3).astype(numpy.int32)
+
+
+def decimate_mesh(points: numpy.ndarray, face_vertex_indices: numpy.ndarray, max_triangles: int) -> Mesh:
+    # The finest vertex clustering with at most max_triangles faces, found by bisecting the grid resolution
+    if len(face_vertex_indices) <= max_triangles:
+        return points, face_vertex_indices
+    best_mesh = None
+    low, high = 1, max_cluster_resolution
+    while low <= high:
+        resolution = (low + high) // 2
+        mesh = cluster_vertices(points, face_vertex_indices, resolution)
+        if len(mesh[1]) <= max_triangles:
+            if len(mesh[1]) > 0:
+                best_mesh = mesh
+            low = resolution + 1
+        else:
+            high = resolution - 1
+    if best_mesh is None:
+        # Even the coarsest grid that keeps any face has too many of them, the hull is the closest thing left
+        hull = get_convex_hull(points)
+        if hull is not None:
+            return hull[0], hull[1]
+        return points[:0], face_vertex_indices[:0]
+    return best_mesh
+
+
+def get_convex_hull(points: numpy.ndarray) -> Optional[Tuple[numpy.ndarray, numpy.ndarray, float]]:
+    # The points, the outward facing triangles and the volume of the convex hull, None for flat point sets
+    points = numpy.asarray(points, dtype=numpy.float64)
+    if len(points) < 4:
+        return None
+    try:
+        hull = ConvexHull(points)
+    except QhullError:
+        return None
+    # Qhull does not orient the simplices, flip the ones whose normal points against the facet normal
+    triangles = points[hull.simplices]
+    normals = numpy.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    simplices = hull.simplices.copy()
+    flip = numpy.einsum("ij,ij->i", normals, hull.equations[:, :3]) < 0
+    simplices[flip] = simplices[flip][:, [0, 2, 1]]
+
+    used_points, simplices = numpy.unique(simplices, return_inverse=True)
+    return (points[used_points].astype(numpy.float32), simplices.reshape(-1, 3).astype(numpy.int32),
+            float(hull.volume))
+
+
+def sample_surface(points: numpy.ndarray, face_vertex_indices: numpy.ndarray, spacing: float) -> numpy.ndarray:
+    # Points on a barycentric grid of every face, with no edge of the grid longer than spacing
+    triangles = points[face_vertex_indices].astype(numpy.float64)
+    edge_lengths = numpy.linalg.norm(triangles - triangles[:, [1, 2, 0]], axis=2).max(axis=1)
+    divisions = numpy.clip(numpy.ceil(edge_lengths / spacing), 1, max_cluster_resolution).astype(numpy.int64)
+    samples = []
+    for division in numpy.unique(divisions):
+        i, j = numpy.meshgrid(numpy.arange(division + 1), numpy.arange(division + 1), indexing="ij")
+        is_inside = i + j <= division
+        i, j = i[is_inside], j[is_inside]
+        weights = numpy.stack([division - i - j, i, j], axis=1) / division
+        samples.append(numpy.einsum("sk,tkd->tsd", weights, triangles[divisions == division]).reshape(-1, 3))
+    return numpy.concatenate(samples)
+
+
+def decompose_convex(points: numpy.ndarray, face_vertex_indices: numpy.ndarray, max_hulls: int,
+                     resolution: int = decomposition_resolution) -> List[Mesh]:
+    # The mesh is sampled and voxelized with resolution voxels along its longest side, the voxels inside closed
+    # surfaces count as solid. Every part is a box of voxels, its concavity is the volume of its hull that is not
+    # solid. The part with the most concavity is cut in two at the plane that leaves the least concavity, until
+    # there are max_hulls parts or all of them are convex enough.
+    lower = points.min(axis=0).astype(numpy.float64)
+    extent = points.max(axis=0) - lower
+    voxel_size = float(extent.max()) / resolution
+    if voxel_size == 0.0:
+        return []
+    voxel_counts = numpy.maximum(numpy.ceil(extent / voxel_size).astype(numpy.int64), 1)
+    samples = numpy.concatenate([points.astype(numpy.float64),
+                                 sample_surface(points, face_vertex_indices, voxel_size / 2)])
+    # One sample per half voxel is enough for the hulls
+    _, unique_samples = numpy.unique(numpy.floor((samples - lower) / (voxel_size / 2)).astype(numpy.int64), axis=0,
+                                     return_index=True)
+    samples = samples[unique_samples]
+    sample_voxels = numpy.minimum(numpy.floor((samples - lower) / voxel_size).astype(numpy.int64), voxel_counts - 1)
+    is_solid = numpy.zeros(voxel_counts, dtype=bool)
+    is_solid[tuple(sample_voxels.T)] = True
+    is_solid = binary_fill_holes(is_solid)
+    voxel_volume = voxel_size ** 3
+
+    def get_part(voxel_lower: numpy.ndarray, voxel_upper: numpy.ndarray) -> Optional[Dict]:
+        is_in_part = numpy.all((sample_voxels >= voxel_lower) & (sample_voxels < voxel_upper), axis=1)
+        hull = get_convex_hull(samples[is_in_part])
+        if hull is None:
+            return None
+        solid_volume = is_solid[tuple(slice(low, high) for low, high in zip(voxel_lower, voxel_upper))].sum()
+        return {"lower": voxel_lower, "upper": voxel_upper, "hull": hull,
+                "concavity": max(0.0, hull[2] - solid_volume * voxel_volume), "children": None}
+
+    def get_children(part: Dict) -> List[Dict]:
+        # The cut that leaves the least concavity in total and in its worse half
+        best_children, best_score = [], None
+        for axis in range(3):
+            low, high = int(part["lower"][axis]), int(part["upper"][axis])
+            for cut in sorted({low + (high - low) * eighth // 8 for eighth in range(1, 8)}):
+                if not low < cut < high:
+                    continue
+                lower_upper, upper_lower = part["upper"].copy(), part["lower"].copy()
+                lower_upper[axis], upper_lower[axis] = cut, cut
+                children = [get_part(part["lower"], lower_upper), get_part(upper_lower, part["upper"])]
+                children = [child for child in children if child is not None]
+                if len(children) == 0:
+                    continue
+                concavities = [child["concavity"] for child in children]
+                score = sum(concavities) + max(concavities)
+                if best_score is None or score < best_score:
+                    best_children, best_score = children, score
+        return best_children
+
+    root = get_part(numpy.zeros(3, dtype=numpy.int64), voxel_counts)
+    if root is None:
+        return []
+    parts = [root]
+    while len(parts) < max_hulls:
+        splittable_parts = [part for part in parts
+                            if part["concavity"] >= min_concavity * part["hull"][2]
+                            and part["concavity"] >= min_concavity_volume * root["hull"][2]
+                            and part["children"] != []]
+        if len(splittable_parts) == 0:
+            break
+        part = max(splittable_parts, key=lambda part: part["concavity"])
+        if part["children"] is None:
+            part["children"] = get_children(part)
+            continue
+        if len(parts) - 1 + len(part["children"]) > max_hulls:
+            break
+        parts = [other_part for other_part in parts if other_part is not part] + part["children"]
+    return [(part["hull"][0], part["hull"][1]) for part in parts]
+
+
+def get_collision_meshes(points: numpy.ndarray, face_vertex_indices: numpy.ndarray, collision_mode: str,
+                         max_triangles: int, max_hulls: int) -> List[Mesh]:
+    points = numpy.asarray(points, dtype=numpy.float32)
+    face_vertex_indices = numpy.asarray(face_vertex_indices, dtype=numpy.int32).reshape(-1, 3)
+    if len(face_vertex_indices) == 0:
+        return []
+    decimated_mesh = decimate_mesh(points, face_vertex_indices, max_triangles)
+    if collision_mode == "convex" and len(decimated_mesh[1]) > 0:
+        hulls = decompose_convex(decimated_mesh[0], decimated_mesh[1], max_hulls)
+        if len(hulls) > 0:
+            return hulls
+    if len(decimated_mesh[1]) == 0:
+        return []
+    return [decimated_mesh]
+
+
+def get_oriented_box(points: numpy.ndarray) -> Optional[Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]]:
+    # The center, the half extents and the rotation (the box axes as columns) of a small box around the points.
+    # The smallest box has a face flush with a face of the hull, so the box is fitted to each of the largest hull
+    # face directions, with the smallest rectangle around the points projected onto that face
+    points = numpy.asarray(points, dtype=numpy.float64)
+    if len(points) < 4:
+        return None
+    try:
+        hull = ConvexHull(points)
+    except QhullError:
+        return None
+    hull_points = points[hull.vertices]
+    triangles = points[hull.simplices]
+    areas = numpy.linalg.norm(numpy.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]), axis=1)
+    directions, direction_ids = numpy.unique(numpy.round(hull.equations[:, :3], 6), axis=0, return_inverse=True)
+    direction_areas = numpy.bincount(direction_ids.ravel(), weights=areas, minlength=len(directions))
+
+    best_box, best_volume = None, None
+    for normal in directions[numpy.argsort(-direction_areas)[:max_box_axes]]:
+        normal = normal / numpy.linalg.norm(normal)
+        u = numpy.cross(normal, numpy.eye(3)[numpy.argmin(numpy.abs(normal))])
+        u /= numpy.linalg.norm(u)
+        v = numpy.cross(normal, u)
+        projected = hull_points @ numpy.stack([u, v], axis=1)
+        try:
+            projected_hull = ConvexHull(projected)
+        except QhullError:
+            continue
+        corners = projected[projected_hull.vertices]
+        edges = numpy.roll(corners, -1, axis=0) - corners
+        edges /= numpy.linalg.norm(edges, axis=1, keepdims=True)
+        along = projected @ edges.T
+        across = projected @ numpy.stack([-edges[:, 1], edges[:, 0]], axis=1).T
+        edge_idx = int(numpy.argmin(numpy.ptp(along, axis=0) * numpy.ptp(across, axis=0)))
+        edge = edges[edge_idx]
+        axes = numpy.stack([edge[0] * u + edge[1] * v, -edge[1] * u + edge[0] * v, normal], axis=1)
+        local = hull_points @ axes
+        lower, upper = local.min(axis=0), local.max(axis=0)
+        volume = float(numpy.prod(upper - lower))
+        if best_volume is None or volume < best_volume:
+            if numpy.linalg.det(axes) < 0:
+                axes[:, 2] = -axes[:, 2]
+                lower[2], upper[2] = -upper[2], -lower[2]
+            best_box, best_volume = (axes @ ((lower + upper) / 2), (upper - lower) / 2, axes), volume
+    return best_box
+
+
+def is_closed(face_vertex_indices: numpy.ndarray) -> bool:
+    # Every edge is shared by exactly two faces that run along it in opposite directions, only then the signed
+    # volume of the faces is the volume the mesh encloses
+    face_vertex_indices = numpy.asarray(face_vertex_indices, dtype=numpy.int64).reshape(-1, 3)
+    if len(face_vertex_indices) == 0:
+        return False
+    starts = face_vertex_indices.ravel()
+    ends = numpy.roll(face_vertex_indices, -1, axis=1).ravel()
+    num_points = int(face_vertex_indices.max()) + 1
+    edges = numpy.sort(starts * num_points + ends)
+    if numpy.any(edges[1:] == edges[:-1]):
+        return False
+    return bool(numpy.array_equal(edges, numpy.sort(ends * num_points + starts)))
+
+
+def fit_box(points: numpy.ndarray, face_vertex_indices: numpy.ndarray,
+            tolerance: float = default_box_tolerance) -> Optional[Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]]:
+    # The oriented box of a closed mesh if no point of its surface is further than tolerance from the faces of the
+    # box and the mesh fills the box up to a shell of that thickness, else None. Open meshes (e.g. cabinets without
+    # a front) enclose no volume and are never boxes
+    face_vertex_indices = numpy.asarray(face_vertex_indices).reshape(-1, 3)
+    if not is_closed(face_vertex_indices):
+        return None
+    box = get_oriented_box(points)
+    if box is None:
+        return None
+    center, half_extents, rotation = box
+    spacing = max(tolerance, float(half_extents.max()) / 8)
+    samples = numpy.concatenate([numpy.asarray(points, dtype=numpy.float64),
+                                 sample_surface(points, face_vertex_indices, spacing)])
+    local = (samples - center) @ rotation
+    if (half_extents - numpy.abs(local)).min(axis=1).max() > tolerance:
+        return None
+    # Relative to the center, so that the rounding does not grow with the distance of the mesh to the origin
+    triangles = numpy.asarray(points, dtype=numpy.float64)[face_vertex_indices] - center
+    volume = abs(numpy.einsum("ij,ij->i", triangles[:, 0], numpy.cross(triangles[:, 1], triangles[:, 2])).sum()) / 6
+    if volume < numpy.prod(numpy.maximum(2 * (half_extents - tolerance), 0.0)):
+        return None
+    return box
+
+
+def get_collision_triangle_targets(triangle_counts: Dict[str, int], instance_counts: Dict[str, int],
+                                   triangle_budget: int, max_triangles: int) -> Dict[str, int]:
+    # The triangles every asset is decimated to, so that all instances together stay within the budget.
+    # Every asset gets the same share of its triangles, rounded down to a power of two, so that houses with
+    # slightly different budgets still share the cached collision meshes
+    targets = {asset: min(triangle_count, max_triangles) for asset, triangle_count in triangle_counts.items()}
+    total_triangles = sum(targets[asset] * instance_counts[asset] for asset in targets)
+    if total_triangles <= triangle_budget:
+        return targets
+    scale = triangle_budget / total_triangles
+    for asset, target in targets.items():
+        target = max(min_collision_triangles, int(target * scale))
+        targets[asset] = max(min_collision_triangles, 1 << (target.bit_length() - 1))
+    return targets
+
+
+def save_collision_meshes(file_path: str, meshes: List[Mesh]) -> None:
+    arrays = {}
+    for mesh_idx, (points, face_vertex_indices) in enumerate(meshes):
+        arrays[f"points_{mesh_idx}"] = points
+        arrays[f"face_vertex_indices_{mesh_idx}"] = face_vertex_indices
+    tmp_file_path = f"{file_path}.{os.getpid()}.tmp.npz"
+    numpy.savez(tmp_file_path, num_meshes=len(meshes), **arrays)
+    os.replace(tmp_file_path, file_path)
+
+
+def load_collision_meshes(file_path: str) -> Optional[List[Mesh]]:
+    try:
+        with numpy.load(file_path) as arrays:
+            return [(arrays[f"points_{mesh_idx}"], arrays[f"face_vertex_indices_{mesh_idx}"])
+                    for mesh_idx in range(int(arrays["num_meshes"]))]
+    except (OSError, ValueError, KeyError):
+        return None
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import argparse
+from typing import Dict, List, Optional
+import numpy
+
+from mesh_binary import read_stl_triangles
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+object_dir_names = ["grp_objects", "single_objects"]
+
+
+def read_obj_vertices(obj_file_path: str) -> numpy.ndarray:
+    with open(obj_file_path) as f:
+        vertices = [line.split()[1:4] for line in f if line.startswith("v ")]
+    return numpy.array(vertices, dtype=numpy.float64).reshape(-1, 3)
+
+
+def get_mesh_files(objects_dir: str) -> List[str]:
+    mesh_files = []
+    for object_dir_name in object_dir_names:
+        for root, _, files in os.walk(os.path.join(objects_dir, object_dir_name)):
+            for file in files:
+                if file.endswith(".stl") or file.endswith(".obj"):
+                    mesh_files.append(os.path.relpath(os.path.join(root, file), objects_dir))
+    return sorted(mesh_files)
+
+
+def compare_mesh_file(ref_file_path: str, test_file_path: str) -> Optional[float]:
+    # The largest vertex difference, None if the meshes have different sizes
+    if ref_file_path.endswith(".stl"):
+        ref_vertices, test_vertices = read_stl_triangles(ref_file_path), read_stl_triangles(test_file_path)
+    else:
+        ref_vertices, test_vertices = read_obj_vertices(ref_file_path), read_obj_vertices(test_file_path)
+    if ref_vertices.shape != test_vertices.shape:
+        return None
+    if ref_vertices.size == 0:
+        return 0.0
+    return float(numpy.abs(ref_vertices - test_vertices).max())
+
+
+def get_extract_time(objects_dir: str) -> Dict[str, float]:
+    # The extraction time of every FBX from the manifest of extract_objects.py
+    extract_times = {}
+    manifest_dir = os.path.join(objects_dir, "extract_manifest")
+    if not os.path.exists(manifest_dir):
+        return extract_times
+    for manifest_file in os.listdir(manifest_dir):
+        if manifest_file.endswith(".json"):
+            with open(os.path.join(manifest_dir, manifest_file)) as f:
+                manifest_entry = json.load(f)
+            extract_times[manifest_entry["fbx"]] = manifest_entry["time"]
+    return extract_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the meshes and the times of two runs of extract_objects.py")
+    parser.add_argument("--ref_dir", type=str, required=True, help="--out_dir of the reference run")
+    parser.add_argument("--test_dir", type=str, required=True, help="--out_dir of the run to compare")
+    parser.add_argument("--tolerance", type=float, default=1e-5, help="Largest allowed vertex difference")
+    parser.add_argument("--out", type=str, default=os.path.join(source_dir, "compare_extracted_objects.json"),
+                        help="Output JSON with the results")
+    args = parser.parse_args()
+
+    ref_mesh_files = get_mesh_files(args.ref_dir)
+    test_mesh_files = set(get_mesh_files(args.test_dir))
+    missing_files = [mesh_file for mesh_file in ref_mesh_files if mesh_file not in test_mesh_files]
+    different_files = {}
+    max_difference = 0.0
+    for mesh_file in ref_mesh_files:
+        if mesh_file not in test_mesh_files:
+            continue
+        difference = compare_mesh_file(os.path.join(args.ref_dir, mesh_file), os.path.join(args.test_dir, mesh_file))
+        if difference is None or difference > args.tolerance:
+            different_files[mesh_file] = difference
+        elif difference > max_difference:
+            max_difference = difference
+    extra_files = sorted(test_mesh_files.difference(ref_mesh_files))
+
+    ref_times, test_times = get_extract_time(args.ref_dir), get_extract_time(args.test_dir)
+    fbx_files = sorted(set(ref_times).intersection(test_times))
+    result = {
+        "mesh_files": len(ref_mesh_files),
+        "missing_files": missing_files,
+        "extra_files": extra_files,
+        "different_files": different_files,
+        "max_difference": max_difference,
+        "fbx_files": len(fbx_files),
+        "ref_time": sum(ref_times[fbx_file] for fbx_file in fbx_files),
+        "test_time": sum(test_times[fbx_file] for fbx_file in fbx_files)
+    }
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=4)
+    print(f"{len(ref_mesh_files)} mesh files: {len(missing_files)} missing, {len(extra_files)} extra, "
+          f"{len(different_files)} different, largest difference of the others {max_difference:.2e}")
+    print(f"{len(fbx_files)} FBX files extracted in {result['ref_time']:.2f}s by the reference run "
+          f"and in {result['test_time']:.2f}s by the compared run, results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
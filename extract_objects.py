@@ -1,11 +1,20 @@
 #!/usr/bin/env python3.11
 
 import bpy
+import bmesh
+import numpy
 import re
 import os
-from mathutils import Vector, Euler
+import sys
+import json
+import time
+import hashlib
+import argparse
+from mathutils import Vector, Euler, Matrix
 from math import radians
 
+from mesh_binary import mesh_binary_version, write_mesh_binary
+
 source_dir = os.path.dirname(os.path.realpath(__file__))
 
 grp_meshes_dir = os.path.join(source_dir, 'raw_grp_meshes')
@@ -44,6 +53,59 @@ translate_objects = {
     "Toilet_1_Done": [-0.2, 0.0, 0.0],
 }
 
+manifest_dir = os.path.join(source_dir, 'extract_manifest')
+
+# Bump when the extraction changes in a way the settings below don't show, to extract everything again
+extract_version = 1
+
+# "ops" extracts with the Blender operators, "data" with the bpy.data, mesh and bmesh APIs
+extract_modes = ["ops", "data"]
+
+def get_export_settings(extract_mode):
+    return {
+        "version": extract_version,
+        "mode": extract_mode,
+        "mesh_binary": mesh_binary_version,
+        "blender": bpy.app.version_string,
+        "ignore_meshes": ignore_meshes,
+        "scale_objects": scale_objects,
+        "rotate_objects": {obj_name: list(rotation) for obj_name, rotation in rotate_objects.items()},
+        "translate_objects": translate_objects,
+        "forward_axis": "Y",
+        "up_axis": "Z"
+    }
+
+def get_manifest_key(fbx_file_path, fbx_type, extract_mode):
+    # An FBX is extracted again when its content, its type or the export settings change
+    sha = hashlib.sha256()
+    with open(fbx_file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    sha.update(fbx_type.encode())
+    sha.update(json.dumps(get_export_settings(extract_mode), sort_keys=True).encode())
+    return sha.hexdigest()
+
+def load_manifest_entry(manifest_key):
+    manifest_entry_path = os.path.join(manifest_dir, f"{manifest_key}.json")
+    if not os.path.exists(manifest_entry_path):
+        return None
+    try:
+        with open(manifest_entry_path) as f:
+            manifest_entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not all(os.path.exists(output_file_path) for output_file_path in manifest_entry["outputs"]):
+        return None
+    return manifest_entry
+
+def save_manifest_entry(manifest_key, manifest_entry):
+    # One file per FBX, so that the shards never write the same file
+    os.makedirs(manifest_dir, exist_ok=True)
+    manifest_entry_path = os.path.join(manifest_dir, f"{manifest_key}.json")
+    with open(f"{manifest_entry_path}.tmp", "w") as f:
+        json.dump(manifest_entry, f, indent=4)
+    os.replace(f"{manifest_entry_path}.tmp", manifest_entry_path)
+
 def snake_to_camel(snake_str):
      # Split the string by underscores, but keep numbers separated
     components = re.split(r'(_\d+_)|(_\d+)|(_\d+)|_', snake_str)
@@ -73,6 +135,7 @@ def select_object_with_children(obj, reset_origin=True):
         select_object_with_children(child)
 
 def extract_grp_object(fbx_file_path):
+    output_file_paths = []
     data = bpy.data
 
     for armature in data.armatures:
@@ -164,13 +227,19 @@ def extract_grp_object(fbx_file_path):
             
             # Export the selected object to an .obj file
             bpy.ops.wm.obj_export(filepath=obj_file_path, export_selected_objects=True, forward_axis='Y', up_axis='Z')
+            output_file_paths.append(obj_file_path)
 
             obj_file_path = os.path.join(obj_dir_path, f"{obj.name}.stl")
             
             # Export the selected object to an .stl file
             bpy.ops.wm.stl_export(filepath=obj_file_path, export_selected_objects=True, forward_axis='Y', up_axis='Z')
+            output_file_paths.append(obj_file_path)
+            output_file_paths.append(write_mesh_binary(obj_file_path))
+
+    return output_file_paths
 
 def extract_single_object(fbx_file_path):
+    output_file_paths = []
     data = bpy.data
 
     for armature in data.armatures:
@@ -301,18 +370,299 @@ def extract_single_object(fbx_file_path):
             
             # Export the selected object to an .stl file
             bpy.ops.wm.stl_export(filepath=obj_file_path, export_selected_objects=True, forward_axis='Y', up_axis='Z')
+            output_file_paths.append(obj_file_path)
+            output_file_paths.append(write_mesh_binary(obj_file_path))
 
-if __name__=="__main__":
+    return output_file_paths
+
+def clear_data():
+    data = bpy.data
+    data.batch_remove([id_data
+                       for collection in [data.armatures, data.meshes, data.objects, data.materials, data.cameras,
+                                          data.lights, data.images]
+                       for id_data in collection])
+
+def get_object_with_children(obj):
+    objects = [obj]
+    for child in obj.children:
+        objects += get_object_with_children(child)
+    return objects
+
+def make_single_user_meshes(objects):
+    for obj in objects:
+        if obj.type == 'MESH' and obj.data.users > 1:
+            obj.data = obj.data.copy()
+
+def get_bounds(mesh):
+    # The local bounding box of a mesh as (min, max)
+    if len(mesh.vertices) == 0:
+        return Vector((0, 0, 0)), Vector((0, 0, 0))
+    coords = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+    mesh.vertices.foreach_get("co", coords)
+    coords = coords.reshape(-1, 3)
+    return Vector(coords.min(axis=0)), Vector(coords.max(axis=0))
+
+def flip_faces(mesh):
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    bmesh.ops.reverse_faces(bm, faces=bm.faces[:])
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.update()
+
+def bake_transforms(objects, matrices):
+    # Writes the given world matrices into the meshes and leaves every object at the identity, so the exported
+    # geometry is the same as after transform_apply
+    for obj in objects:
+        if obj.type == 'MESH':
+            obj.data.transform(matrices[obj.name])
+            obj.data.update()
+    for obj in objects:
+        obj.matrix_parent_inverse = Matrix.Identity(4)
+        obj.matrix_basis = Matrix.Identity(4)
+
+def select_only(objects):
+    object_names = {obj.name for obj in objects}
+    for obj in bpy.context.scene.objects:
+        obj.select_set(obj.name in object_names)
+
+def extract_grp_object_data(fbx_file_path):
+    # Same as extract_grp_object, but the transforms, normals and bounds go through the data API instead of
+    # the operators, only the FBX import and the OBJ and STL exports are operators
+    output_file_paths = []
+    clear_data()
+
+    bpy.ops.import_scene.fbx(filepath=fbx_file_path)
+    bpy.context.view_layer.update()
+
+    # Apply all transformations (location, rotation, scale)
+    objects = list(bpy.context.scene.objects)
+    make_single_user_meshes(objects)
+    bake_transforms(objects, {obj.name: obj.matrix_world.copy() for obj in objects})
+
+    while True:
+        for obj in bpy.context.scene.objects:
+            if obj.type != 'MESH' and obj.parent is None:
+                bpy.data.objects.remove(obj, do_unlink=True)
+        if not any(obj.type != 'MESH' and obj.parent is None for obj in bpy.context.scene.objects):
+            break
+
+    for obj in bpy.context.scene.objects:
+        obj.name = snake_to_camel(obj.name)
+        obj.data.name = f"SM_{obj.name}"
+        for index, material in enumerate(obj.data.materials):
+            if material:
+                material.name = f"M_{obj.name}_{index}"
+
+    for obj in bpy.context.scene.objects:
+        if obj.type == 'MESH' and obj.parent is None and 'Slice' not in obj.name:
+            objects = get_object_with_children(obj)
+
+            # Move the origin to the bounds center and then to zeros, which moves the object and its children
+            bounds_min, bounds_max = get_bounds(obj.data)
+            matrix = Matrix.Translation(-(bounds_min + bounds_max) / 2)
+
+            flip = False
+            for obj_name, scale in scale_objects.items():
+                if obj_name in obj.name:
+                    matrix = Matrix.Diagonal((*scale, 1.0)) @ matrix
+                    flip = scale[0] * scale[1] * scale[2] < 0
+                    break
+
+            bake_transforms(objects, {child.name: matrix for child in objects})
+            if flip:
+                for child in objects:
+                    if child.type == 'MESH':
+                        flip_faces(child.data)
+
+            select_only(objects)
+            bpy.context.view_layer.objects.active = obj
+
+            obj_dir_path = os.path.join(grp_objects_dir, obj.name)
+            if not os.path.exists(obj_dir_path):
+                os.makedirs(obj_dir_path)
+            obj_file_path = os.path.join(obj_dir_path, f"{obj.name}.obj")
+            bpy.ops.wm.obj_export(filepath=obj_file_path, export_selected_objects=True, forward_axis='Y', up_axis='Z')
+            output_file_paths.append(obj_file_path)
+
+            obj_file_path = os.path.join(obj_dir_path, f"{obj.name}.stl")
+            bpy.ops.wm.stl_export(filepath=obj_file_path, export_selected_objects=True, forward_axis='Y', up_axis='Z')
+            output_file_paths.append(obj_file_path)
+            output_file_paths.append(write_mesh_binary(obj_file_path))
+
+    return output_file_paths
+
+def extract_single_object_data(fbx_file_path):
+    # Same as extract_single_object, but the transforms, normals and bounds go through the data API instead of
+    # the operators, only the FBX import and the STL export are operators
+    output_file_paths = []
+    clear_data()
+
+    bpy.ops.import_scene.fbx(filepath=fbx_file_path)
+    make_single_user_meshes(bpy.context.scene.objects)
+
+    while True:
+        for obj in bpy.context.scene.objects:
+            if obj.type != 'MESH':
+                bpy.data.objects.remove(obj, do_unlink=True)
+        if not any(obj.type != 'MESH' for obj in bpy.context.scene.objects):
+            break
+
+    for obj in bpy.context.scene.objects:
+        obj.name = snake_to_camel(obj.name)
+        obj.data.name = f"SM_{obj.name}"
+        for index, material in enumerate(obj.data.materials):
+            if material:
+                material.name = f"M_{obj.name}_{index}"
+
+    obj_file_name = os.path.basename(fbx_file_path).split('.')[0]
+    obj_file_name = snake_to_camel(obj_file_name)
+    obj_dir_path = os.path.join(single_objects_dir, obj_file_name)
+    if not os.path.exists(obj_dir_path):
+        os.makedirs(obj_dir_path)
+
+    bpy.context.view_layer.update()
+    for i, obj in enumerate(bpy.context.scene.objects):
+        if obj.type == 'MESH' and obj.parent is None and obj.name not in ignore_meshes:
+            objects = get_object_with_children(obj)
+            world_matrices = {child.name: child.matrix_world.copy() for child in objects}
+
+            # Move the origin to the bounds center and then to zeros
+            bounds_min, bounds_max = get_bounds(obj.data)
+            bounds_center = (bounds_min + bounds_max) / 2
+            obj.location = (0, 0, 0)
+
+            # Check if any dimension of the bounding box in world space exceeds 1 meter
+            bbox_corners = [obj.matrix_basis.to_3x3() @ Vector((x, y, z))
+                            for x in [bounds_min.x, bounds_max.x]
+                            for y in [bounds_min.y, bounds_max.y]
+                            for z in [bounds_min.z, bounds_max.z]]
+            dimensions = [max(corner[axis] for corner in bbox_corners) - min(corner[axis] for corner in bbox_corners)
+                          for axis in range(3)]
+            if any(dimension > 1 for dimension in dimensions):
+                obj.scale[0] *= 0.1
+                obj.scale[1] *= 0.1
+                obj.scale[2] *= 0.1
+
+            flip = False
+            if obj_file_name in scale_objects:
+                obj.scale[0] *= scale_objects[obj_file_name][0]
+                obj.scale[1] *= scale_objects[obj_file_name][1]
+                obj.scale[2] *= scale_objects[obj_file_name][2]
+                flip = scale_objects[obj_file_name][0] * scale_objects[obj_file_name][1] * scale_objects[obj_file_name][2] < 0
+
+            if obj_file_name in rotate_objects:
+                obj.rotation_mode = "XYZ"
+                obj.rotation_euler.rotate(rotate_objects[obj_file_name])
+
+            if obj_file_name in translate_objects:
+                obj.location[0] += translate_objects[obj_file_name][0]
+                obj.location[1] += translate_objects[obj_file_name][1]
+                obj.location[2] += translate_objects[obj_file_name][2]
+
+            # The object and its children move with the new transform of the object relative to its bounds center
+            matrix = obj.matrix_basis @ (world_matrices[obj.name] @ Matrix.Translation(bounds_center)).inverted()
+            bake_transforms(objects, {child.name: matrix @ world_matrices[child.name] for child in objects})
+            if flip:
+                for child in objects:
+                    if child.type == 'MESH':
+                        flip_faces(child.data)
+
+            if 'Sphere' in obj.name or 'Cube' in obj.name or 'Cylinder' in obj.name:
+                obj_export_file_name = f"{obj_file_name}_{i}"
+            else:
+                obj_export_file_name = obj.name
+
+            if obj_export_file_name in ignore_meshes:
+                continue
+
+            select_only(objects)
+            bpy.context.view_layer.objects.active = obj
+
+            obj_file_path = os.path.join(obj_dir_path, f"{obj_export_file_name}.stl")
+            bpy.ops.wm.stl_export(filepath=obj_file_path, export_selected_objects=True, forward_axis='Y', up_axis='Z')
+            output_file_paths.append(obj_file_path)
+            output_file_paths.append(write_mesh_binary(obj_file_path))
+
+    return output_file_paths
+
+def get_fbx_files():
+    # All FBX files to extract as (type, path), in the order they were always extracted
+    fbx_files = []
     for root, dirs, files in os.walk(grp_meshes_dir):
         for fbx_file in files:
             if fbx_file.endswith('.fbx') and fbx_file not in ignore_list:
-                fbx_file_path = os.path.join(root, fbx_file)
-                print(f"Extracting objects from {fbx_file_path}")
-                extract_grp_object(fbx_file_path)
+                fbx_files.append(("grp", os.path.join(root, fbx_file)))
 
     for root, dirs, files in os.walk(single_meshes_dir):
         for fbx_file in files:
             if fbx_file.endswith('.fbx') and fbx_file not in ignore_list and not any(name in fbx_file for name in ignore_name):
-                fbx_file_path = os.path.join(root, fbx_file)
+                fbx_files.append(("single", os.path.join(root, fbx_file)))
+    return fbx_files
+
+def parse_shard(shard):
+    shard_index, shard_count = [int(value) for value in shard.split("/")]
+    if shard_count < 1 or not 0 <= shard_index < shard_count:
+        raise ValueError(f"Invalid shard {shard}, expected i/N with 0 <= i < N")
+    return shard_index, shard_count
+
+def get_shard_fbx_files(fbx_files, shard_index, shard_count):
+    # Every shard computes the same split: the largest files first, each to the shard with the fewest bytes so far.
+    # Within a shard the files keep their order
+    shard_sizes = [0] * shard_count
+    shards = {}
+    for fbx_file_idx in sorted(range(len(fbx_files)), key=lambda idx: (-os.path.getsize(fbx_files[idx][1]), idx)):
+        shard = min(range(shard_count), key=lambda shard: (shard_sizes[shard], shard))
+        shard_sizes[shard] += os.path.getsize(fbx_files[fbx_file_idx][1])
+        shards[fbx_file_idx] = shard
+    return [fbx_file for fbx_file_idx, fbx_file in enumerate(fbx_files) if shards[fbx_file_idx] == shard_index]
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Extract the objects of the ProcTHOR FBX files to OBJ and STL")
+    parser.add_argument("--shard", type=str, default="0/1", help="Extract only the shard i of N, e.g. 0/4")
+    parser.add_argument("--force", action="store_true", help="Extract the FBX files that are in the manifest again")
+    parser.add_argument("--mode", type=str, default="ops", choices=extract_modes,
+                        help="Extract with the Blender operators or with the data API, which is faster")
+    parser.add_argument("--out_dir", type=str, default=source_dir,
+                        help="Directory of grp_objects, single_objects and the manifest, e.g. to compare the modes")
+    args = parser.parse_args()
+    shard_index, shard_count = parse_shard(args.shard)
+    grp_objects_dir = os.path.join(args.out_dir, 'grp_objects')
+    single_objects_dir = os.path.join(args.out_dir, 'single_objects')
+    manifest_dir = os.path.join(args.out_dir, 'extract_manifest')
+
+    fbx_files = get_shard_fbx_files(get_fbx_files(), shard_index, shard_count)
+    failed_fbx_file_paths = []
+    for fbx_type, fbx_file_path in fbx_files:
+        manifest_key = get_manifest_key(fbx_file_path, fbx_type, args.mode)
+        if not args.force and load_manifest_entry(manifest_key) is not None:
+            print(f"Skipping {fbx_file_path}, already extracted")
+            continue
+
+        start_time = time.time()
+        try:
+            if fbx_type == "grp":
+                print(f"Extracting objects from {fbx_file_path}")
+                if args.mode == "data":
+                    output_file_paths = extract_grp_object_data(fbx_file_path)
+                else:
+                    output_file_paths = extract_grp_object(fbx_file_path)
+            else:
                 print(f"Extracting object from {fbx_file_path}")
-                extract_single_object(fbx_file_path)
\ No newline at end of file
+                if args.mode == "data":
+                    output_file_paths = extract_single_object_data(fbx_file_path)
+                else:
+                    output_file_paths = extract_single_object(fbx_file_path)
+        except Exception as e:
+            print(f"Failed to extract {fbx_file_path}: {e}")
+            failed_fbx_file_paths.append(fbx_file_path)
+            continue
+        save_manifest_entry(manifest_key, {"fbx": fbx_file_path,
+                                           "type": fbx_type,
+                                           "outputs": output_file_paths,
+                                           "time": time.time() - start_time})
+
+    print(f"Shard {shard_index}/{shard_count}: {len(fbx_files) - len(failed_fbx_file_paths)} of {len(fbx_files)} "
+          f"FBX files done")
+    if len(failed_fbx_file_paths) > 0:
+        sys.exit(1)
@@ -1,24 +1,120 @@
 #!/usr/bin/env python3
 
+import os
+import sys
 import argparse
-import prior
 import json
+import zlib
+import numpy
+from typing import Any, Dict, List
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+default_store_dir = os.path.join(source_dir, "procthor_10k")
+
+splits = ["train", "val", "test"]
+
+
+class HouseStore:
+    # Every house is compressed on its own and appended to <split>.bin, <split>.idx holds the byte offset
+    # and the length of every house as uint64 pairs, so reading one house is a seek and a decompress
+
+    def __init__(self, store_dir: str = default_store_dir, split: str = "train"):
+        self.bin_file_path = os.path.join(store_dir, f"{split}.bin")
+        self.idx_file_path = os.path.join(store_dir, f"{split}.idx")
+        if not os.path.exists(self.bin_file_path) or not os.path.exists(self.idx_file_path):
+            raise FileNotFoundError(f"House store not found in {store_dir}, run get_house.py --export first")
+        if os.path.getsize(self.idx_file_path) == 0:
+            self.index = numpy.zeros((0, 2), dtype=numpy.uint64)
+        else:
+            self.index = numpy.memmap(self.idx_file_path, dtype=numpy.uint64, mode="r").reshape(-1, 2)
+        self._bin_file = open(self.bin_file_path, "rb")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, house_number: int) -> Dict[str, Any]:
+        if not 0 <= house_number < len(self):
+            raise IndexError(f"House {house_number} is out of range [0, {len(self)})")
+        offset, length = self.index[house_number]
+        self._bin_file.seek(int(offset))
+        return json.loads(zlib.decompress(self._bin_file.read(int(length))))
+
+    def close(self) -> None:
+        self._bin_file.close()
+
+    @staticmethod
+    def export(houses, store_dir: str = default_store_dir, split: str = "train") -> None:
+        os.makedirs(store_dir, exist_ok=True)
+        bin_file_path = os.path.join(store_dir, f"{split}.bin")
+        idx_file_path = os.path.join(store_dir, f"{split}.idx")
+        # Written under temporary names and moved in place, so that a reader never sees a half written store
+        tmp_bin_file_path = f"{bin_file_path}.{os.getpid()}.tmp"
+        tmp_idx_file_path = f"{idx_file_path}.{os.getpid()}.tmp"
+        index = []
+        offset = 0
+        with open(tmp_bin_file_path, "wb") as bin_file:
+            for house in houses:
+                data = zlib.compress(json.dumps(house, separators=(",", ":")).encode(), 6)
+                bin_file.write(data)
+                index.append((offset, len(data)))
+                offset += len(data)
+        numpy.array(index, dtype=numpy.uint64).reshape(-1, 2).tofile(tmp_idx_file_path)
+        os.replace(tmp_bin_file_path, bin_file_path)
+        os.replace(tmp_idx_file_path, idx_file_path)
+        print(f"Exported {len(index)} houses of {split} to {bin_file_path} ({offset / 1024 ** 2:.1f} MB)")
+
+
+def parse_houses(houses: List[str]) -> List[int]:
+    # Accept lists like "1 2 3", "1,2,3" and ranges like "0-99", where the end of a range is included
+    house_numbers = []
+    for house in houses:
+        for item in house.split(","):
+            item = item.strip()
+            if item == "":
+                continue
+            if "-" in item:
+                start, end = item.split("-", 1)
+                house_numbers += list(range(int(start), int(end) + 1))
+            else:
+                house_numbers.append(int(item))
+    return list(dict.fromkeys(house_numbers))
+
+
+def export_dataset(store_dir: str) -> None:
+    import prior
+    dataset = prior.load_dataset("procthor-10k")
+    for split in splits:
+        HouseStore.export(dataset[split], store_dir, split)
 
-dataset = prior.load_dataset("procthor-10k")
-houses = dataset["train"]
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Auto semantic tagging based on object names")
-    parser.add_argument("--house", type=str, required=True, help="Input JSON")
+    parser = argparse.ArgumentParser(description="Get houses from procthor-10k")
+    parser.add_argument("--house", type=str, required=False, help="House number or range, e.g. 1 or 0-9,12")
+    parser.add_argument("--split", type=str, default="train", choices=splits, help="Dataset split")
+    parser.add_argument("--store_dir", type=str, default=default_store_dir, help="Directory of the local house store")
+    parser.add_argument("--export", action="store_true",
+                        help="Export procthor-10k into the local house store (needs network access once)")
     args = parser.parse_args()
 
+    if args.export:
+        export_dataset(args.store_dir)
+        if not args.house:
+            sys.exit(0)
+
     if args.house:
-        house_number = int(args.house)
+        house_numbers = parse_houses([args.house])
     else:
         print("Enter the house number: ", end="")
-        house_number = int(input())
+        house_numbers = [int(input())]
+
+    # Never exported here: pipeline.py runs one get_house.py per house, which would all download the dataset
+    if not os.path.exists(os.path.join(args.store_dir, f"{args.split}.idx")):
+        sys.exit(f"House store of {args.split} not found in {args.store_dir}, run get_house.py --export first")
 
-    house = houses[house_number]
-    with open(f"house_{house_number}.json", "w") as file:
-        json.dump(house, file, indent=4)
-    
\ No newline at end of file
+    house_store = HouseStore(args.store_dir, args.split)
+    for house_number in house_numbers:
+        house = house_store[house_number]
+        with open(f"house_{house_number}.json", "w") as file:
+            json.dump(house, file, indent=4)
+    house_store.close()
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
 import os
+import json
 import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 source_dir = os.path.dirname(os.path.realpath(__file__))
 
@@ -9,41 +13,139 @@ source_folder = os.path.join(source_dir, 'ai2thor/unity/Assets')
 destination_grp_folder = os.path.join(source_dir, 'raw_grp_meshes')
 destination_single_folder = os.path.join(source_dir, 'raw_single_meshes')
 
-def copy_fbx_files():
-    # Ensure the destination folder exists
-    if not os.path.exists(destination_grp_folder):
-        os.makedirs(destination_grp_folder)
+# "copy" duplicates the files, "hardlink" and "symlink" only add directory entries, which takes no time and space
+stage_modes = ["copy", "hardlink", "symlink"]
 
-    if not os.path.exists(destination_single_folder):
-        os.makedirs(destination_single_folder)
+manifest_file_path = os.path.join(source_dir, 'raw_meshes_manifest.json')
 
-    # Walk through the source folder and its subdirectories
+# Bump when the staged layout changes, to stage everything again
+manifest_version = 1
+
+
+def get_stage_files() -> Dict[str, str]:
+    # Every destination file with its source: each FBX gets its own directory with the PNG files next to it.
+    # A later FBX with the same name replaces an earlier one, as the sequential copy did
+    stage_files = {}
     for root, dirs, files in os.walk(source_folder):
+        png_files = [png_file for png_file in files if png_file.endswith('.png')]
         for fbx_file in files:
             if fbx_file.endswith('.fbx') and not fbx_file.endswith('shards_grp.fbx'):
-                # Construct full file paths
-                source_fbx_file = os.path.join(root, fbx_file)
                 destination_dir_name = fbx_file.split('.')[0]
                 if fbx_file.endswith('grp.fbx'):
                     destination_dir = os.path.join(destination_grp_folder, destination_dir_name)
                 else:
                     destination_dir = os.path.join(destination_single_folder, destination_dir_name)
-                if not os.path.exists(destination_dir):
-                    os.makedirs(destination_dir)
-                destination_fbx_file = os.path.join(destination_dir, fbx_file)
-                
-                # Copy the file to the destination folder
-                shutil.copy2(source_fbx_file, destination_fbx_file)
-                print(f'Copied: {source_fbx_file} to {destination_fbx_file}')
-
-                for png_file in files:
-                    if png_file.endswith('.png'):
-                        # Construct full file paths
-                        source_png_file = os.path.join(root, png_file)
-                        destination_png_file = os.path.join(destination_dir, png_file)
-
-                        # Copy the file to the destination folder
-                        shutil.copy2(source_png_file, destination_png_file)
-                        print(f'Copied: {source_png_file} to {destination_png_file}')
-
-copy_fbx_files()
+                for file in [fbx_file] + png_files:
+                    destination_file = os.path.join(destination_dir, file)
+                    stage_files.pop(destination_file, None)
+                    stage_files[destination_file] = os.path.join(root, file)
+    return stage_files
+
+
+def get_source_stat(source_file: str) -> Dict[str, int]:
+    stat = os.stat(source_file)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_manifest() -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(manifest_file_path):
+        return {}
+    try:
+        with open(manifest_file_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != manifest_version:
+        return {}
+    return manifest["files"]
+
+
+def save_manifest(files: Dict[str, Dict[str, Any]]) -> None:
+    tmp_manifest_file_path = f"{manifest_file_path}.{os.getpid()}.tmp"
+    with open(tmp_manifest_file_path, "w") as f:
+        json.dump({"version": manifest_version, "files": files}, f)
+    os.replace(tmp_manifest_file_path, manifest_file_path)
+
+
+def is_staged(destination_file: str, source_file: str, source_stat: Dict[str, int], mode: str,
+              manifest_entry: Optional[Dict[str, Any]]) -> bool:
+    return (manifest_entry is not None
+            and manifest_entry["source"] == source_file
+            and manifest_entry["mode"] == mode
+            and manifest_entry["stat"] == source_stat
+            and os.path.lexists(destination_file))
+
+
+def stage_file(source_file: str, destination_file: str, mode: str) -> str:
+    # Staged under a temporary name and moved in place, so that an interrupted run never leaves half a file.
+    # Returns the mode that was used, a hard link across file systems falls back to a copy
+    if mode == "hardlink" and os.path.exists(destination_file) and os.path.samefile(source_file, destination_file):
+        # Already a link to the source, renaming a link onto the same file would do nothing
+        return mode
+    tmp_destination_file = f"{destination_file}.{os.getpid()}.tmp"
+    if os.path.lexists(tmp_destination_file):
+        os.remove(tmp_destination_file)
+    if mode == "hardlink":
+        try:
+            os.link(source_file, tmp_destination_file)
+        except OSError:
+            mode = "copy"
+    if mode == "symlink":
+        os.symlink(os.path.abspath(source_file), tmp_destination_file)
+    elif mode == "copy":
+        shutil.copy2(source_file, tmp_destination_file)
+    os.replace(tmp_destination_file, destination_file)
+    return mode
+
+
+def copy_fbx_files(mode: str = "copy", workers: int = 8, force: bool = False) -> None:
+    if mode not in stage_modes:
+        raise ValueError(f"Unknown mode {mode}, choose from {', '.join(stage_modes)}")
+
+    # Ensure the destination folder exists
+    if not os.path.exists(destination_grp_folder):
+        os.makedirs(destination_grp_folder)
+
+    if not os.path.exists(destination_single_folder):
+        os.makedirs(destination_single_folder)
+
+    stage_files = get_stage_files()
+    manifest = {} if force else load_manifest()
+    new_manifest = {}
+    jobs: List[Tuple[str, str]] = []
+    for destination_file, source_file in stage_files.items():
+        source_stat = get_source_stat(source_file)
+        manifest_entry = manifest.get(destination_file)
+        if is_staged(destination_file, source_file, source_stat, mode, manifest_entry):
+            new_manifest[destination_file] = manifest_entry
+            continue
+        new_manifest[destination_file] = {"source": source_file, "mode": mode, "stat": source_stat}
+        jobs.append((source_file, destination_file))
+
+    for destination_dir in sorted({os.path.dirname(destination_file) for _, destination_file in jobs}):
+        os.makedirs(destination_dir, exist_ok=True)
+
+    # The staging is bound by file system calls, which release the GIL, so threads run them in parallel
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        used_modes = list(executor.map(lambda job: stage_file(job[0], job[1], mode), jobs))
+    num_copied = sum(used_mode == "copy" for used_mode in used_modes)
+    if mode == "hardlink" and num_copied > 0:
+        print(f"Copied {num_copied} files that could not be hard linked")
+
+    save_manifest(new_manifest)
+    print(f"Staged {len(jobs)} of {len(stage_files)} files with {mode}, "
+          f"{len(stage_files) - len(jobs)} were unchanged")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage the FBX and PNG files of ai2thor for extract_objects.py")
+    parser.add_argument("--mode", type=str, default="copy", choices=stage_modes,
+                        help="Copy the files or link them, links need no time and space")
+    parser.add_argument("--workers", type=int, default=8, help="Number of threads that stage the files")
+    parser.add_argument("--force", action="store_true", help="Stage the files that are in the manifest again")
+    args = parser.parse_args()
+    copy_fbx_files(args.mode, args.workers, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import json
+from typing import Any, Dict, List, Optional
+import numpy
+
+
+def get_vec(point: Optional[Dict[str, float]]) -> numpy.ndarray:
+    if point is None:
+        return numpy.zeros(3)
+    return numpy.array([point["x"], point["y"], point["z"]], dtype=float)
+
+
+class Room:
+    __slots__ = ("id", "room_type")
+
+    def __init__(self, room: Dict[str, Any]):
+        self.id: str = room["id"]
+        self.room_type: str = room["roomType"]
+
+    @property
+    def body_name(self) -> str:
+        return f"{self.room_type}_{self.id.split('|')[-1]}"
+
+
+class Wall:
+    __slots__ = ("id", "index", "polygon", "key")
+
+    def __init__(self, wall: Dict[str, Any], index: int):
+        self.id: str = wall["id"]
+        self.index = index
+        # (4, 3) corners: bottom start, bottom end, top start, top end
+        self.polygon = numpy.array([get_vec(point) for point in wall["polygon"][:4]]).reshape(-1, 3)
+        # Both sides of a wall have their own id, but the same coordinates at the end of the id
+        self.key = ' '.join(self.id.split('|')[-4:])
+
+
+class Opening:
+    # A door or a window cut into one or two walls
+    __slots__ = ("id", "index", "asset_id", "asset_position", "hole_polygon", "wall0", "wall1")
+
+    def __init__(self, opening: Dict[str, Any], index: int):
+        self.id: str = opening.get("id", "")
+        self.index = index
+        self.asset_id: Optional[str] = opening.get("assetId")
+        self.asset_position = get_vec(opening.get("assetPosition"))
+        # (2, 3) corners of the hole: start at the bottom and end at the top, along the wall
+        self.hole_polygon = numpy.array([get_vec(point) for point in opening.get("holePolygon", [])]).reshape(-1, 3)
+        self.wall0: Optional[str] = opening.get("wall0")
+        self.wall1: Optional[str] = opening.get("wall1")
+
+
+class HouseObject:
+    __slots__ = ("id", "body_name", "asset_id", "position", "rotation", "children")
+
+    def __init__(self, obj: Dict[str, Any]):
+        self.id: str = obj["id"]
+        self.body_name = self.id.replace("|", "_").replace("_surface", "")
+        self.asset_id: Optional[str] = obj.get("assetId")
+        self.position = get_vec(obj.get("position"))
+        self.rotation = get_vec(obj.get("rotation"))
+        self.children = [HouseObject(child) for child in obj.get("children", [])]
+
+
+class House:
+    # Parsed once from house_N.json, with the walls indexed by id for the doors and windows that cut them
+    __slots__ = ("rooms", "walls", "doors", "windows", "objects", "wall_by_id")
+
+    def __init__(self, house: Dict[str, Any]):
+        self.rooms = [Room(room) for room in house.get("rooms", [])]
+        self.walls = [Wall(wall, index) for index, wall in enumerate(house.get("walls", []))]
+        self.doors = [Opening(door, index) for index, door in enumerate(house.get("doors", []))]
+        self.windows = [Opening(window, index) for index, window in enumerate(house.get("windows", []))]
+        self.objects = [HouseObject(obj) for obj in house.get("objects", [])]
+
+        self.wall_by_id = {wall.id: wall for wall in self.walls}
+
+    @classmethod
+    def from_file(cls, file_path: str) -> "House":
+        with open(file_path) as f:
+            return cls(json.load(f))
+
+    def get_walls_with_openings(self, openings: List[Opening]) -> Dict[str, List[Opening]]:
+        walls_with_openings: Dict[str, List[Opening]] = {}
+        for opening in openings:
+            for wall_id in [opening.wall0, opening.wall1]:
+                if wall_id is not None and wall_id in self.wall_by_id:
+                    walls_with_openings.setdefault(wall_id, []).append(opening)
+        return walls_with_openings
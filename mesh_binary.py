@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import argparse
+from typing import Dict, List, Optional, Tuple
+import numpy
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+# A mesh binary sits next to its STL and holds the welded mesh ready for MeshProperty, so that the importer
+# neither parses the STL nor converts it to USD. The file is a small JSON header followed by the raw arrays,
+# every array starts on a 64 byte boundary and is memory-mapped on reading.
+mesh_binary_extension = ".meshbin"
+
+mesh_binary_magic = b"PTMESH\0\0"
+
+# Bump when the content of the mesh binaries changes, older ones are ignored and written again
+mesh_binary_version = 1
+
+mesh_binary_alignment = 64
+
+# Flat normals per face or normals smoothed over the faces around every welded point, both faceVarying
+mesh_normals = ["face", "smooth"]
+
+stl_record_dtype = numpy.dtype([("normal", "<f4", (3,)),
+                                ("vertices", "<f4", (3, 3)),
+                                ("attribute", "<u2")])
+
+
+def get_mesh_binary_file_path(stl_file_path: str) -> str:
+    return f"{os.path.splitext(stl_file_path)[0]}{mesh_binary_extension}"
+
+
+def read_stl_triangles(stl_file_path: str) -> numpy.ndarray:
+    # (N, 3, 3) float32 vertices of the triangles of a binary or ASCII STL
+    file_size = os.path.getsize(stl_file_path)
+    if file_size >= 84:
+        with open(stl_file_path, "rb") as f:
+            f.seek(80)
+            num_triangles = int(numpy.frombuffer(f.read(4), dtype="<u4")[0])
+        if file_size == 84 + num_triangles * stl_record_dtype.itemsize:
+            if num_triangles == 0:
+                return numpy.zeros((0, 3, 3), dtype=numpy.float32)
+            records = numpy.memmap(stl_file_path, dtype=stl_record_dtype, mode="r", offset=84, shape=(num_triangles,))
+            return numpy.array(records["vertices"], dtype=numpy.float32)
+    with open(stl_file_path, "rb") as f:
+        vertices = [line.split()[1:4] for line in f.read().decode(errors="ignore").splitlines()
+                    if line.strip().startswith("vertex")]
+    return numpy.array(vertices, dtype=numpy.float32).reshape(-1, 3, 3)
+
+
+def weld_triangles(triangles: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    # Merge the corners with the same coordinates, returns the points and the (N, 3) face vertex indices
+    corners = numpy.ascontiguousarray(triangles.reshape(-1, 3), dtype=numpy.float32)
+    if len(corners) == 0:
+        return corners, numpy.zeros((0, 3), dtype=numpy.int32)
+    # -0.0 and 0.0 are the same point, but not the same bits
+    corners = corners + numpy.float32(0.0)
+    # The bits of the coordinates packed into two integer keys, which sort faster than the rows
+    corner_bits = corners.view(numpy.uint32).astype(numpy.uint64)
+    xy_keys = (corner_bits[:, 0] << numpy.uint64(32)) | corner_bits[:, 1]
+    z_keys = corner_bits[:, 2]
+    corner_order = numpy.lexsort((z_keys, xy_keys))
+    is_first = numpy.empty(len(corner_order), dtype=bool)
+    is_first[0] = True
+    is_first[1:] = ((xy_keys[corner_order[1:]] != xy_keys[corner_order[:-1]])
+                    | (z_keys[corner_order[1:]] != z_keys[corner_order[:-1]]))
+    # lexsort is stable, so every run of equal corners starts with the one that comes first in the triangles
+    first_corners = corner_order[is_first]
+    corner_groups = numpy.empty(len(corner_order), dtype=numpy.int64)
+    corner_groups[corner_order] = numpy.cumsum(is_first) - 1
+    # The points keep the order in which they first appear in the triangles
+    point_order = numpy.argsort(first_corners, kind="stable")
+    point_ids = numpy.empty_like(point_order)
+    point_ids[point_order] = numpy.arange(len(point_order))
+    points = corners[first_corners[point_order]]
+    return points, point_ids[corner_groups].reshape(-1, 3).astype(numpy.int32)
+
+
+def normalize(vectors: numpy.ndarray) -> numpy.ndarray:
+    # Zero vectors stay zero
+    lengths = numpy.linalg.norm(vectors, axis=1, keepdims=True)
+    return numpy.divide(vectors, lengths, out=numpy.zeros_like(vectors), where=lengths > 0)
+
+
+def get_face_normals(points: numpy.ndarray, face_vertex_indices: numpy.ndarray) -> numpy.ndarray:
+    # One flat normal per face corner, degenerate faces get a zero normal
+    triangles = points[face_vertex_indices]
+    normals = numpy.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    return numpy.repeat(normalize(normals), 3, axis=0).astype(numpy.float32)
+
+
+def get_smooth_normals(points: numpy.ndarray, face_vertex_indices: numpy.ndarray) -> numpy.ndarray:
+    # The normal of every point is the area weighted sum of the normals of its faces, given to each of its corners
+    triangles = points[face_vertex_indices].astype(numpy.float64)
+    face_normals = numpy.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    corner_points = face_vertex_indices.ravel()
+    point_normals = numpy.stack([numpy.bincount(corner_points, weights=numpy.repeat(face_normals[:, axis], 3),
+                                                minlength=len(points))
+                                 for axis in range(3)], axis=1)
+    return normalize(point_normals)[corner_points].astype(numpy.float32)
+
+
+def get_normals(points: numpy.ndarray, face_vertex_indices: numpy.ndarray, normals: str = "face") -> numpy.ndarray:
+    if normals not in mesh_normals:
+        raise ValueError(f"Unknown normals {normals}, choose from {', '.join(mesh_normals)}")
+    if normals == "smooth":
+        return get_smooth_normals(points, face_vertex_indices)
+    return get_face_normals(points, face_vertex_indices)
+
+
+def load_stl_mesh(stl_file_path: str, normals: str = "face") -> Dict[str, numpy.ndarray]:
+    # The welded mesh of an STL with the arrays of MeshProperty, as read_mesh_binary returns it
+    points, face_vertex_indices = weld_triangles(read_stl_triangles(stl_file_path))
+    return {
+        "points": points,
+        "normals": get_normals(points, face_vertex_indices, normals),
+        "face_vertex_counts": numpy.full(len(face_vertex_indices), 3, dtype=numpy.int32),
+        "face_vertex_indices": face_vertex_indices
+    }
+
+
+def get_source_stat(stl_file_path: str) -> Dict[str, int]:
+    stat = os.stat(stl_file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def write_mesh_binary(stl_file_path: str) -> str:
+    mesh_arrays = load_stl_mesh(stl_file_path)
+    arrays = {array_name: mesh_arrays[array_name] for array_name in ["points", "normals", "face_vertex_indices"]}
+
+    header = {"version": mesh_binary_version, "source": get_source_stat(stl_file_path), "arrays": {}}
+    # The offsets depend on the header size, which depends on the offsets, so the header gets a fixed size
+    header_size = 1024
+    offset = len(mesh_binary_magic) + 4 + header_size
+    for array_name, array in arrays.items():
+        offset += -offset % mesh_binary_alignment
+        header["arrays"][array_name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    header_bytes = json.dumps(header).encode()
+    if len(header_bytes) > header_size:
+        raise ValueError(f"Header of the mesh binary of {stl_file_path} is larger than {header_size} bytes")
+
+    mesh_binary_file_path = get_mesh_binary_file_path(stl_file_path)
+    tmp_mesh_binary_file_path = f"{mesh_binary_file_path}.{os.getpid()}.tmp"
+    with open(tmp_mesh_binary_file_path, "wb") as f:
+        f.write(mesh_binary_magic)
+        f.write(numpy.uint32(header_size).tobytes())
+        f.write(header_bytes.ljust(header_size))
+        for array_name, array in arrays.items():
+            f.seek(header["arrays"][array_name]["offset"])
+            f.write(numpy.ascontiguousarray(array).tobytes())
+    os.replace(tmp_mesh_binary_file_path, mesh_binary_file_path)
+    return mesh_binary_file_path
+
+
+def read_mesh_binary_header(stl_file_path: str) -> Optional[Dict]:
+    # The header of the mesh binary next to the STL, None if there is none or the STL changed since
+    try:
+        with open(get_mesh_binary_file_path(stl_file_path), "rb") as f:
+            if f.read(len(mesh_binary_magic)) != mesh_binary_magic:
+                return None
+            header_size = int(numpy.frombuffer(f.read(4), dtype="<u4")[0])
+            header = json.loads(f.read(header_size).decode())
+        if header["version"] != mesh_binary_version or header["source"] != get_source_stat(stl_file_path):
+            return None
+    except (OSError, ValueError, KeyError, IndexError):
+        return None
+    return header
+
+
+def read_mesh_binary(stl_file_path: str) -> Optional[Dict[str, numpy.ndarray]]:
+    # The memory-mapped arrays of the mesh binary next to the STL, None if there is none or the STL changed since
+    mesh_binary_file_path = get_mesh_binary_file_path(stl_file_path)
+    header = read_mesh_binary_header(stl_file_path)
+    if header is None:
+        return None
+    try:
+        arrays = {}
+        for array_name, array_info in header["arrays"].items():
+            shape = tuple(array_info["shape"])
+            if 0 in shape:
+                arrays[array_name] = numpy.zeros(shape, dtype=array_info["dtype"])
+            else:
+                arrays[array_name] = numpy.memmap(mesh_binary_file_path, dtype=array_info["dtype"], mode="r",
+                                                  offset=array_info["offset"], shape=shape)
+    except (OSError, ValueError, KeyError, IndexError):
+        return None
+    arrays["face_vertex_counts"] = numpy.full(len(arrays["face_vertex_indices"]), 3, dtype=numpy.int32)
+    return arrays
+
+
+def get_triangle_count(stl_file_path: str) -> int:
+    # The triangles of the welded mesh without reading it: welding keeps every triangle, so the count is in the
+    # header of the mesh binary or of a binary STL, only an ASCII STL is read
+    header = read_mesh_binary_header(stl_file_path)
+    if header is not None and "face_vertex_indices" in header["arrays"]:
+        return int(header["arrays"]["face_vertex_indices"]["shape"][0])
+    file_size = os.path.getsize(stl_file_path)
+    if file_size >= 84:
+        with open(stl_file_path, "rb") as f:
+            f.seek(80)
+            num_triangles = int(numpy.frombuffer(f.read(4), dtype="<u4")[0])
+        if file_size == 84 + num_triangles * stl_record_dtype.itemsize:
+            return num_triangles
+    return len(read_stl_triangles(stl_file_path))
+
+
+def get_stl_files(root_dir: str) -> List[str]:
+    stl_files = []
+    for asset_tree in ["grp_objects", "single_objects"]:
+        for root, _, files in os.walk(os.path.join(root_dir, asset_tree)):
+            for file in files:
+                if file.endswith(".stl"):
+                    stl_files.append(os.path.join(root, file))
+    return sorted(stl_files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the mesh binaries of the extracted STL files")
+    parser.add_argument("--root_dir", type=str, default=source_dir,
+                        help="Directory of grp_objects and single_objects")
+    parser.add_argument("--force", action="store_true", help="Write the mesh binaries that are up to date again")
+    args = parser.parse_args()
+
+    stl_files = get_stl_files(args.root_dir)
+    num_written = 0
+    for stl_file_path in stl_files:
+        if not args.force and read_mesh_binary(stl_file_path) is not None:
+            continue
+        write_mesh_binary(stl_file_path)
+        num_written += 1
+    print(f"{len(stl_files)} STL files, {num_written} mesh binaries written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import hashlib
+import json
+import argparse
+from typing import Any, Dict, Optional
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+default_mesh_cache_dir = os.path.join(source_dir, "mesh_cache")
+
+default_mesh_cache_size = 2 * 1024 ** 3
+
+mesh_cache_version = 1
+
+
+def get_file_hash(file_path: str) -> str:
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class MeshCache:
+    # Every entry is a directory <cache_dir>/<key>/ that holds the converted mesh file under its original
+    # name, so that meshes read from the cache keep the same mesh file names as freshly converted ones.
+    # Files are written under a temporary name and moved in place with os.replace, and entries are
+    # evicted by renaming them away before deleting them, so several processes can share one cache.
+    # The mtime of an entry directory is its last use, which drives the LRU eviction.
+
+    def __init__(self, cache_dir: str = default_mesh_cache_dir, max_size: int = default_mesh_cache_size):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        # The size of the cache as this process knows it, the entries are only walked on the first put and when
+        # this crosses max_size. Other processes adding entries are seen at that walk
+        self._size: Optional[int] = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_key(self, mesh_file_path: str, settings: Dict[str, Any]) -> str:
+        sha = hashlib.sha256()
+        sha.update(get_file_hash(mesh_file_path).encode())
+        sha.update(json.dumps({"version": mesh_cache_version, **settings}, sort_keys=True).encode())
+        return sha.hexdigest()
+
+    def get(self, key: str, file_name: str) -> Optional[str]:
+        entry_dir = os.path.join(self.cache_dir, key)
+        file_path = os.path.join(entry_dir, file_name)
+        if not os.path.exists(file_path):
+            return None
+        try:
+            os.utime(entry_dir)
+        except OSError:
+            return None
+        return file_path
+
+    def put(self, key: str, src_file_path: str) -> Optional[str]:
+        entry_dir = os.path.join(self.cache_dir, key)
+        file_path = os.path.join(entry_dir, os.path.basename(src_file_path))
+        tmp_file_path = f"{file_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(entry_dir, exist_ok=True)
+            shutil.copyfile(src_file_path, tmp_file_path)
+            os.replace(tmp_file_path, file_path)
+        except OSError:
+            # The entry was evicted by another process while writing, the mesh is just not cached
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+            return None
+        if self._size is None:
+            self._size = self.get_size()
+        else:
+            try:
+                self._size += os.path.getsize(file_path)
+            except OSError:
+                pass
+        if self._size > self.max_size:
+            self.evict()
+        return file_path
+
+    def get_entries(self) -> Dict[str, os.stat_result]:
+        entries = {}
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_dir() and not entry.name.startswith("."):
+                try:
+                    entries[entry.path] = entry.stat()
+                except FileNotFoundError:
+                    continue
+        return entries
+
+    def get_entry_size(self, entry_dir: str) -> int:
+        size = 0
+        for root, _, files in os.walk(entry_dir):
+            for file in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, file))
+                except FileNotFoundError:
+                    continue
+        return size
+
+    def get_size(self) -> int:
+        return sum(self.get_entry_size(entry_dir) for entry_dir in self.get_entries())
+
+    def evict(self) -> None:
+        entries = self.get_entries()
+        sizes = {entry_dir: self.get_entry_size(entry_dir) for entry_dir in entries}
+        total_size = sum(sizes.values())
+        for entry_dir in sorted(entries, key=lambda entry_dir: entries[entry_dir].st_mtime_ns):
+            if total_size <= self.max_size:
+                break
+            trash_dir = os.path.join(self.cache_dir, f".trash_{os.getpid()}_{os.path.basename(entry_dir)}")
+            try:
+                os.rename(entry_dir, trash_dir)
+            except OSError:
+                continue
+            shutil.rmtree(trash_dir, ignore_errors=True)
+            total_size -= sizes[entry_dir]
+        self._size = total_size
+
+    def clear(self) -> None:
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._size = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the mesh conversion cache")
+    parser.add_argument("--cache_dir", type=str, default=default_mesh_cache_dir, help="Mesh cache directory")
+    parser.add_argument("--clear", action="store_true", help="Remove all cached meshes")
+    args = parser.parse_args()
+
+    mesh_cache = MeshCache(args.cache_dir)
+    if args.clear:
+        mesh_cache.clear()
+    entries = mesh_cache.get_entries()
+    total_size = mesh_cache.get_size()
+    print(f"{args.cache_dir}: {len(entries)} meshes, {total_size / 1024 ** 2:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import enum
+import tempfile
+from typing import Any, Dict, Optional
+import numpy
+from pxr import Usd, UsdGeom, Sdf, Gf, Vt
+
+# A small part of the multiverse_parser API, as far as procthor_to_scene.py uses it, written straight into a USD
+# stage. It lets the importer run without Multiverse (e.g. in benchmark_procthor_importer.py). The exporters, the USD
+# importer and the mesh conversion with Blender are not part of it and raise a RuntimeError that says what to use
+# instead.
+
+
+class Configuration:
+    # The defaults of the Multiverse configuration
+    model_name = ""
+    root_name = None
+    fixed_base = None
+    with_physics = True
+    with_visual = True
+    with_collision = True
+    inertia_source = None
+    default_rgba = numpy.array([0.9, 0.9, 0.9, 1.0])
+
+    def __init__(self, **kwargs: Any):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class GeomType(enum.Enum):
+    CUBE = 0
+    SPHERE = 1
+    CYLINDER = 2
+    CAPSULE = 3
+    MESH = 4
+
+
+class GeomProperty:
+    def __init__(self, geom_type: GeomType, is_visible: bool = True, is_collidable: bool = True):
+        self.geom_type = geom_type
+        self.is_visible = is_visible
+        self.is_collidable = is_collidable
+
+
+class MeshProperty:
+    def __init__(self, points: numpy.ndarray, normals: numpy.ndarray, face_vertex_counts: numpy.ndarray,
+                 face_vertex_indices: numpy.ndarray, mesh_file_name: Optional[str] = None):
+        self.points = numpy.asarray(points)
+        self.normals = numpy.asarray(normals)
+        self.face_vertex_counts = numpy.asarray(face_vertex_counts)
+        self.face_vertex_indices = numpy.asarray(face_vertex_indices)
+        self.mesh_file_name = mesh_file_name
+
+    @classmethod
+    def from_mesh_file_path(cls, mesh_file_path: str, mesh_path: Sdf.Path) -> "MeshProperty":
+        mesh = UsdGeom.Mesh(Usd.Stage.Open(mesh_file_path).GetPrimAtPath(mesh_path))
+        normals = mesh.GetNormalsAttr().Get()
+        return cls(points=numpy.array(mesh.GetPointsAttr().Get()),
+                   normals=numpy.array(normals) if normals is not None else numpy.zeros((0, 3)),
+                   face_vertex_counts=numpy.array(mesh.GetFaceVertexCountsAttr().Get()),
+                   face_vertex_indices=numpy.array(mesh.GetFaceVertexIndicesAttr().Get()),
+                   mesh_file_name=os.path.splitext(os.path.basename(mesh_file_path))[0])
+
+
+def set_xform_transform(xformable: UsdGeom.Xformable, pos: Optional[numpy.ndarray], quat: Optional[numpy.ndarray],
+                        scale: Optional[numpy.ndarray]) -> None:
+    # The quaternion in the order the importer hands it over, x y z w as scipy returns it
+    xformable.ClearXformOpOrder()
+    if pos is not None:
+        xformable.AddTranslateOp().Set(Gf.Vec3d(*[float(value) for value in pos]))
+    if quat is not None:
+        xformable.AddOrientOp(UsdGeom.XformOp.PrecisionDouble).Set(
+            Gf.Quatd(float(quat[3]), Gf.Vec3d(*[float(value) for value in quat[:3]])))
+    if scale is not None:
+        xformable.AddScaleOp().Set(Gf.Vec3f(*[float(value) for value in scale]))
+
+
+class GeomBuilder:
+    def __init__(self, stage: Usd.Stage, geom_path: Sdf.Path, geom_property: GeomProperty):
+        self.geom_property = geom_property
+        if geom_property.geom_type == GeomType.CUBE:
+            self.gprim = UsdGeom.Cube.Define(stage, geom_path)
+        elif geom_property.geom_type == GeomType.SPHERE:
+            self.gprim = UsdGeom.Sphere.Define(stage, geom_path)
+        elif geom_property.geom_type == GeomType.CYLINDER:
+            self.gprim = UsdGeom.Cylinder.Define(stage, geom_path)
+        elif geom_property.geom_type == GeomType.CAPSULE:
+            self.gprim = UsdGeom.Capsule.Define(stage, geom_path)
+        else:
+            self.gprim = UsdGeom.Xform.Define(stage, geom_path)
+        if not geom_property.is_visible:
+            self.gprim.CreateVisibilityAttr(UsdGeom.Tokens.invisible)
+
+    def set_transform(self, pos: Optional[numpy.ndarray] = None, quat: Optional[numpy.ndarray] = None,
+                      scale: Optional[numpy.ndarray] = None) -> None:
+        set_xform_transform(self.gprim, pos, quat, scale)
+
+    def add_mesh(self, mesh_name: str, mesh_property: MeshProperty) -> UsdGeom.Mesh:
+        # The mesh is written inline, Multiverse writes a mesh file per mesh_file_name and references it
+        mesh = UsdGeom.Mesh.Define(self.gprim.GetPrim().GetStage(), self.gprim.GetPath().AppendChild(mesh_name))
+        mesh.CreatePointsAttr(Vt.Vec3fArray.FromNumpy(
+            numpy.ascontiguousarray(mesh_property.points, dtype=numpy.float32).reshape(-1, 3)))
+        mesh.CreateNormalsAttr(Vt.Vec3fArray.FromNumpy(
+            numpy.ascontiguousarray(mesh_property.normals, dtype=numpy.float32).reshape(-1, 3)))
+        mesh.SetNormalsInterpolation(UsdGeom.Tokens.faceVarying)
+        mesh.CreateFaceVertexCountsAttr(Vt.IntArray.FromNumpy(
+            numpy.ascontiguousarray(mesh_property.face_vertex_counts, dtype=numpy.int32).ravel()))
+        mesh.CreateFaceVertexIndicesAttr(Vt.IntArray.FromNumpy(
+            numpy.ascontiguousarray(mesh_property.face_vertex_indices, dtype=numpy.int32).ravel()))
+        return mesh
+
+
+class BodyBuilder:
+    def __init__(self, stage: Usd.Stage, body_path: Sdf.Path):
+        self.xform = UsdGeom.Xform.Define(stage, body_path)
+        self.geom_builders: Dict[str, GeomBuilder] = {}
+
+    def set_transform(self, pos: Optional[numpy.ndarray] = None, quat: Optional[numpy.ndarray] = None,
+                      scale: Optional[numpy.ndarray] = None) -> None:
+        set_xform_transform(self.xform, pos, quat, scale)
+
+    def add_geom(self, geom_name: str, geom_property: GeomProperty) -> GeomBuilder:
+        # A geom added again under the same name is the one that exists, as in Multiverse
+        if geom_name not in self.geom_builders:
+            self.geom_builders[geom_name] = GeomBuilder(self.xform.GetPrim().GetStage(),
+                                                        self.xform.GetPath().AppendChild(geom_name), geom_property)
+        return self.geom_builders[geom_name]
+
+
+class WorldBuilder:
+    def __init__(self, usd_file_path: str):
+        self.stage = Usd.Stage.CreateNew(usd_file_path)
+        UsdGeom.SetStageUpAxis(self.stage, UsdGeom.Tokens.z)
+        self.body_builders: Dict[str, BodyBuilder] = {}
+
+    def add_body(self, body_name: str, parent_body_name: Optional[str] = None) -> BodyBuilder:
+        if body_name in self.body_builders:
+            return self.body_builders[body_name]
+        if parent_body_name is None:
+            body_path = Sdf.Path.absoluteRootPath.AppendChild(body_name)
+        elif parent_body_name in self.body_builders:
+            body_path = self.body_builders[parent_body_name].xform.GetPath().AppendChild(body_name)
+        else:
+            raise ValueError(f"Parent body {parent_body_name} of {body_name} not found")
+        body_builder = BodyBuilder(self.stage, body_path)
+        if parent_body_name is None:
+            self.stage.SetDefaultPrim(body_builder.xform.GetPrim())
+        self.body_builders[body_name] = body_builder
+        return body_builder
+
+
+class Factory:
+    def __init__(self, file_path: str, config: Configuration):
+        self.file_path = file_path
+        self.config = config
+        self.tmp_dir = tempfile.mkdtemp(prefix="multiverse_stand_in_")
+        self.tmp_usd_file_path = os.path.join(self.tmp_dir, f"{os.path.splitext(os.path.basename(file_path))[0]}.usda")
+
+    def import_mesh(self, mesh_file_path: str, merge_mesh: bool = False) -> Any:
+        raise RuntimeError(f"The multiverse_parser stand-in cannot convert {mesh_file_path}, use the mesh binaries or "
+                           f"--stl_loader=numpy, or install Multiverse with Blender")
+
+    def save_tmp_model(self, usd_file_path: str) -> None:
+        # The world builder keeps its stage open, so the layer found here has everything that was added
+        layer = Sdf.Layer.FindOrOpen(self.tmp_usd_file_path)
+        os.makedirs(os.path.dirname(os.path.abspath(usd_file_path)), exist_ok=True)
+        if not layer.Export(usd_file_path):
+            raise RuntimeError(f"Failed to save {self.tmp_usd_file_path} to {usd_file_path}")
+
+
+class UsdImporter(Factory):
+    def __init__(self, file_path: str, *args: Any, **kwargs: Any):
+        raise RuntimeError(f"The multiverse_parser stand-in cannot import {file_path}, use --formats with at most one "
+                           f"of urdf and mjcf or install Multiverse")
+
+
+class MjcfExporter:
+    def __init__(self, file_path: str, factory: Factory):
+        raise RuntimeError(f"The multiverse_parser stand-in cannot export {file_path}, use --formats=usd "
+                           f"or install Multiverse")
+
+
+class UrdfExporter:
+    def __init__(self, file_path: str, factory: Factory):
+        raise RuntimeError(f"The multiverse_parser stand-in cannot export {file_path}, use --formats=usd "
+                           f"or install Multiverse")
+
+
+def install(force: bool = False) -> bool:
+    # Registers this module as multiverse_parser if Multiverse is not installed, or always with force.
+    # Has to run before procthor_to_scene is imported, returns whether the stand-in is used
+    if not force:
+        try:
+            import multiverse_parser
+            return multiverse_parser is sys.modules[__name__]
+        except ImportError:
+            pass
+    sys.modules["multiverse_parser"] = sys.modules[__name__]
+    return True
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+source_dir = os.path.dirname(os.path.realpath(__file__))
+
+pipeline_state_file_name = ".pipeline_state.json"
+
+usd_formats = [".usda", ".usdc"]
+
+# The scripts a stage runs and every module they import, a change in any of them runs the stage again
+procthor_to_scene_scripts = ["procthor_to_scene.py", "house_model.py", "wall_geometry.py", "asset_index.py",
+                             "mesh_cache.py", "share_meshes.py", "mesh_binary.py", "collision_mesh.py"]
+
+post_process_usd_scripts = ["post_process_usd.py", "semantic_tagging.py", "clean_up_usd.py", "usd_layer_edit.py"]
+
+
+class Stage:
+    # Stages of a house are given in dependency order, a stage runs only if all its deps ran or were skipped
+
+    def __init__(self, name: str, command: List[str], inputs: List[str], outputs: List[str],
+                 deps: Optional[List[str]] = None, signatures: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.command = command
+        self.inputs = inputs
+        self.outputs = outputs
+        self.deps = deps if deps is not None else []
+        # Inputs that are not single files (e.g. the asset trees), compared like the hashes of the input files
+        self.signatures = signatures if signatures is not None else {}
+
+
+class FileHasher:
+    # Content hashes are kept with the size and mtime of the file, a file is only hashed again when those change
+
+    def __init__(self, known_hashes: Dict[str, Dict[str, Any]]):
+        self.known_hashes = known_hashes
+
+    def get_hash(self, file_path: str) -> Optional[str]:
+        if not os.path.exists(file_path):
+            return None
+        stat = os.stat(file_path)
+        known_hash = self.known_hashes.get(file_path)
+        if (known_hash is not None
+                and known_hash["size"] == stat.st_size
+                and known_hash["mtime_ns"] == stat.st_mtime_ns):
+            return known_hash["hash"]
+        sha = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        self.known_hashes[file_path] = {"hash": sha.hexdigest(), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        return sha.hexdigest()
+
+    def get_hashes(self, file_paths: List[str]) -> Dict[str, Optional[str]]:
+        return {file_path: self.get_hash(file_path) for file_path in file_paths}
+
+
+def get_asset_trees_signature() -> str:
+    # Changes when an asset is extracted again or added, see asset_index.get_trees_signature
+    from asset_index import get_trees_signature
+    return get_trees_signature(source_dir)
+
+
+def get_stages(house_number: int, tbox_usd: str, tbox_owl: str, store_dir: str, split: str = "train",
+               scene_format: str = ".usda", intermediate_format: str = ".usdc", mesh_format: str = ".usda",
+               asset_trees_signature: Optional[str] = None) -> List[Stage]:
+    house_name = f"house_{house_number}"
+    house_dir = os.path.join(source_dir, house_name)
+    house_json = os.path.join(source_dir, f"{house_name}.json")
+    in_usd = os.path.join(house_dir, f"{house_name}{scene_format}")
+    # Only read by the next stages, so they are written in the smaller and faster crate format by default
+    usd_semantic_reported = os.path.join(house_dir, f"{house_name}_semantic_reported{intermediate_format}")
+    usd_semantic_tagged = os.path.join(house_dir, f"{house_name}_semantic_tagged{intermediate_format}")
+    usd_semantic_tagged_flatten = os.path.join(house_dir, f"{house_name}_semantic_tagged_flatten.usda")
+    out_owl = os.path.join(house_dir, f"{house_name}.owl")
+
+    def script(file_name: str) -> str:
+        return os.path.join(source_dir, file_name)
+
+    return [
+        Stage("get_house",
+              [sys.executable, script("get_house.py"), f"--house={house_number}", f"--split={split}",
+               f"--store_dir={store_dir}"],
+              inputs=[script("get_house.py"), os.path.join(store_dir, f"{split}.idx"),
+                      os.path.join(store_dir, f"{split}.bin")],
+              outputs=[house_json]),
+        Stage("procthor_to_scene",
+              [sys.executable, script("procthor_to_scene.py"), f"--house={house_number}",
+               f"--usd_format={scene_format}", f"--mesh_format={mesh_format}"],
+              inputs=[house_json] + [script(file_name) for file_name in procthor_to_scene_scripts],
+              outputs=[in_usd, os.path.join(house_dir, f"{house_name}.urdf"),
+                       os.path.join(house_dir, f"{house_name}.xml")],
+              deps=["get_house"],
+              signatures={"asset_trees": asset_trees_signature if asset_trees_signature is not None
+                          else get_asset_trees_signature()}),
+        Stage("semantic_reporting",
+              ["semantic_reporting", f"--in_usd={in_usd}", f"--in_TBox_usd={tbox_usd}",
+               f"--out_usd={usd_semantic_reported}"],
+              inputs=[in_usd, tbox_usd],
+              outputs=[usd_semantic_reported],
+              deps=["procthor_to_scene"]),
+        Stage("post_process_usd",
+              [sys.executable, script("post_process_usd.py"), f"--in_usd={usd_semantic_reported}",
+               f"--in_TBox_usd={tbox_usd}", f"--out_ABox_usd={usd_semantic_tagged}",
+               f"--out_flatten_usd={usd_semantic_tagged_flatten}"],
+              inputs=[usd_semantic_reported, tbox_usd] + [script(file_name) for file_name in post_process_usd_scripts],
+              outputs=[usd_semantic_tagged, usd_semantic_tagged_flatten],
+              deps=["semantic_reporting"]),
+        Stage("usd_to_ABox",
+              ["usd_to_ABox", f"--in_usd={usd_semantic_tagged}", f"--in_owl={tbox_owl}", f"--out_owl={out_owl}"],
+              inputs=[usd_semantic_tagged, tbox_owl],
+              outputs=[out_owl],
+              deps=["post_process_usd"]),
+    ]
+
+
+def run_house(house_number: int, stages: List[Stage], force: bool = False) -> Dict[str, Any]:
+    house_dir = os.path.join(source_dir, f"house_{house_number}")
+    os.makedirs(house_dir, exist_ok=True)
+    log_dir = os.path.join(house_dir, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+
+    state_file_path = os.path.join(house_dir, pipeline_state_file_name)
+    state = {"stages": {}, "hashes": {}}
+    if os.path.exists(state_file_path):
+        try:
+            with open(state_file_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            pass
+    hasher = FileHasher(state.setdefault("hashes", {}))
+
+    results = {}
+    for stage in stages:
+        start_time = time.time()
+        result = {"status": "", "time": 0.0}
+        results[stage.name] = result
+
+        blocked_deps = [dep for dep in stage.deps if results.get(dep, {}).get("status") in ["failed", "blocked"]]
+        if len(blocked_deps) > 0:
+            result["status"] = "blocked"
+            result["error"] = f"Depends on {', '.join(blocked_deps)}"
+            continue
+
+        input_hashes = hasher.get_hashes(stage.inputs)
+        record = state["stages"].get(stage.name)
+        if (not force
+                and record is not None
+                and record["command"] == stage.command
+                and record["inputs"] == input_hashes
+                and record.get("signatures", {}) == stage.signatures
+                and hasher.get_hashes(stage.outputs) == record["outputs"]
+                and all(output_hash is not None for output_hash in record["outputs"].values())):
+            result["status"] = "skipped"
+            result["time"] = time.time() - start_time
+            continue
+
+        missing_inputs = [file_path for file_path, file_hash in input_hashes.items() if file_hash is None]
+        with open(os.path.join(log_dir, f"{stage.name}.log"), "w") as log_file:
+            try:
+                process = subprocess.run(stage.command, cwd=source_dir, stdout=log_file, stderr=subprocess.STDOUT)
+                return_code = process.returncode
+            except FileNotFoundError as e:
+                log_file.write(f"{e}\n")
+                return_code = -1
+        result["time"] = time.time() - start_time
+
+        output_hashes = hasher.get_hashes(stage.outputs)
+        missing_outputs = [file_path for file_path, file_hash in output_hashes.items() if file_hash is None]
+        if return_code != 0 or len(missing_outputs) > 0:
+            result["status"] = "failed"
+            result["error"] = f"Exit code {return_code}" if return_code != 0 \
+                else f"Missing outputs: {', '.join(missing_outputs)}"
+            if len(missing_inputs) > 0:
+                result["error"] += f", missing inputs: {', '.join(missing_inputs)}"
+            state["stages"].pop(stage.name, None)
+            continue
+
+        result["status"] = "ran"
+        # The stage may have produced its inputs (e.g. get_house writes the house the next stage reads)
+        state["stages"][stage.name] = {
+            "command": stage.command,
+            "inputs": hasher.get_hashes(stage.inputs),
+            "signatures": stage.signatures,
+            "outputs": output_hashes,
+            "time": result["time"]
+        }
+
+    tmp_state_file_path = f"{state_file_path}.tmp"
+    with open(tmp_state_file_path, "w") as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp_state_file_path, state_file_path)
+    return results
+
+
+def main():
+    from get_house import parse_houses
+    from get_house import default_store_dir
+    from get_house import splits
+
+    parser = argparse.ArgumentParser(description="Run the conversion pipeline and skip the stages that are up to date")
+    parser.add_argument("--houses", type=str, nargs="+", required=True,
+                        help="House numbers and ranges, e.g. 0-99 105 110,120")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of houses run in parallel")
+    parser.add_argument("--tbox_usd", type=str, default=os.path.join(source_dir, "ontology", "SOMA_DFL.usda"),
+                        help="Input TBox USD")
+    parser.add_argument("--tbox_owl", type=str, default=os.path.join(source_dir, "ontology", "SOMA_DFL.owl"),
+                        help="Input TBox OWL")
+    parser.add_argument("--store_dir", type=str, default=default_store_dir, help="Directory of the local house store")
+    parser.add_argument("--split", type=str, default="train", choices=splits, help="Dataset split of the houses")
+    parser.add_argument("--scene_format", type=str, default=".usda", choices=usd_formats,
+                        help="Format of the house USD")
+    parser.add_argument("--intermediate_format", type=str, default=".usdc", choices=usd_formats,
+                        help="Format of the USD files between the stages")
+    parser.add_argument("--mesh_format", type=str, default=".usda", choices=usd_formats,
+                        help="Format of the converted mesh files")
+    parser.add_argument("--force", action="store_true", help="Run every stage even if it is up to date")
+    parser.add_argument("--summary", type=str, default=os.path.join(source_dir, "pipeline_summary.json"),
+                        help="Output JSON with the status and time of every stage of every house")
+    args = parser.parse_args()
+
+    # Checked once here, every get_house stage would fail on a missing store
+    if not os.path.exists(os.path.join(args.store_dir, f"{args.split}.idx")):
+        sys.exit(f"House store of {args.split} not found in {args.store_dir}, run get_house.py --export first")
+
+    house_numbers = parse_houses(args.houses)
+    start_time = time.time()
+    # The asset trees are walked once for all houses
+    asset_trees_signature = get_asset_trees_signature()
+    summary = {}
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(run_house, house_number,
+                                   get_stages(house_number, args.tbox_usd, args.tbox_owl, args.store_dir,
+                                              args.split, args.scene_format, args.intermediate_format,
+                                              args.mesh_format, asset_trees_signature),
+                                   args.force): house_number
+                   for house_number in house_numbers}
+        for future in as_completed(futures):
+            house_number = futures[future]
+            results = future.result()
+            summary[house_number] = results
+            print(f"house_{house_number}: " + ", ".join(
+                f"{stage_name} {result['status']} ({result['time']:.2f}s)" for stage_name, result in results.items()))
+
+    failed_houses = [house_number for house_number, results in summary.items()
+                     if any(result["status"] in ["failed", "blocked"] for result in results.values())]
+    with open(args.summary, "w") as f:
+        json.dump({"total_time": time.time() - start_time,
+                   "failures": sorted(failed_houses),
+                   "houses": {f"house_{house_number}": summary[house_number] for house_number in sorted(summary)}},
+                  f, indent=4)
+    print(f"Ran {len(house_numbers)} houses, {len(failed_houses)} with failed stages "
+          f"in {time.time() - start_time:.2f}s, summary written to {args.summary}")
+    if len(failed_houses) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
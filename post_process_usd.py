@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import argparse
+from typing import Optional
+
+from semantic_tagging import load_sem_TBox, open_ABox_in_memory, sem_tag_stage
+from clean_up_usd import clean_up_layer
+
+
+def post_process(in_usd: str, in_TBox_usd: str,
+                 out_ABox_usd: Optional[str] = None,
+                 out_flatten_raw_usd: Optional[str] = None,
+                 out_flatten_usd: Optional[str] = None,
+                 rebuild_TBox_cache: bool = False) -> None:
+    # Semantic tagging, flattening and clean up on one stage kept in memory, only the requested outputs are written
+    in_usd = os.path.abspath(in_usd)
+    in_TBox_usd = os.path.abspath(in_TBox_usd)
+
+    start_time = time.time()
+    load_sem_TBox(in_TBox_usd, rebuild_TBox_cache)
+    stage_ABox = open_ABox_in_memory(in_usd)
+    sem_tag_stage(stage_ABox, in_usd, in_TBox_usd)
+    print(f"Tagged {in_usd} in {time.time() - start_time:.2f}s")
+    if out_ABox_usd is not None:
+        print(f"Save usd stage to {out_ABox_usd} that has semantic labels from {in_TBox_usd}")
+        stage_ABox.GetRootLayer().Export(out_ABox_usd)
+
+    if out_flatten_raw_usd is None and out_flatten_usd is None:
+        return None
+
+    start_time = time.time()
+    flatten_layer = stage_ABox.Flatten()
+    print(f"Flattened {in_usd} in {time.time() - start_time:.2f}s")
+    if out_flatten_raw_usd is not None:
+        print(f"Writing to {out_flatten_raw_usd}")
+        flatten_layer.Export(out_flatten_raw_usd)
+
+    if out_flatten_usd is not None:
+        start_time = time.time()
+        clean_up_layer(flatten_layer)
+        print(f"Cleaned up {in_usd} in {time.time() - start_time:.2f}s")
+        print(f"Writing to {out_flatten_usd}")
+        flatten_layer.Export(out_flatten_usd)
+
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic tagging, flattening and clean up in one process")
+    parser.add_argument("--in_usd", type=str, required=True, help="Input USD")
+    parser.add_argument("--in_TBox_usd", type=str, required=True, help="Input TBox USD")
+    parser.add_argument("--out_ABox_usd", type=str, required=False, help="Output ABox USD with semantic labels")
+    parser.add_argument("--out_flatten_raw_usd", type=str, required=False,
+                        help="Output flattened ABox USD before the clean up")
+    parser.add_argument("--out_flatten_usd", type=str, required=False, help="Output flattened and cleaned up USD")
+    parser.add_argument("--rebuild_TBox_cache", action="store_true",
+                        help="Compile the TBox again instead of loading it from the cache next to it")
+    args = parser.parse_args()
+    if args.out_ABox_usd is None and args.out_flatten_raw_usd is None and args.out_flatten_usd is None:
+        parser.error("Nothing to write, give at least one of --out_ABox_usd, --out_flatten_raw_usd, --out_flatten_usd")
+    post_process(args.in_usd, args.in_TBox_usd, args.out_ABox_usd, args.out_flatten_raw_usd, args.out_flatten_usd,
+                 args.rebuild_TBox_cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,32 +2,66 @@
 
 import os
 import re
-import json
-from typing import Dict, Any, List
+import sys
+import importlib.metadata
+from typing import Dict, Any, List, Optional, Tuple
 import numpy
 from scipy.spatial.transform import Rotation
 from multiverse_parser import Configuration, Factory
 from multiverse_parser import (WorldBuilder,
                                BodyBuilder,
+                               GeomBuilder,
                                GeomType, GeomProperty,
                                MeshProperty)
-from multiverse_parser import MjcfExporter, UrdfExporter
+from multiverse_parser import MjcfExporter, UrdfExporter, UsdImporter
 
-from pxr import Usd, UsdGeom
+from pxr import Usd, UsdGeom, Sdf, Tf
 import random
+import shutil
 import argparse
+import tempfile
+import multiprocessing
+
+from asset_index import AssetIndex
+from mesh_cache import MeshCache, default_mesh_cache_dir, default_mesh_cache_size
+from mesh_binary import (read_mesh_binary, load_stl_mesh, get_normals, get_face_normals, get_triangle_count,
+                         mesh_normals)
+from collision_mesh import (collision_modes, collision_mesh_version,
+                            default_collision_max_triangles, default_collision_triangle_budget,
+                            default_collision_max_hulls, default_box_tolerance,
+                            get_collision_meshes, get_collision_triangle_targets, fit_box,
+                            save_collision_meshes, load_collision_meshes)
+from share_meshes import share_meshes
+from house_model import House, HouseObject, Opening, Room
+from wall_geometry import get_wall_boxes, box_normals, box_face_vertex_counts, box_face_vertex_indices
 
 source_dir = os.path.dirname(os.path.realpath(__file__))
 
 ignore_objects = ["Painting"]
 
-ignore_walls = []
+asset_index = None
 
 include_doors = [
     "DoorwayDouble",
     "Doorway"
 ]
 
+export_formats = ["usd", "urdf", "mjcf"]
+
+# ASCII or binary crate USD, the crate is several times smaller and faster to read
+usd_formats = [".usda", ".usdc"]
+
+# "numpy" reads the STL files straight into MeshProperty, "import_mesh" converts them to USD first
+stl_loaders = ["numpy", "import_mesh"]
+
+# Walls as box primitives or as 8 point meshes
+wall_geoms = ["box", "mesh"]
+
+# Rotates the Y-up frame of ProcTHOR into the Z-up frame of the scene
+x_90_rotation_matrix = numpy.array([[1, 0, 0],
+                                    [0, 0, -1],
+                                    [0, 1, 0]])
+
 
 def snake_to_camel(snake_str):
     # Split the string by underscores, but keep numbers separated
@@ -46,26 +80,73 @@ def snake_to_camel(snake_str):
     return camel_str
 
 
+def collect_objects(objects: List[HouseObject]) -> List[HouseObject]:
+    # Flatten the objects and their children in the order they are imported,
+    # children are only imported for objects that have an asset
+    collected_objects = []
+    stack = list(reversed(objects))
+    while len(stack) > 0:
+        obj = stack.pop()
+        if any([ignore_object in obj.body_name for ignore_object in ignore_objects]):
+            continue
+        collected_objects.append(obj)
+        if obj.asset_id is not None:
+            stack += reversed(obj.children)
+    return collected_objects
+
+
+def get_object_poses(objects: List[HouseObject]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    # Compute the positions and quaternions of all objects in the Z-up frame in one pass
+    if len(objects) == 0:
+        return numpy.zeros((0, 3)), numpy.zeros((0, 4))
+
+    positions = numpy.array([obj.position for obj in objects])
+    rotations = numpy.array([obj.rotation for obj in objects])
+
+    rotation_mats = Rotation.from_euler("xyz", rotations, degrees=True).as_matrix()
+    positions = positions @ x_90_rotation_matrix.T
+    rotation_mats = x_90_rotation_matrix @ rotation_mats @ x_90_rotation_matrix.T
+    quats = Rotation.from_matrix(rotation_mats).as_quat()
+    return positions, quats
+
+
+def get_multiverse_parser_version() -> str:
+    # Part of the mesh cache key, a checkout without package metadata is told apart by the mtime of its module
+    try:
+        return importlib.metadata.version("multiverse_parser")
+    except importlib.metadata.PackageNotFoundError:
+        pass
+    multiverse_parser = sys.modules[Factory.__module__]
+    if hasattr(multiverse_parser, "__version__"):
+        return str(multiverse_parser.__version__)
+    return f"{multiverse_parser.__name__} {os.stat(multiverse_parser.__file__).st_mtime_ns}"
+
+
+def get_config_settings(config: Configuration) -> Dict[str, str]:
+    # The public values of the configuration that import_mesh converts the meshes with
+    return {name: str(getattr(config, name)) for name in dir(config)
+            if not name.startswith("_") and not callable(getattr(config, name))}
+
+
+def get_asset_index() -> AssetIndex:
+    global asset_index
+    if asset_index is None:
+        asset_index = AssetIndex.load(source_dir)
+    return asset_index
+
+
 def get_asset_paths(asset_name: str) -> List[str]:
     asset_name = asset_name.replace("Bathroom", "").replace("Photo", "").replace("Painting", "")
     print("Importing asset:", asset_name)
-    asset_path = os.path.join(source_dir, "grp_objects", asset_name)
+    index = get_asset_index()
 
-    asset_paths = []
-    if os.path.exists(asset_path):
-        asset_path = os.path.join(asset_path, f"{asset_name}.stl")
-        if not os.path.exists(asset_path):
+    if index.has_entry("grp_objects", asset_name):
+        asset_path = os.path.join(source_dir, "grp_objects", asset_name, f"{asset_name}.stl")
+        if not index.has_file(asset_path):
             raise FileNotFoundError("File not found:", asset_path)
-        asset_paths.append(asset_path)
-        return asset_paths
+        return [asset_path]
     else:
-        for root, dirs, files in os.walk(os.path.join(source_dir, "single_objects")):
-            for file in files:
-                file_name = os.path.splitext(file)[0]
-                if file.endswith('.stl') and asset_name in file_name:
-                    asset_path = os.path.join(root, file)
-                    if os.path.exists(asset_path):
-                        asset_paths.append(asset_path)
+        asset_paths = index.find_containing("single_objects", asset_name)
         if len(asset_paths) > 0:
             return asset_paths
 
@@ -76,33 +157,15 @@ def get_asset_paths(asset_name: str) -> List[str]:
             print(f"Asset not found: {asset_name}, try to remove the last numbers")
             return get_asset_paths(asset_new_name)
 
-        for root, dirs, files in os.walk(os.path.join(source_dir, "grp_objects")):
-            for file in files:
-                file_name = os.path.splitext(file)[0]
-                if file.endswith('.stl') and asset_name in file_name:
-                    asset_path = os.path.join(root, file)
-                    if os.path.exists(asset_path):
-                        asset_paths.append(asset_path)
+        asset_paths = index.find_containing("grp_objects", asset_name)
         if len(asset_paths) > 0:
             return asset_paths
 
-        for root, dirs, files in os.walk(os.path.join(source_dir, "grp_objects")):
-            for file in files:
-                file_name = os.path.splitext(file)[0]
-                if file.endswith('.stl') and file_name in asset_name:
-                    asset_path = os.path.join(root, file)
-                    if os.path.exists(asset_path):
-                        asset_paths.append(asset_path)
+        asset_paths = index.find_contained("grp_objects", asset_name)
         if len(asset_paths) > 0:
             return asset_paths
 
-        for root, dirs, files in os.walk(os.path.join(source_dir, "single_objects")):
-            for file in files:
-                file_name = os.path.splitext(file)[0]
-                if file.endswith('.stl') and file_name in asset_name:
-                    asset_path = os.path.join(root, file)
-                    if os.path.exists(asset_path):
-                        asset_paths.append(asset_path)
+        asset_paths = index.find_contained("single_objects", asset_name)
         if len(asset_paths) > 0:
             return asset_paths
 
@@ -111,282 +174,200 @@ def get_asset_paths(asset_name: str) -> List[str]:
         asset_new_name = asset_name[:-1]
         return get_asset_paths(asset_new_name)
 
-    return asset_paths
+    return []
+
+
+def add_box_geom(body_builder: BodyBuilder, geom_name: str, center: numpy.ndarray, half_extents: numpy.ndarray,
+                 quat: numpy.ndarray = numpy.array([0.0, 0.0, 0.0, 1.0])) -> GeomBuilder:
+    # A USD cube is 2 units wide, so it is scaled by the half extents. The MJCF exporter writes the scale as the box
+    # size, which MuJoCo reads as half extents, and the URDF exporter writes twice the scale, the full extents
+    geom_property = GeomProperty(geom_type=GeomType.CUBE,
+                                 is_visible=True,
+                                 is_collidable=True)
+    geom_builder = body_builder.add_geom(geom_name=geom_name, geom_property=geom_property)
+    geom_builder.set_transform(pos=center, quat=quat, scale=half_extents)
+    return geom_builder
 
 
 class ProcthorImporter(Factory):
-    def __init__(self, file_path: str, config: Configuration):
+    def __init__(self, file_path: str, config: Configuration, mesh_cache: Optional[MeshCache] = None,
+                 house_name: Optional[str] = None, cut_windows: bool = False, mesh_format: str = ".usda",
+                 use_mesh_binary: bool = True, stl_loader: str = "import_mesh", stl_normals: str = "face",
+                 collision: str = "visual",
+                 collision_max_triangles: int = default_collision_max_triangles,
+                 collision_triangle_budget: int = default_collision_triangle_budget,
+                 collision_max_hulls: int = default_collision_max_hulls,
+                 wall_geom: str = "mesh", box_assets: bool = False, box_tolerance: float = default_box_tolerance):
         super().__init__(file_path, config)
-        with open(file_path) as f:
-            house = json.load(f)
+        if mesh_format not in usd_formats:
+            raise ValueError(f"Unknown USD format {mesh_format}, choose from {', '.join(usd_formats)}")
+        if stl_loader not in stl_loaders:
+            raise ValueError(f"Unknown STL loader {stl_loader}, choose from {', '.join(stl_loaders)}")
+        if stl_normals not in mesh_normals:
+            raise ValueError(f"Unknown normals {stl_normals}, choose from {', '.join(mesh_normals)}")
+        if collision not in collision_modes:
+            raise ValueError(f"Unknown collision {collision}, choose from {', '.join(collision_modes)}")
+        if wall_geom not in wall_geoms:
+            raise ValueError(f"Unknown wall geom {wall_geom}, choose from {', '.join(wall_geoms)}")
+        if house_name is None:
+            house_name = os.path.splitext(os.path.basename(file_path))[0]
+        self.house_name = house_name
+        self.mesh_format = mesh_format
+        self.use_mesh_binary = use_mesh_binary
+        self.stl_loader = stl_loader
+        self.stl_normals = stl_normals
+        self.collision = collision
+        self.collision_max_triangles = collision_max_triangles
+        self.collision_triangle_budget = collision_triangle_budget
+        self.collision_max_hulls = collision_max_hulls
+        # The body, the name of the visual geom and the STL of every asset that gets collision geoms
+        self._collision_requests: List[Tuple[BodyBuilder, str, str]] = []
+        self._collision_mesh_cache: Dict[Tuple[str, int], List[Tuple[str, MeshProperty]]] = {}
+        self.wall_geom = wall_geom
+        self.box_assets = box_assets
+        self.box_tolerance = box_tolerance
+        self._box_cache: Dict[str, Optional[Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]]] = {}
+        self._ignore_walls = set()
+        self._disk_mesh_cache = mesh_cache
+        # A mesh converted with another configuration or another multiverse_parser is converted again
+        self._mesh_cache_settings = {"config": get_config_settings(config),
+                                     "multiverse_parser": get_multiverse_parser_version()}
+        self._mesh_cache: Dict[str, List[Tuple[str, MeshProperty]]] = {}
+        self.mesh_cache_hits = 0
+        self.mesh_cache_misses = 0
+        self.disk_mesh_cache_hits = 0
+        self.mesh_binary_hits = 0
+        self.stl_loads = 0
+        self.collision_triangles = 0
+        self.box_asset_geoms = 0
+
+        house = House.from_file(file_path)
 
         self._world_builder = WorldBuilder(usd_file_path=self.tmp_usd_file_path)
 
-        body_builder = self._world_builder.add_body(body_name=house_name)
+        body_builder = self._world_builder.add_body(body_name=self.house_name)
 
-        rooms = house["rooms"]
-        for room in rooms:
+        for room in house.rooms:
             self.import_room(room)
 
-        objects = house["objects"]
-        for obj in objects:
-            self.import_object(house_name, obj)
+        self.import_objects(house.objects)
 
-        walls = house["walls"]
-        doors = house["doors"]
         walls_with_door = {}
-        for door_id, door in enumerate(doors):
-            self.import_door(door, door_id, walls, walls_with_door)
+        for door in house.doors:
+            self.import_door(door, house, walls_with_door)
+
+        walls_with_window = {}
+        if cut_windows:
+            walls_with_window = house.get_walls_with_openings(house.windows)
 
-        for wall_id, wall in enumerate(walls):
-            wall_id_str = ' '.join(wall["id"].split('|')[-4:])
-            if wall_id_str in ignore_walls:
+        walls = []
+        for wall in house.walls:
+            if wall.key in self._ignore_walls:
                 continue
-            ignore_walls.append(wall_id_str)
-            self.import_wall(wall, wall_id, walls_with_door)
+            self._ignore_walls.add(wall.key)
+            walls.append(wall)
 
-    def import_room(self, room: Dict[str, Any]) -> None:
-        room_name = room["roomType"]
-        room_id = room["id"].split("|")[-1]
-        room_name = f"{room_name}_{room_id}"
-        self._world_builder.add_body(body_name=room_name, parent_body_name=house_name)
+        wall_boxes = get_wall_boxes(walls, walls_with_door, walls_with_window)
+        for wall, box_points in zip(walls, wall_boxes):
+            is_split = wall.id in walls_with_door or wall.id in walls_with_window
+            self.import_wall(wall.index, box_points, is_split)
 
-    def import_object(self, parent_body_name: str, obj: Dict[str, Any]) -> None:
-        body_name = obj["id"].replace("|", "_").replace("_surface", "")
+        if self.collision != "visual":
+            self.import_collision_geoms()
 
-        if any([ignore_object in body_name for ignore_object in ignore_objects]):
-            return None
+        if self.box_assets:
+            print(f"Box assets: {self.box_asset_geoms} geoms written as boxes, "
+                  f"{sum(box is not None for box in self._box_cache.values())} of {len(self._box_cache)} assets")
+        print(f"Mesh cache: {self.mesh_cache_hits} hits, {self.mesh_cache_misses} misses "
+              f"({self.mesh_binary_hits} of them read from mesh binaries, {self.stl_loads} from the STL files, "
+              f"{self.disk_mesh_cache_hits} from the disk cache)")
 
-        body_builder = self._world_builder.add_body(body_name=body_name, parent_body_name=house_name)
+    def import_room(self, room: Room) -> None:
+        self._world_builder.add_body(body_name=room.body_name, parent_body_name=self.house_name)
 
-        position = obj.get("position", {"x": 0, "y": 0, "z": 0})
-        position_vec = numpy.array([position["x"], position["y"], position["z"]])
-        rotation = obj.get("rotation", {"x": 0, "y": 0, "z": 0})
-        rotation_mat = Rotation.from_euler("xyz", [rotation["x"], rotation["y"], rotation["z"]],
-                                           degrees=True)
+    def import_objects(self, objects: List[HouseObject]) -> None:
+        objects = collect_objects(objects)
+        positions, quats = get_object_poses(objects)
+        for obj, position_vec, rotation_quat in zip(objects, positions, quats):
+            self.import_object(obj, position_vec, rotation_quat)
 
-        x_90_rotation_matrix = numpy.array([[1, 0, 0],
-                                            [0, 0, -1],
-                                            [0, 1, 0]])
-        position_vec = numpy.dot(x_90_rotation_matrix, position_vec)
-        rotation_quat = Rotation.from_matrix(
-            numpy.dot(x_90_rotation_matrix, numpy.dot(rotation_mat.as_matrix(), x_90_rotation_matrix.T))).as_quat()
+    def import_object(self, obj: HouseObject, position_vec: numpy.ndarray, rotation_quat: numpy.ndarray) -> None:
+        body_builder = self._world_builder.add_body(body_name=obj.body_name, parent_body_name=self.house_name)
 
         body_builder.set_transform(pos=position_vec, quat=rotation_quat)
 
-        if "assetId" not in obj:
+        if obj.asset_id is None:
             return None
 
-        asset_id = obj["assetId"]
+        asset_id = obj.asset_id
         asset_id = re.sub(r'(\d+)x(\d+)', r'\1_X_\2', asset_id)
         self.import_asset(body_builder, asset_id)
 
-        for child in obj.get("children", {}):
-            self.import_object(body_name, child)
-
-    def import_wall(self, wall: Dict[str, Any], wall_id: int, walls_with_door: Dict[str, Any]) -> None:
+    def import_wall(self, wall_id: int, box_points: numpy.ndarray, is_split: bool) -> None:
         body_name = f"Wall_{wall_id}"
-        body_builder = self._world_builder.add_body(body_name=body_name, parent_body_name=house_name)
+        body_builder = self._world_builder.add_body(body_name=body_name, parent_body_name=self.house_name)
 
-        x_90_rotation_matrix = numpy.array([[1, 0, 0],
-                                            [0, 0, -1],
-                                            [0, 1, 0]])
         rotation_quat = Rotation.from_matrix(x_90_rotation_matrix).as_quat()
 
         body_builder.set_transform(quat=rotation_quat)
 
-        point_1 = [wall["polygon"][0]["x"], wall["polygon"][0]["y"], wall["polygon"][0]["z"]]
-        point_2 = [wall["polygon"][1]["x"], wall["polygon"][1]["y"], wall["polygon"][1]["z"]]
-        point_3 = [wall["polygon"][2]["x"], wall["polygon"][2]["y"], wall["polygon"][2]["z"]]
-        point_4 = [wall["polygon"][3]["x"], wall["polygon"][3]["y"], wall["polygon"][3]["z"]]
-
-        points = numpy.array([point_1, point_2, point_3, point_4])
-
-        # Compute normal from faces
-        normal_1 = numpy.cross(points[1] - points[0], points[2] - points[0])
-        normal_2 = numpy.cross(points[3] - points[1], points[2] - points[1])
-        normal = (normal_1 + normal_2) / 2
-        normal /= numpy.linalg.norm(normal)
-
-        normals = numpy.array([[-1, 0, 0], [-1, 0, 0], [-1, 0, 0],
-                               [0, 1, 0], [0, 1, 0], [0, 1, 0],
-                               [1, 0, 0], [1, 0, 0], [1, 0, 0],
-                               [0, -1, 0], [0, -1, 0], [0, -1, 0],
-                               [0, 0, -1], [0, 0, -1], [0, 0, -1],
-                               [0, 0, 1], [0, 0, 1], [0, 0, 1],
-                               [-1, 0, 0], [-1, 0, 0], [-1, 0, 0],
-                               [0, 1, 0], [0, 1, 0], [0, 1, 0],
-                               [1, 0, 0], [1, 0, 0], [1, 0, 0],
-                               [0, -1, 0], [0, -1, 0], [0, -1, 0],
-                               [0, 0, -1], [0, 0, -1], [0, 0, -1],
-                               [0, 0, 1], [0, 0, 1], [0, 0, 1]])
-        face_vertex_counts = numpy.array([3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3])
-        face_vertex_indices = numpy.array(
-            [[1, 2, 0], [3, 6, 2],
-             [7, 4, 6], [5, 0, 4],
-             [6, 0, 2], [3, 5, 7],
-             [1, 3, 2], [3, 7, 6],
-             [7, 5, 4], [5, 1, 0],
-             [6, 4, 0], [3, 1, 5]])
-
-        if wall["id"] not in walls_with_door:
-            if normal[0] != 0:
-                x = point_1[0]
-                dx = -0.05 * normal[0]
-                y = (point_1[1] + point_3[1]) / 2.0
-                dy = (point_3[1] - point_1[1]) / 2.0
-                z = (point_1[2] + point_2[2]) / 2.0
-                dz = (point_2[2] - point_1[2]) / 2.0
-            elif normal[2] != 0:
-                x = (point_2[0] + point_3[0]) / 2.0
-                dx = (point_3[0] - point_2[0]) / 2.0
-                y = (point_1[1] + point_3[1]) / 2.0
-                dy = (point_3[1] - point_1[1]) / 2.0
-                z = point_1[2]
-                dz = -0.05 * normal[2]
-            else:
-                raise ValueError("Invalid normal")
-            points = numpy.array(
-                [[x - dx, y - dy, z - dz], [x - dx, y - dy, z + dz], [x - dx, y + dy, z - dz], [x - dx, y + dy, z + dz],
-                 [x + dx, y - dy, z - dz], [x + dx, y - dy, z + dz], [x + dx, y + dy, z - dz],
-                 [x + dx, y + dy, z + dz]])
-
-            mesh_file_name = f"Wall_{wall_id}"
+        for idx, points in enumerate(box_points):
+            suffix = f"_{idx}" if is_split else ""
+            if self.wall_geom == "box":
+                # The walls are axis aligned in the body frame
+                add_box_geom(body_builder, f"{body_name}{suffix}", (points.min(axis=0) + points.max(axis=0)) / 2,
+                             (points.max(axis=0) - points.min(axis=0)) / 2)
+                continue
+
+            mesh_file_name = f"Wall_{wall_id}{suffix}"
 
             mesh_property = MeshProperty(points=points,
-                                         normals=normals,
-                                         face_vertex_counts=face_vertex_counts,
-                                         face_vertex_indices=face_vertex_indices,
+                                         normals=box_normals,
+                                         face_vertex_counts=box_face_vertex_counts,
+                                         face_vertex_indices=box_face_vertex_indices,
                                          mesh_file_name=mesh_file_name)
             geom_property = GeomProperty(geom_type=GeomType.MESH,
                                          is_visible=True,
                                          is_collidable=True)
-            geom_builder = body_builder.add_geom(geom_name=f"{body_name}",
+            geom_builder = body_builder.add_geom(geom_name=f"{body_name}{suffix}",
                                                  geom_property=geom_property)
-            geom_builder.add_mesh(mesh_name=f"SM_{body_name}", mesh_property=mesh_property)
-
-        else:
-            door = walls_with_door[wall["id"]]
-            hole_height = door["holePolygon"][1]["y"]
-            if point_1[1] < point_3[1]:
-                y = [(point_1[1] + hole_height) / 2.0, (hole_height + point_3[1]) / 2.0,
-                     (point_1[1] + hole_height) / 2.0]
-                dy = [(hole_height - point_1[1]) / 2.0, (point_3[1] - hole_height) / 2.0,
-                      (hole_height - point_1[1]) / 2.0]
-            else:
-                y = [(point_3[1] + hole_height) / 2.0, (hole_height + point_1[1]) / 2.0,
-                     (point_3[1] + hole_height) / 2.0]
-                dy = [(hole_height - point_3[1]) / 2.0, (point_1[1] - hole_height) / 2.0,
-                      (hole_height - point_3[1]) / 2.0]
-            if normal[0] != 0:
-                z = [(point_1[2] + point_2[2]) / 2.0] * 3
-                dz = [(point_1[2] - point_2[2]) * normal[0] / 2.0] * 3
-
-                dz[0] = door["holePolygon"][0]["x"] / 2
-                if point_1[2] > point_2[2]:
-                    z[0] = point_2[2] + dz[0]
-                    dz[2] = (point_1[2] - point_2[2] - door["holePolygon"][1]["x"]) / 2.0
-                    z[2] = point_1[2] - dz[2]
-                else:
-                    z[0] = point_1[2] + dz[0]
-                    dz[2] = (point_2[2] - point_1[2] - door["holePolygon"][1]["x"]) / 2.0
-                    z[2] = point_2[2] - dz[2]
-
-                x = [point_1[0]] * 3
-                dx = [0.05] * 3
-            elif normal[2] != 0:
-                x = [(point_2[0] + point_3[0]) / 2.0] * 3
-                dx = [(point_2[0] - point_3[0]) * normal[2] / 2.0] * 3
-
-                dx[0] = door["holePolygon"][0]["x"] / 2.0
-                if point_2[0] > point_3[0]:
-                    x[0] = point_3[0] + dx[0]
-                    dx[2] = (point_2[0] - point_3[0] - door["holePolygon"][1]["x"]) / 2.0
-                    x[2] = point_2[0] - dx[2]
-                else:
-                    x[0] = point_2[0] + dx[0]
-                    dx[2] = (point_3[0] - point_2[0] - door["holePolygon"][1]["x"]) / 2.0
-                    x[2] = point_3[0] - dx[2]
-
-                z = [point_1[2]] * 3
-                dz = [0.05] * 3
-            else:
-                raise ValueError("Invalid normal")
-
-            for idx in range(3):
-                points = numpy.array(
-                    [[x[idx] - dx[idx], y[idx] - dy[idx], z[idx] - dz[idx]],
-                     [x[idx] - dx[idx], y[idx] - dy[idx], z[idx] + dz[idx]],
-                     [x[idx] - dx[idx], y[idx] + dy[idx], z[idx] - dz[idx]],
-                     [x[idx] - dx[idx], y[idx] + dy[idx], z[idx] + dz[idx]],
-                     [x[idx] + dx[idx], y[idx] - dy[idx], z[idx] - dz[idx]],
-                     [x[idx] + dx[idx], y[idx] - dy[idx], z[idx] + dz[idx]],
-                     [x[idx] + dx[idx], y[idx] + dy[idx], z[idx] - dz[idx]],
-                     [x[idx] + dx[idx], y[idx] + dy[idx], z[idx] + dz[idx]]])
-
-                mesh_file_name = f"Wall_{wall_id}_{idx}"
-
-                mesh_property = MeshProperty(points=points,
-                                             normals=normals,
-                                             face_vertex_counts=face_vertex_counts,
-                                             face_vertex_indices=face_vertex_indices,
-                                             mesh_file_name=mesh_file_name)
-                geom_property = GeomProperty(geom_type=GeomType.MESH,
-                                             is_visible=True,
-                                             is_collidable=True)
-                geom_builder = body_builder.add_geom(geom_name=f"{body_name}_{idx}",
-                                                     geom_property=geom_property)
-                geom_builder.add_mesh(mesh_name=f"SM_{body_name}_{idx}", mesh_property=mesh_property)
+            geom_builder.add_mesh(mesh_name=f"SM_{body_name}{suffix}", mesh_property=mesh_property)
 
-    def import_door(self, door: Dict[str, Any], door_id: int, walls: List[Dict[str, Any]],
-                    walls_with_door: Dict) -> None:
+    def import_door(self, door: Opening, house: House, walls_with_door: Dict[str, List[Opening]]) -> None:
+        door_id = door.index
         body_name = f"Door_{door_id}"
-        body_builder = self._world_builder.add_body(body_name=body_name, parent_body_name=house_name)
+        body_builder = self._world_builder.add_body(body_name=body_name, parent_body_name=self.house_name)
 
-        position = door.get("assetPosition", {"x": 0, "y": 0, "z": 0})
-        position_vec = numpy.array([0, 0, position["y"]])
+        position = door.asset_position
+        position_vec = numpy.array([0, 0, position[1]])
 
-        wall0 = door.get("wall0", None)
-        wall1 = door.get("wall1", None)
-        if wall0 is None:
+        if door.wall0 is None:
             raise ValueError(f"Door {door_id} does not have wall0")
-        if wall1 is None:
+        if door.wall1 is None:
             raise ValueError(f"Door {door_id} does not have wall1")
 
-        for wall in walls:
-            if wall["id"] == wall1:
-                walls_with_door[wall1] = door
-                break
-        else:
-            raise ValueError(f"Wall {wall1} not found")
-
-        for wall in walls:
-            if wall["id"] == wall0:
-                walls_with_door[wall0] = door
-                break
-        else:
-            raise ValueError(f"Wall {wall0} not found")
+        for wall_id in [door.wall1, door.wall0]:
+            if wall_id not in house.wall_by_id:
+                raise ValueError(f"Wall {wall_id} not found")
+            walls_with_door.setdefault(wall_id, []).append(door)
 
-        if wall["polygon"][0]["x"] == wall["polygon"][1]["x"]:
-            position_vec[0] = position["z"] + wall["polygon"][0]["x"]
-            position_vec[1] = -position["x"] - (
-                wall["polygon"][0]["z"] if wall["polygon"][0]["z"] < wall["polygon"][1]["z"] else wall["polygon"][1][
-                    "z"])
+        polygon = house.wall_by_id[door.wall0].polygon
+        if polygon[0][0] == polygon[1][0]:
+            position_vec[0] = position[2] + polygon[0][0]
+            position_vec[1] = -position[0] - (polygon[0][2] if polygon[0][2] < polygon[1][2] else polygon[1][2])
             body_builder.set_transform(pos=position_vec,
                                        quat=Rotation.from_euler("xyz", [0, 0, 90], degrees=True).as_quat())
-        elif wall["polygon"][0]["z"] == wall["polygon"][1]["z"]:
-            position_vec[0] = position["x"] + (
-                wall["polygon"][0]["x"] if wall["polygon"][0]["x"] < wall["polygon"][1]["x"] else wall["polygon"][1][
-                    "x"])
-            position_vec[1] = position["z"] - wall["polygon"][0]["z"]
+        elif polygon[0][2] == polygon[1][2]:
+            position_vec[0] = position[0] + (polygon[0][0] if polygon[0][0] < polygon[1][0] else polygon[1][0])
+            position_vec[1] = position[2] - polygon[0][2]
             body_builder.set_transform(pos=position_vec)
         else:
-            raise ValueError(f"Invalid wall {wall}")
+            raise ValueError(f"Invalid wall {door.wall0}")
 
-        if "assetId" not in door:
+        if door.asset_id is None:
             return None
 
-        asset_name = door["assetId"]
+        asset_name = door.asset_id
         asset_name = re.sub(r'(\d+)x(\d+)', r'\1_X_\2', asset_name)
         asset_name = snake_to_camel(asset_name)
         asset_name = asset_name.replace("Doorframe", "Doorway")
@@ -410,65 +391,399 @@ class ProcthorImporter(Factory):
         if (os.path.basename(os.path.dirname(asset_dir)) == "grp_objects"
                 or "Pen" in asset_name
                 or "Keychain" in asset_name):
-            tmp_usd_mesh_file_path, tmp_origin_mesh_file_path = self.import_mesh(
-                mesh_file_path=asset_path, merge_mesh=True)
-            mesh_stage = Usd.Stage.Open(tmp_usd_mesh_file_path)
-            for mesh_prim in [prim for prim in mesh_stage.Traverse() if prim.IsA(UsdGeom.Mesh)]:
-                mesh_name = mesh_prim.GetName()
-                mesh_path = mesh_prim.GetPath()
-                mesh_property = MeshProperty.from_mesh_file_path(mesh_file_path=tmp_usd_mesh_file_path,
-                                                                 mesh_path=mesh_path)
+            if self.import_asset_box(body_builder, f"SM_{body_name}_{asset_name}", asset_path):
+                return None
+            for mesh_name, mesh_property in self.import_asset_meshes(asset_path):
                 geom_property = GeomProperty(geom_type=GeomType.MESH,
                                              is_visible=True,
-                                             is_collidable=True)
+                                             is_collidable=self.collision == "visual")
                 geom_builder = body_builder.add_geom(geom_name=f"SM_{body_name}_{asset_name}",
                                                      geom_property=geom_property)
                 geom_builder.add_mesh(mesh_name=mesh_name, mesh_property=mesh_property)
+            if self.collision != "visual":
+                self._collision_requests.append((body_builder, f"SM_{body_name}_{asset_name}", asset_path))
         else:
-            if "Chair" in asset_name:
-                print(asset_name)
             file_text = re.sub(r'[^a-zA-Z]', '', asset_name)
-            for root, dirs, files in os.walk(asset_dir):
-                for file in files:
-                    file_name = os.path.splitext(file)[0]
-                    if file.endswith('.stl') and file_text in file_name:
-                        asset_path = os.path.join(root, file)
-                        tmp_usd_mesh_file_path, tmp_origin_mesh_file_path = self.import_mesh(
-                            mesh_file_path=asset_path, merge_mesh=True)
-                        mesh_stage = Usd.Stage.Open(tmp_usd_mesh_file_path)
-                        for mesh_prim in [prim for prim in mesh_stage.Traverse() if prim.IsA(UsdGeom.Mesh)]:
-                            mesh_name = mesh_prim.GetName()
-                            mesh_path = mesh_prim.GetPath()
-                            mesh_property = MeshProperty.from_mesh_file_path(mesh_file_path=tmp_usd_mesh_file_path,
-                                                                             mesh_path=mesh_path)
-                            geom_property = GeomProperty(geom_type=GeomType.MESH,
-                                                         is_visible=True,
-                                                         is_collidable=True)
-                            geom_builder = body_builder.add_geom(geom_name=f"SM_{body_name}_{asset_name}_{mesh_idx}",
-                                                                 geom_property=geom_property)
-                            geom_builder.add_mesh(mesh_name=mesh_name, mesh_property=mesh_property)
-                            mesh_idx += 1
-
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description="Auto semantic tagging based on object names")
-    parser.add_argument("--house", type=str, required=True, help="Input JSON")
-    args = parser.parse_args()
-
-    house_name = f"house_{args.house}"
+            for asset_path in get_asset_index().find_in_dir(asset_dir, file_text):
+                geom_name = f"SM_{body_name}_{asset_name}_{mesh_idx}"
+                if self.import_asset_box(body_builder, geom_name, asset_path):
+                    mesh_idx += 1
+                    continue
+                for mesh_name, mesh_property in self.import_asset_meshes(asset_path):
+                    geom_property = GeomProperty(geom_type=GeomType.MESH,
+                                                 is_visible=True,
+                                                 is_collidable=self.collision == "visual")
+                    geom_builder = body_builder.add_geom(geom_name=f"SM_{body_name}_{asset_name}_{mesh_idx}",
+                                                         geom_property=geom_property)
+                    geom_builder.add_mesh(mesh_name=mesh_name, mesh_property=mesh_property)
+                    mesh_idx += 1
+                if self.collision != "visual":
+                    self._collision_requests.append((body_builder, geom_name, asset_path))
+
+    def import_asset_box(self, body_builder: BodyBuilder, geom_name: str, asset_path: str) -> bool:
+        # Write the asset as one box that is visible and collides, if its mesh fits its oriented box
+        if not self.box_assets:
+            return False
+        asset_path = os.path.realpath(asset_path)
+        if asset_path not in self._box_cache:
+            points, face_vertex_indices = self.read_welded_mesh(asset_path)
+            self._box_cache[asset_path] = fit_box(points, face_vertex_indices, self.box_tolerance)
+        box = self._box_cache[asset_path]
+        if box is None:
+            return False
+        center, half_extents, rotation = box
+        add_box_geom(body_builder, geom_name, center, half_extents, Rotation.from_matrix(rotation).as_quat())
+        self.box_asset_geoms += 1
+        return True
+
+    def import_collision_geoms(self) -> None:
+        # The collision geoms are added after all assets are imported, so that the triangle budget of the house
+        # can be shared out over all assets by how many triangles they have and how often they are used
+        asset_paths = [os.path.realpath(asset_path) for _, _, asset_path in self._collision_requests]
+        instance_counts: Dict[str, int] = {}
+        for asset_path in asset_paths:
+            instance_counts[asset_path] = instance_counts.get(asset_path, 0) + 1
+        # The meshes are only read for the collision meshes that are not cached
+        triangle_counts = {asset_path: get_triangle_count(asset_path) for asset_path in instance_counts}
+        triangle_targets = get_collision_triangle_targets(triangle_counts, instance_counts,
+                                                          self.collision_triangle_budget, self.collision_max_triangles)
+
+        num_collision_geoms = 0
+        for (body_builder, geom_name, _), asset_path in zip(self._collision_requests, asset_paths):
+            collision_meshes = self.import_collision_meshes(asset_path, triangle_targets[asset_path])
+            for hull_idx, (mesh_name, mesh_property) in enumerate(collision_meshes):
+                geom_property = GeomProperty(geom_type=GeomType.MESH,
+                                             is_visible=False,
+                                             is_collidable=True)
+                geom_builder = body_builder.add_geom(geom_name=f"{geom_name}_collision_{hull_idx}",
+                                                     geom_property=geom_property)
+                geom_builder.add_mesh(mesh_name=mesh_name, mesh_property=mesh_property)
+                self.collision_triangles += len(mesh_property.face_vertex_counts)
+                num_collision_geoms += 1
+        print(f"Collision: {num_collision_geoms} {self.collision} geoms with {self.collision_triangles} triangles "
+              f"for a budget of {self.collision_triangle_budget}")
+        if self.collision_triangles > self.collision_triangle_budget:
+            # Every asset keeps at least min_collision_triangles, so houses with many assets can go over
+            print(f"Warning: the collision meshes have {self.collision_triangles} triangles, "
+                  f"more than the budget of {self.collision_triangle_budget}")
+
+    def read_welded_mesh(self, asset_path: str) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        # Collision meshes and boxes are always made from the welded STL, however the visual meshes were read
+        mesh_arrays = read_mesh_binary(asset_path) if self.use_mesh_binary else None
+        if mesh_arrays is None:
+            mesh_arrays = load_stl_mesh(asset_path)
+        return mesh_arrays["points"], mesh_arrays["face_vertex_indices"]
+
+    def import_collision_meshes(self, asset_path: str, max_triangles: int) -> List[Tuple[str, MeshProperty]]:
+        if (asset_path, max_triangles) in self._collision_mesh_cache:
+            return self._collision_mesh_cache[(asset_path, max_triangles)]
+
+        asset_file_name = os.path.splitext(os.path.basename(asset_path))[0]
+        collision_meshes = None
+        if self._disk_mesh_cache is not None:
+            mesh_cache_key = self._disk_mesh_cache.get_key(asset_path, {"collision": collision_mesh_version,
+                                                                        "mode": self.collision,
+                                                                        "triangles": max_triangles,
+                                                                        "hulls": self.collision_max_hulls})
+            collision_file_name = f"{asset_file_name}.collision.npz"
+            collision_file_path = self._disk_mesh_cache.get(mesh_cache_key, collision_file_name)
+            if collision_file_path is not None:
+                collision_meshes = load_collision_meshes(collision_file_path)
+        if collision_meshes is None:
+            points, face_vertex_indices = self.read_welded_mesh(asset_path)
+            collision_meshes = get_collision_meshes(points, face_vertex_indices, self.collision,
+                                                    max_triangles, self.collision_max_hulls)
+            if self._disk_mesh_cache is not None:
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    tmp_collision_file_path = os.path.join(tmp_dir, collision_file_name)
+                    save_collision_meshes(tmp_collision_file_path, collision_meshes)
+                    self._disk_mesh_cache.put(mesh_cache_key, tmp_collision_file_path)
+
+        meshes = []
+        for hull_idx, (points, face_vertex_indices) in enumerate(collision_meshes):
+            # Named by the triangles too, so that meshes decimated differently never share a mesh file
+            mesh_name = f"{asset_file_name}_collision_{max_triangles}_{hull_idx}"
+            mesh_property = MeshProperty(points=points,
+                                         normals=get_face_normals(points, face_vertex_indices),
+                                         face_vertex_counts=numpy.full(len(face_vertex_indices), 3),
+                                         face_vertex_indices=face_vertex_indices,
+                                         mesh_file_name=mesh_name)
+            meshes.append((mesh_name, mesh_property))
+        self._collision_mesh_cache[(asset_path, max_triangles)] = meshes
+        return meshes
+
+    def import_asset_meshes(self, asset_path: str) -> List[Tuple[str, MeshProperty]]:
+        asset_path = os.path.realpath(asset_path)
+        if asset_path in self._mesh_cache:
+            self.mesh_cache_hits += 1
+            return self._mesh_cache[asset_path]
+
+        self.mesh_cache_misses += 1
+        # The mesh binaries hold the meshes the numpy loader reads, so they are not used with import_mesh
+        if self.use_mesh_binary and self.stl_loader == "numpy":
+            mesh_arrays = read_mesh_binary(asset_path)
+            if mesh_arrays is not None:
+                self.mesh_binary_hits += 1
+                if self.stl_normals != "face":
+                    mesh_arrays["normals"] = get_normals(mesh_arrays["points"], mesh_arrays["face_vertex_indices"],
+                                                         self.stl_normals)
+                meshes = [self.get_array_mesh(asset_path, mesh_arrays)]
+                self._mesh_cache[asset_path] = meshes
+                return meshes
+
+        if self.stl_loader == "numpy" and asset_path.lower().endswith(".stl"):
+            self.stl_loads += 1
+            meshes = [self.get_array_mesh(asset_path, load_stl_mesh(asset_path, self.stl_normals))]
+            self._mesh_cache[asset_path] = meshes
+            return meshes
+
+        usd_mesh_file_path = None
+        if self._disk_mesh_cache is not None:
+            mesh_cache_key = self._disk_mesh_cache.get_key(asset_path, {"merge_mesh": True,
+                                                                        "format": self.mesh_format,
+                                                                        **self._mesh_cache_settings})
+            usd_mesh_file_name = f"{os.path.splitext(os.path.basename(asset_path))[0]}{self.mesh_format}"
+            usd_mesh_file_path = self._disk_mesh_cache.get(mesh_cache_key, usd_mesh_file_name)
+            if usd_mesh_file_path is not None:
+                meshes = self.read_usd_meshes(usd_mesh_file_path)
+                if meshes is not None:
+                    self.disk_mesh_cache_hits += 1
+                    self._mesh_cache[asset_path] = meshes
+                    return meshes
+
+        tmp_usd_mesh_file_path, tmp_origin_mesh_file_path = self.import_mesh(
+            mesh_file_path=asset_path, merge_mesh=True)
+        if os.path.splitext(tmp_usd_mesh_file_path)[1] != self.mesh_format:
+            tmp_usd_mesh_file_path = self.convert_usd_file(tmp_usd_mesh_file_path, self.mesh_format)
+        if self._disk_mesh_cache is not None:
+            self._disk_mesh_cache.put(mesh_cache_key, tmp_usd_mesh_file_path)
+        meshes = self.read_usd_meshes(tmp_usd_mesh_file_path)
+        if meshes is None:
+            raise RuntimeError(f"Failed to read {tmp_usd_mesh_file_path} converted from {asset_path}")
+        self._mesh_cache[asset_path] = meshes
+        return meshes
+
+    @staticmethod
+    def get_array_mesh(asset_path: str, mesh_arrays: Dict[str, numpy.ndarray]) -> Tuple[str, MeshProperty]:
+        # The mesh of a mesh binary or of an STL read with numpy, named after the STL as import_mesh names it
+        mesh_name = os.path.splitext(os.path.basename(asset_path))[0]
+        mesh_property = MeshProperty(points=mesh_arrays["points"],
+                                     normals=mesh_arrays["normals"],
+                                     face_vertex_counts=mesh_arrays["face_vertex_counts"],
+                                     face_vertex_indices=mesh_arrays["face_vertex_indices"],
+                                     mesh_file_name=mesh_name)
+        return mesh_name, mesh_property
+
+    @staticmethod
+    def convert_usd_file(usd_file_path: str, usd_format: str) -> str:
+        # Written next to the source, so that the relative asset paths in it stay valid
+        converted_usd_file_path = f"{os.path.splitext(usd_file_path)[0]}{usd_format}"
+        if not Sdf.Layer.FindOrOpen(usd_file_path).Export(converted_usd_file_path):
+            raise RuntimeError(f"Failed to convert {usd_file_path} to {converted_usd_file_path}")
+        return converted_usd_file_path
+
+    @staticmethod
+    def read_usd_meshes(usd_mesh_file_path: str) -> Optional[List[Tuple[str, MeshProperty]]]:
+        # None if the file can't be read, e.g. a cache entry that another process evicted after it was found
+        try:
+            mesh_stage = Usd.Stage.Open(usd_mesh_file_path)
+            meshes = []
+            for mesh_prim in [prim for prim in mesh_stage.Traverse() if prim.IsA(UsdGeom.Mesh)]:
+                mesh_name = mesh_prim.GetName()
+                mesh_path = mesh_prim.GetPath()
+                mesh_property = MeshProperty.from_mesh_file_path(mesh_file_path=usd_mesh_file_path,
+                                                                 mesh_path=mesh_path)
+                meshes.append((mesh_name, mesh_property))
+        except Tf.ErrorException:
+            return None
+        return meshes
+
+
+def run_exporter(exporter_class: type, file_path: str, factory: Factory) -> None:
+    exporter = exporter_class(file_path=file_path, factory=factory)
+    exporter.build()
+    exporter.export(keep_usd=False)
+
+
+def export_from_usd(exporter_class: type, usd_file_path: str, file_path: str, config: Configuration) -> None:
+    # Runs in a process of its own, which imports the saved house again instead of sharing the factory
+    factory = UsdImporter(file_path=usd_file_path,
+                          fixed_base=config.fixed_base,
+                          with_physics=config.with_physics,
+                          with_visual=config.with_visual,
+                          with_collision=config.with_collision,
+                          inertia_source=config.inertia_source,
+                          default_rgba=config.default_rgba,
+                          add_xform_for_each_geom=False)
+    factory.import_model()
+    run_exporter(exporter_class, file_path, factory)
+
+
+def move_files(src_dir: str, dst_dir: str) -> None:
+    # Move every file of src_dir to the same relative path in dst_dir, replacing the files that are there
+    for root, _, file_names in os.walk(src_dir):
+        out_dir = os.path.join(dst_dir, os.path.relpath(root, src_dir))
+        os.makedirs(out_dir, exist_ok=True)
+        for file_name in file_names:
+            os.replace(os.path.join(root, file_name), os.path.join(out_dir, file_name))
+
+
+def run_exporters(factory: Factory, exports: List[Tuple[type, str]], usd_file_path: Optional[str] = None) -> None:
+    # A single exporter runs on the factory. Several exporters run side by side, each in a spawned process that
+    # imports the saved USD (usd_file_path, or a temporary one) and writes into a staging directory of its own.
+    # Forked processes would share the pxr threads and the mesh directories of the factory. The staged outputs
+    # keep their meshes relative to them and are moved in place one after the other once all exporters are done
+    if len(exports) <= 1:
+        for exporter_class, file_path in exports:
+            run_exporter(exporter_class, file_path, factory)
+        return
+
+    out_dir = os.path.dirname(exports[0][1])
+    staging_dirs = [os.path.join(os.path.dirname(file_path), f".{os.path.basename(file_path)}.{os.getpid()}.tmp")
+                    for _, file_path in exports]
+    tmp_usd_dir = None
+    try:
+        if usd_file_path is None:
+            tmp_usd_dir = os.path.join(out_dir, f".usd.{os.getpid()}.tmp")
+            usd_file_path = os.path.join(tmp_usd_dir, f"{os.path.splitext(os.path.basename(exports[0][1]))[0]}.usda")
+            factory.save_tmp_model(usd_file_path)
+
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=export_from_usd,
+                                     args=(exporter_class, usd_file_path,
+                                           os.path.join(staging_dir, os.path.basename(file_path)), factory.config))
+                     for (exporter_class, file_path), staging_dir in zip(exports, staging_dirs)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        failed_file_paths = [file_path for (_, file_path), process in zip(exports, processes)
+                             if process.exitcode != 0]
+        if len(failed_file_paths) > 0:
+            raise RuntimeError(f"Failed to export {', '.join(failed_file_paths)}")
+
+        for (_, file_path), staging_dir in zip(exports, staging_dirs):
+            move_files(staging_dir, os.path.dirname(file_path))
+    finally:
+        for staging_dir in staging_dirs + [tmp_usd_dir]:
+            if staging_dir is not None:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def convert_house(house_name: str,
+                  mesh_cache: Optional[MeshCache] = None,
+                  share: bool = False,
+                  cut_windows: bool = False,
+                  formats: List[str] = export_formats,
+                  usd_format: str = ".usda",
+                  mesh_format: str = ".usda",
+                  use_mesh_binary: bool = True,
+                  stl_loader: str = "import_mesh",
+                  stl_normals: str = "face",
+                  collision: str = "visual",
+                  collision_triangle_budget: int = default_collision_triangle_budget,
+                  wall_geom: str = "mesh",
+                  box_assets: bool = False) -> Optional[str]:
+    # Returns the house USD, None if it was not among the formats
+    for export_format in formats:
+        if export_format not in export_formats:
+            raise ValueError(f"Unknown format {export_format}, choose from {', '.join(export_formats)}")
+    if usd_format not in usd_formats:
+        raise ValueError(f"Unknown USD format {usd_format}, choose from {', '.join(usd_formats)}")
 
     house_file_path = os.path.join(source_dir, f"{house_name}.json")
     config = Configuration()
-    factory = ProcthorImporter(file_path=house_file_path, config=config)
+    factory = ProcthorImporter(file_path=house_file_path, config=config, mesh_cache=mesh_cache,
+                               house_name=house_name, cut_windows=cut_windows, mesh_format=mesh_format,
+                               use_mesh_binary=use_mesh_binary, stl_loader=stl_loader, stl_normals=stl_normals,
+                               collision=collision, collision_triangle_budget=collision_triangle_budget,
+                               wall_geom=wall_geom, box_assets=box_assets)
 
     # Export to USD
-    house_usd_file_path = os.path.join(source_dir, house_name, f"{house_name}.usda")
-    factory.save_tmp_model(house_usd_file_path)
+    house_usd_file_path = os.path.join(source_dir, house_name, f"{house_name}{usd_format}")
+    if "usd" in formats:
+        factory.save_tmp_model(house_usd_file_path)
 
     # Export to URDF and MJCF
-    urdf_exporter = UrdfExporter(file_path=house_usd_file_path.replace(".usda", ".urdf"), factory=factory)
-    urdf_exporter.build()
-    urdf_exporter.export(keep_usd=False)
+    house_urdf_file_path = os.path.join(source_dir, house_name, f"{house_name}.urdf")
+    house_mjcf_file_path = os.path.join(source_dir, house_name, f"{house_name}.xml")
+    exports = []
+    if "urdf" in formats:
+        exports.append((UrdfExporter, house_urdf_file_path))
+    if "mjcf" in formats:
+        exports.append((MjcfExporter, house_mjcf_file_path))
+    run_exporters(factory, exports, house_usd_file_path if "usd" in formats else None)
+
+    if share:
+        share_meshes(usd_file_path=house_usd_file_path if "usd" in formats else None,
+                     urdf_file_path=house_urdf_file_path if "urdf" in formats else None,
+                     mjcf_file_path=house_mjcf_file_path if "mjcf" in formats else None)
+
+    return house_usd_file_path if "usd" in formats else None
+
+
+def parse_formats(formats: str) -> List[str]:
+    formats = [export_format.strip().lower() for export_format in formats.split(",") if export_format.strip() != ""]
+    for export_format in formats:
+        if export_format not in export_formats:
+            raise ValueError(f"Unknown format {export_format}, choose from {', '.join(export_formats)}")
+    return formats
+
+
+def add_conversion_arguments(parser: argparse.ArgumentParser) -> None:
+    # The options of convert_house, shared by procthor_to_scene.py and batch_procthor_to_scene.py
+    parser.add_argument("--mesh_cache_dir", type=str, default=default_mesh_cache_dir,
+                        help="Directory of the mesh conversion cache shared across houses")
+    parser.add_argument("--mesh_cache_size", type=int, default=default_mesh_cache_size // 1024 ** 2,
+                        help="Size limit of the mesh conversion cache in MB")
+    parser.add_argument("--no_mesh_cache", action="store_true", help="Do not use the mesh conversion cache")
+    parser.add_argument("--share_meshes", action="store_true",
+                        help="Write each distinct mesh once and reference it from every body that uses it")
+    parser.add_argument("--cut_windows", action="store_true", help="Cut the window holes out of the walls")
+    parser.add_argument("--formats", type=str, default=",".join(export_formats),
+                        help="Comma separated output formats out of usd, urdf and mjcf")
+    parser.add_argument("--usd_format", type=str, default=".usda", choices=usd_formats, help="Format of the house USD")
+    parser.add_argument("--mesh_format", type=str, default=".usda", choices=usd_formats,
+                        help="Format of the converted mesh files")
+    parser.add_argument("--no_mesh_binary", action="store_true",
+                        help="With --stl_loader=numpy, read the STL files even if there are mesh binaries next to them")
+    parser.add_argument("--stl_loader", type=str, default="import_mesh", choices=stl_loaders,
+                        help="Read the STL files with numpy or convert them to USD with import_mesh")
+    parser.add_argument("--stl_normals", type=str, default="face", choices=mesh_normals,
+                        help="Flat or smoothed normals of the meshes read with numpy or from mesh binaries")
+    parser.add_argument("--collision", type=str, default="visual", choices=collision_modes,
+                        help="Collide with the visual meshes, decimated copies of them or convex hulls of those")
+    parser.add_argument("--collision_triangle_budget", type=int, default=default_collision_triangle_budget,
+                        help="Triangles of all collision meshes of a house together")
+    parser.add_argument("--wall_geom", type=str, default="mesh", choices=wall_geoms,
+                        help="Write the walls as box primitives or as meshes")
+    parser.add_argument("--box_assets", action="store_true",
+                        help="Write the closed assets that fit their oriented box as a single box geom")
+
+
+def get_conversion_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
+    # The keyword arguments of convert_house from the options of add_conversion_arguments, without the mesh cache
+    return {"share": args.share_meshes,
+            "cut_windows": args.cut_windows,
+            "formats": parse_formats(args.formats),
+            "usd_format": args.usd_format,
+            "mesh_format": args.mesh_format,
+            "use_mesh_binary": not args.no_mesh_binary,
+            "stl_loader": args.stl_loader,
+            "stl_normals": args.stl_normals,
+            "collision": args.collision,
+            "collision_triangle_budget": args.collision_triangle_budget,
+            "wall_geom": args.wall_geom,
+            "box_assets": args.box_assets}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Auto semantic tagging based on object names")
+    parser.add_argument("--house", type=str, required=True, help="Input JSON")
+    add_conversion_arguments(parser)
+    args = parser.parse_args()
 
-    mjcf_exporter = MjcfExporter(file_path=house_usd_file_path.replace(".usda", ".xml"), factory=factory)
-    mjcf_exporter.build()
-    mjcf_exporter.export(keep_usd=False)
\ No newline at end of file
+    mesh_cache = None
+    if not args.no_mesh_cache:
+        mesh_cache = MeshCache(cache_dir=args.mesh_cache_dir, max_size=args.mesh_cache_size * 1024 ** 2)
+    convert_house(f"house_{args.house}", mesh_cache=mesh_cache, **get_conversion_kwargs(args))
@@ -4,6 +4,6 @@ if [ ! -d "ai2thor" ]; then
     git clone git@github.com:allenai/ai2thor.git
 fi
 
-python get_meshes.py
+python get_meshes.py --mode=hardlink
 
-python3.11 extract_objects.py
\ No newline at end of file
+python batch_extract_objects.py --python=python3.11
\ No newline at end of file
@@ -4,11 +4,24 @@ import argparse
 import shutil
 import os
 import re
-from pxr import Usd, UsdGeom, UsdOntology
+import json
+import hashlib
+from typing import Any, Dict, List, Tuple
+from pxr import Usd, UsdGeom, UsdOntology, Sdf
+
+from usd_layer_edit import get_applied_schema_name, create_prim_spec, apply_api_schema, add_relationship_target
 
 
 sem_TBox = {}
 
+# sem_TBox compiled into lookups by normalized name: the lowercase class name split by the namespace of the class
+# (SOMA_DFL or SOMA) and the lowercase name without its "nwn" suffix, values keep the order of sem_TBox
+sem_TBox_keys = {
+    "SOMA_DFL": {},
+    "SOMA": {},
+    "stem": {}
+}
+
 ignore_classes = {
     "animal"
 }
@@ -17,87 +30,236 @@ synonyms = {
     "Fridge": "Refrigerator",
 }
 
+# Bump when the layout of the compiled TBox cache or the way it is compiled changes
+sem_TBox_cache_version = 1
 
-def auto_sem_tag(in_ABox_usd_file: str, in_TBox_Usd_file: str, out_ABox_usd_file: str) -> None:
-    tmp_out_ABox_usd_file = os.path.join(os.path.dirname(in_ABox_usd_file), "tmp.usda")
-    shutil.copy(src=in_ABox_usd_file, dst=tmp_out_ABox_usd_file)
 
+def get_sem_TBox_cache_file_path(in_TBox_Usd_file: str) -> str:
+    TBox_dir, TBox_file_name = os.path.split(os.path.abspath(in_TBox_Usd_file))
+    return os.path.join(TBox_dir, f".{os.path.splitext(TBox_file_name)[0]}.sem_TBox.json")
+
+
+def get_file_hash(file_path: str) -> str:
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def get_layer_file_info(file_path: str) -> Dict[str, Any]:
+    stat = os.stat(file_path)
+    return {"hash": get_file_hash(file_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def is_layer_file_unchanged(file_path: str, layer_file_info: Dict[str, Any]) -> bool:
+    # The file is only hashed again when its size is the same but its mtime changed
+    if not os.path.exists(file_path):
+        return False
+    stat = os.stat(file_path)
+    if stat.st_size != layer_file_info["size"]:
+        return False
+    if stat.st_mtime_ns == layer_file_info["mtime_ns"]:
+        return True
+    return get_file_hash(file_path) == layer_file_info["hash"]
+
+
+def load_sem_TBox(in_TBox_Usd_file: str, rebuild: bool = False) -> None:
+    sem_TBox_cache_file_path = get_sem_TBox_cache_file_path(in_TBox_Usd_file)
+    if not rebuild and load_sem_TBox_cache(sem_TBox_cache_file_path):
+        return
+
+    sem_TBox.clear()
     stage_TBox = Usd.Stage.Open(in_TBox_Usd_file)
     for prim in stage_TBox.Traverse():
         for prim_class in prim.GetAllChildren():
             if not any([ignore_class in prim_class.GetName() for ignore_class in ignore_classes]):
                 sem_TBox[prim_class.GetName()] = prim_class.GetPrimPath()
+    compile_sem_TBox()
+
+    layer_file_paths = [layer.realPath for layer in stage_TBox.GetUsedLayers() if layer.realPath]
+    save_sem_TBox_cache(sem_TBox_cache_file_path, layer_file_paths)
+
+
+def load_sem_TBox_cache(sem_TBox_cache_file_path: str) -> bool:
+    # Returns False if there is no cache or if it was compiled from other TBox files or settings
+    if not os.path.exists(sem_TBox_cache_file_path):
+        return False
+    try:
+        with open(sem_TBox_cache_file_path) as f:
+            sem_TBox_cache = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if (sem_TBox_cache.get("version") != sem_TBox_cache_version
+            or sem_TBox_cache.get("ignore_classes") != sorted(ignore_classes)
+            or not all(is_layer_file_unchanged(file_path, layer_file_info)
+                       for file_path, layer_file_info in sem_TBox_cache["layers"].items())):
+        return False
+
+    sem_classes = [Sdf.Path(sem_class_path) for _, sem_class_path, _ in sem_TBox_cache["classes"]]
+    sem_TBox.clear()
+    for (sem_class_name, _, _), sem_class in zip(sem_TBox_cache["classes"], sem_classes):
+        sem_TBox[sem_class_name] = sem_class
+    for key_type, keys in sem_TBox_keys.items():
+        keys.clear()
+        for key, sem_class_indices in sem_TBox_cache["keys"][key_type].items():
+            keys[key] = [sem_classes[sem_class_idx] for sem_class_idx in sem_class_indices]
+    print(f"Loaded {len(sem_TBox)} classes from {sem_TBox_cache_file_path}")
+    return True
+
+
+def save_sem_TBox_cache(sem_TBox_cache_file_path: str, layer_file_paths: List[str]) -> None:
+    sem_class_indices = {sem_class: sem_class_idx for sem_class_idx, sem_class in enumerate(sem_TBox.values())}
+    sem_TBox_cache = {
+        "version": sem_TBox_cache_version,
+        "ignore_classes": sorted(ignore_classes),
+        "layers": {file_path: get_layer_file_info(file_path) for file_path in layer_file_paths},
+        "classes": [[sem_class_name, str(sem_class), sem_class.GetParentPath().name]
+                    for sem_class_name, sem_class in sem_TBox.items()],
+        "keys": {key_type: {key: [sem_class_indices[sem_class] for sem_class in sem_classes]
+                            for key, sem_classes in keys.items()}
+                 for key_type, keys in sem_TBox_keys.items()}
+    }
+    tmp_sem_TBox_cache_file_path = f"{sem_TBox_cache_file_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_sem_TBox_cache_file_path, "w") as f:
+            json.dump(sem_TBox_cache, f)
+        os.replace(tmp_sem_TBox_cache_file_path, sem_TBox_cache_file_path)
+    except OSError as e:
+        # The TBox may be in a read-only directory, the next run compiles it again
+        print(f"Failed to write {sem_TBox_cache_file_path}: {e}")
+        if os.path.exists(tmp_sem_TBox_cache_file_path):
+            os.remove(tmp_sem_TBox_cache_file_path)
+        return
+    print(f"Saved {len(sem_TBox)} classes to {sem_TBox_cache_file_path}")
+
+
+def compile_sem_TBox() -> None:
+    for keys in sem_TBox_keys.values():
+        keys.clear()
+    for sem_class_name, sem_class in sem_TBox.items():
+        namespace = sem_class.GetParentPath().name
+        if namespace in ["SOMA_DFL", "SOMA"]:
+            sem_TBox_keys[namespace].setdefault(sem_class_name.lower(), []).append(sem_class)
+        stem = "_".join(sem_class_name.split("nwn")[:-1]).lower()
+        if stem != "":
+            sem_TBox_keys["stem"].setdefault(stem, []).append(sem_class)
+
+
+def get_sem_classes(prim_name: str) -> Tuple[List[Sdf.Path], List[Sdf.Path]]:
+    # Returns the SOMA_DFL and the SOMA classes of a prim name, trying the exact class name first,
+    # then the class name without "nwn" suffix, then all words joined by "_", then the last word
+    class_name = f"_class_{prim_name}".lower()
+    SOMA_DFL_sem_classes = list(sem_TBox_keys["SOMA_DFL"].get(class_name, []))
+    SOMA_sem_classes = list(sem_TBox_keys["SOMA"].get(class_name, []))
+
+    if len(SOMA_DFL_sem_classes) == 0:
+        SOMA_DFL_sem_classes = list(sem_TBox_keys["stem"].get(class_name, []))
+
+    # Split name into words
+    words = re.findall('[A-Z][^A-Z]*', prim_name)
+    if len(SOMA_DFL_sem_classes) == 0 and len(words) > 1:
+        SOMA_DFL_sem_classes = list(sem_TBox_keys["stem"].get(f"_class_{'_'.join(words).lower()}", []))
+
+    if len(SOMA_DFL_sem_classes) == 0 and len(words) > 1:
+        SOMA_DFL_sem_classes = list(sem_TBox_keys["stem"].get(f"_class_{words[-1].lower()}", []))
+
+    return SOMA_DFL_sem_classes, SOMA_sem_classes
+
+
+def open_ABox_in_memory(in_ABox_usd_file: str) -> Usd.Stage:
+    # Copy the ABox into an anonymous layer instead of a tmp.usda next to it, the relative references are made
+    # absolute before the stage is opened, so the copy doesn't need to live in the directory of the input
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    layer.TransferContent(Sdf.Layer.FindOrOpen(in_ABox_usd_file))
+    make_references_absolute(layer, in_ABox_usd_file)
+    return Usd.Stage.Open(layer)
+
+
+def auto_sem_tag(in_ABox_usd_file: str, in_TBox_Usd_file: str, out_ABox_usd_file: str,
+                 rebuild_TBox_cache: bool = False) -> None:
+    tmp_out_ABox_usd_file = os.path.join(os.path.dirname(in_ABox_usd_file), "tmp.usda")
+    shutil.copy(src=in_ABox_usd_file, dst=tmp_out_ABox_usd_file)
+
+    load_sem_TBox(in_TBox_Usd_file, rebuild_TBox_cache)
 
     stage_ABox = Usd.Stage.Open(tmp_out_ABox_usd_file)
-    stage_ABox.GetRootLayer().subLayerPaths = [in_TBox_Usd_file]
+    sem_tag_stage(stage_ABox, in_ABox_usd_file, in_TBox_Usd_file)
 
-    for prim in stage_ABox.Traverse():
-        prepended_items = prim.GetPrim().GetPrimStack()[0].referenceList.prependedItems
-        if len(prepended_items) == 1:
-            prim.GetPrim().GetReferences().ClearReferences()
-            mesh_dir_abs_path = prepended_items[0].assetPath
-            prim_path = prepended_items[0].primPath
-            if not os.path.isabs(mesh_dir_abs_path):
-                if mesh_dir_abs_path[:2] == "./":
-                    mesh_dir_abs_path = mesh_dir_abs_path[2:]
-                mesh_dir_abs_path = os.path.join(os.path.dirname(in_ABox_usd_file), mesh_dir_abs_path)
-            prim.GetPrim().GetReferences().AddReference(mesh_dir_abs_path, prim_path)
-        elif len(prepended_items) > 1:
-            mesh_dir_abs_paths = []
-            prim_paths = []
-            for prepended_item in prepended_items:
-                mesh_dir_abs_path = prepended_item.assetPath
-                prim_paths.append(prepended_item.primPath)
-                if not os.path.isabs(mesh_dir_abs_path):
-                    if mesh_dir_abs_path[:2] == "./":
-                        mesh_dir_abs_path = mesh_dir_abs_path[2:]
-                    mesh_dir_abs_path = os.path.join(os.path.dirname(in_ABox_usd_file), mesh_dir_abs_path)
-                mesh_dir_abs_paths.append(mesh_dir_abs_path)
-            prim.GetPrim().GetReferences().ClearReferences()
-            for mesh_dir_abs_path, prim_path in zip(mesh_dir_abs_paths, prim_paths):
-                prim.GetPrim().GetReferences().AddReference(mesh_dir_abs_path, prim_path)
+    print(f"Save usd stage to {out_ABox_usd_file} that has semantic labels from {in_TBox_Usd_file}")
+    stage_ABox.GetRootLayer().Save()
+    os.rename(tmp_out_ABox_usd_file, out_ABox_usd_file)
+
+    return None
+
+
+def get_sem_tag_names() -> Tuple[str, str, str]:
+    # The names SemanticTagAPI is applied with and its labels and reports relationships have,
+    # to read and author them on the layer
+    stage = Usd.Stage.CreateInMemory()
+    prim = stage.DefinePrim("/Probe", "Xform")
+    semanticTagAPI = UsdOntology.SemanticTagAPI.Apply(prim)
+    return (get_applied_schema_name(UsdOntology.SemanticTagAPI),
+            semanticTagAPI.CreateSemanticLabelsRel().GetName(),
+            semanticTagAPI.CreateSemanticReportsRel().GetName())
 
+
+def get_abs_references(prim_spec: Sdf.PrimSpec, in_ABox_usd_file: str) -> List[Sdf.Reference]:
+    references = []
+    for prepended_item in prim_spec.referenceList.prependedItems:
+        mesh_dir_abs_path = prepended_item.assetPath
+        if not os.path.isabs(mesh_dir_abs_path):
+            if mesh_dir_abs_path[:2] == "./":
+                mesh_dir_abs_path = mesh_dir_abs_path[2:]
+            mesh_dir_abs_path = os.path.join(os.path.dirname(in_ABox_usd_file), mesh_dir_abs_path)
+        references.append(Sdf.Reference(mesh_dir_abs_path, prepended_item.primPath))
+    return references
+
+
+def make_references_absolute(layer: Sdf.Layer, in_ABox_usd_file: str) -> None:
+    prim_specs = []
+
+    def collect(path: Sdf.Path) -> None:
+        if path.IsPrimPath() and len(layer.GetPrimAtPath(path).referenceList.prependedItems) > 0:
+            prim_specs.append(layer.GetPrimAtPath(path))
+
+    layer.Traverse(Sdf.Path.absoluteRootPath, collect)
+
+    with Sdf.ChangeBlock():
+        for prim_spec in prim_specs:
+            references = get_abs_references(prim_spec, in_ABox_usd_file)
+            if references == list(prim_spec.referenceList.prependedItems):
+                continue
+            prim_spec.referenceList.ClearEdits()
+            prim_spec.referenceList.prependedItems = references
+
+
+def sem_tag_stage(stage_ABox: Usd.Stage, in_ABox_usd_file: str, in_TBox_Usd_file: str) -> None:
+    # All edits are written on the root layer in change blocks, so the stage recomposes a few times
+    # instead of once per edited prim
+    layer = stage_ABox.GetRootLayer()
+    with Sdf.ChangeBlock():
+        layer.subLayerPaths = [in_TBox_Usd_file]
+        make_references_absolute(layer, in_ABox_usd_file)
+
+    sem_tags = []
+    for prim in stage_ABox.Traverse():
         if prim.IsA(UsdGeom.Xform):
             prim_name = prim.GetName().replace("surface", "")
             prim_name = ''.join(filter(str.isalpha, prim_name))
             if prim_name in synonyms:
                 prim_name = synonyms[prim_name]
 
-            SOMA_DFL_sem_classes = []
-            SOMA_sem_classes = []
-            for sem_class_name, sem_class in sem_TBox.items():
-                if sem_class_name.lower() == f"_class_{prim_name}".lower():
-                    if "SOMA_DFL" == sem_class.GetParentPath().name:
-                        SOMA_DFL_sem_classes.append(sem_class)
-                    elif "SOMA" == sem_class.GetParentPath().name:
-                        SOMA_sem_classes.append(sem_class)
-
-            if len(SOMA_DFL_sem_classes) == 0:
-                for sem_class_name, sem_class in sem_TBox.items():
-                    if f"_class_{prim_name.lower()}" == "_".join(sem_class_name.split("nwn")[:-1]).lower():
-                        SOMA_DFL_sem_classes.append(sem_class)
-
-            # Split name into words
-            words = re.findall('[A-Z][^A-Z]*', prim_name)
-            if len(SOMA_DFL_sem_classes) == 0 and len(words) > 1:
-                for sem_class_name, sem_class in sem_TBox.items():
-                    if f"_class_{'_'.join(words).lower()}" == "_".join(sem_class_name.split("nwn")[:-1]).lower():
-                        SOMA_DFL_sem_classes.append(sem_class)
-
-            if len(SOMA_DFL_sem_classes) == 0 and len(words) > 1:
-                for sem_class_name, sem_class in sem_TBox.items():
-                    if f"_class_{words[-1].lower()}" == "_".join(sem_class_name.split("nwn")[:-1]).lower():
-                        SOMA_DFL_sem_classes.append(sem_class)
+            SOMA_DFL_sem_classes, SOMA_sem_classes = get_sem_classes(prim_name)
 
             if len(SOMA_sem_classes) == 0 and len(SOMA_DFL_sem_classes) == 0:
                 print(f"prim_name: {prim_name} is not in sem_TBox")
-            
-            semanticTagAPI = UsdOntology.SemanticTagAPI.Apply(prim)
 
+            sem_classes = []
             if len(SOMA_sem_classes) > 0:
                 SOMA_sem_class = SOMA_sem_classes[0]
                 print(f"prim_name: {prim_name} is in sem_class: {SOMA_sem_class.name}")
-                semanticTagAPI.CreateSemanticLabelsRel().AddTarget(SOMA_sem_class)
+                sem_classes.append(SOMA_sem_class)
 
             if len(SOMA_DFL_sem_classes) > 0:
                 SOMA_DFL_sem_class = SOMA_DFL_sem_classes[0]
@@ -106,11 +268,17 @@ def auto_sem_tag(in_ABox_usd_file: str, in_TBox_Usd_file: str, out_ABox_usd_file
                         SOMA_DFL_sem_class = sem_class
                         break
                 print(f"prim_name: {prim_name} is in sem_class: {SOMA_DFL_sem_class.name}")
-                semanticTagAPI.CreateSemanticLabelsRel().AddTarget(SOMA_DFL_sem_class)
+                sem_classes.append(SOMA_DFL_sem_class)
 
-    print(f"Save usd stage to {out_ABox_usd_file} that has semantic labels from {in_TBox_Usd_file}")
-    stage_ABox.GetRootLayer().Save()
-    os.rename(tmp_out_ABox_usd_file, out_ABox_usd_file)
+            sem_tags.append((prim.GetPath(), sem_classes))
+
+    sem_tag_schema_name, sem_labels_name, _ = get_sem_tag_names()
+    with Sdf.ChangeBlock():
+        for prim_path, sem_classes in sem_tags:
+            prim_spec = create_prim_spec(layer, prim_path)
+            apply_api_schema(prim_spec, sem_tag_schema_name)
+            for sem_class in sem_classes:
+                add_relationship_target(prim_spec, sem_labels_name, sem_class)
 
     return None
 
@@ -120,8 +288,10 @@ def main():
     parser.add_argument("--in_usd", type=str, required=True, help="Input USD")
     parser.add_argument("--in_TBox_usd", type=str, required=True, help="Input TBox USD")
     parser.add_argument("--out_ABox_usd", type=str, required=True, help="Output ABox USD")
+    parser.add_argument("--rebuild_TBox_cache", action="store_true",
+                        help="Compile the TBox again instead of loading it from the cache next to it")
     args = parser.parse_args()
-    auto_sem_tag(args.in_usd, args.in_TBox_usd, args.out_ABox_usd)
+    auto_sem_tag(args.in_usd, args.in_TBox_usd, args.out_ABox_usd, args.rebuild_TBox_cache)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+import os
+import hashlib
+import argparse
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy
+from pxr import Sdf
+
+
+def get_mesh_file_hash(mesh_file_path: str) -> str:
+    # Hash only the geometry, names written into the mesh files must not keep identical meshes apart
+    sha = hashlib.sha256()
+    sha.update(os.path.splitext(mesh_file_path)[1].lower().encode())
+    with open(mesh_file_path, "rb") as f:
+        data = f.read()
+    if mesh_file_path.lower().endswith(".stl") and not data[:5] == b"solid":
+        sha.update(data[80:])
+    else:
+        for line in data.splitlines():
+            if line.startswith((b"#", b"o ", b"g ", b"solid", b"endsolid")):
+                continue
+            sha.update(line)
+            sha.update(b"\n")
+    return sha.hexdigest()
+
+
+def get_usd_mesh_hash(layer: Sdf.Layer, prim_path: Sdf.Path) -> Optional[str]:
+    # Hash the whole prim: attributes with their time samples and metadata, relationships (e.g. material bindings)
+    # and prim metadata, so that only meshes that look the same end up on one file
+    prim_spec = layer.GetPrimAtPath(prim_path)
+    if prim_spec is None:
+        return None
+    sha = hashlib.sha256()
+
+    def hash_value(value: Any) -> None:
+        if isinstance(value, Sdf.Path):
+            # Paths into the mesh are hashed relative to it, the name of the mesh must not keep meshes apart
+            sha.update(str(value.MakeRelativePath(prim_path) if value.HasPrefix(prim_path) else value).encode())
+        elif isinstance(value, Sdf.PathListOp):
+            sha.update(str(value.isExplicit).encode())
+            for items in [value.explicitItems, value.prependedItems, value.appendedItems, value.deletedItems]:
+                sha.update(b"[")
+                for item in items:
+                    hash_value(item)
+                sha.update(b"]")
+        elif isinstance(value, dict):
+            # Time samples and custom data
+            for key in sorted(value):
+                hash_value(key)
+                hash_value(value[key])
+        elif hasattr(value, "__len__") and not isinstance(value, str):
+            array = numpy.asarray(value)
+            sha.update(str(array.dtype).encode())
+            sha.update(str(list(value)).encode() if array.dtype == object else array.tobytes())
+        else:
+            sha.update(str(value).encode())
+
+    def hash_info(spec: Sdf.Spec) -> None:
+        for key in sorted(spec.ListInfoKeys()):
+            sha.update(key.encode())
+            hash_value(spec.GetInfo(key))
+
+    def hash_prim_spec(spec: Sdf.PrimSpec) -> None:
+        hash_info(spec)
+        for attribute in sorted(spec.attributes, key=lambda attribute: attribute.name):
+            sha.update(attribute.name.encode())
+            hash_info(attribute)
+        for relationship in sorted(spec.relationships, key=lambda relationship: relationship.name):
+            sha.update(relationship.name.encode())
+            hash_info(relationship)
+        for child_spec in sorted(spec.nameChildren, key=lambda child_spec: child_spec.name):
+            sha.update(child_spec.name.encode())
+            hash_prim_spec(child_spec)
+
+    hash_prim_spec(prim_spec)
+    return sha.hexdigest()
+
+
+def resolve_path(file_path: str, base_dir: str) -> Optional[str]:
+    if file_path.startswith("package://"):
+        return None
+    if file_path.startswith("file://"):
+        file_path = file_path[len("file://"):]
+    if not os.path.isabs(file_path):
+        if file_path[:2] == "./":
+            file_path = file_path[2:]
+        file_path = os.path.join(base_dir, file_path)
+    file_path = os.path.normpath(file_path)
+    return file_path if os.path.exists(file_path) else None
+
+
+def relative_path(file_path: str, base_dir: str, like: str) -> str:
+    # Write the new path in the same style as the one it replaces
+    if like.startswith("file://"):
+        return f"file://{file_path}"
+    if os.path.isabs(like):
+        return file_path
+    rel_path = os.path.relpath(file_path, base_dir)
+    return f"./{rel_path}" if like[:2] == "./" else rel_path
+
+
+class MeshSharer:
+    # Each distinct mesh is kept once: every reference to a mesh with the same geometry is pointed to the
+    # same file (the lexicographically first one, so that all formats of one house agree), and the files
+    # that nothing references anymore are deleted once all documents of the house are rewritten.
+
+    def __init__(self):
+        self.referenced_before: Set[str] = set()
+        self.referenced_after: Set[str] = set()
+        self._file_hashes: Dict[str, str] = {}
+
+    def get_file_hash(self, mesh_file_path: str) -> str:
+        if mesh_file_path not in self._file_hashes:
+            self._file_hashes[mesh_file_path] = get_mesh_file_hash(mesh_file_path)
+        return self._file_hashes[mesh_file_path]
+
+    def share_usd(self, usd_file_path: str) -> int:
+        layer = Sdf.Layer.FindOrOpen(usd_file_path)
+        base_dir = os.path.dirname(usd_file_path)
+        mesh_layers: Dict[str, Sdf.Layer] = {}
+        references: List[Tuple[Sdf.PrimSpec, int, str, Sdf.Path, str]] = []
+        canonicals: Dict[str, Tuple[str, Sdf.Path]] = {}
+
+        def collect(path: Sdf.Path) -> None:
+            if not path.IsPrimPath():
+                return
+            prim_spec = layer.GetPrimAtPath(path)
+            for item_idx, reference in enumerate(prim_spec.referenceList.prependedItems):
+                mesh_file_path = resolve_path(reference.assetPath, base_dir)
+                if mesh_file_path is None:
+                    continue
+                if mesh_file_path not in mesh_layers:
+                    mesh_layers[mesh_file_path] = Sdf.Layer.FindOrOpen(mesh_file_path)
+                mesh_layer = mesh_layers[mesh_file_path]
+                mesh_prim_path = reference.primPath
+                if mesh_prim_path.isEmpty:
+                    mesh_prim_path = Sdf.Path.absoluteRootPath.AppendChild(mesh_layer.defaultPrim)
+                mesh_hash = get_usd_mesh_hash(mesh_layer, mesh_prim_path)
+                if mesh_hash is None:
+                    continue
+                self.referenced_before.add(mesh_file_path)
+                references.append((prim_spec, item_idx, mesh_file_path, mesh_prim_path, mesh_hash))
+                if mesh_hash not in canonicals or (mesh_file_path, mesh_prim_path) < canonicals[mesh_hash]:
+                    canonicals[mesh_hash] = (mesh_file_path, mesh_prim_path)
+
+        layer.Traverse(Sdf.Path.absoluteRootPath, collect)
+
+        shared = 0
+        for prim_spec, item_idx, mesh_file_path, mesh_prim_path, mesh_hash in references:
+            canonical_file_path, canonical_prim_path = canonicals[mesh_hash]
+            self.referenced_after.add(canonical_file_path)
+            if (canonical_file_path, canonical_prim_path) == (mesh_file_path, mesh_prim_path):
+                continue
+            items = list(prim_spec.referenceList.prependedItems)
+            reference = items[item_idx]
+            items[item_idx] = Sdf.Reference(relative_path(canonical_file_path, base_dir, reference.assetPath),
+                                            canonical_prim_path,
+                                            reference.layerOffset,
+                                            reference.customData)
+            prim_spec.referenceList.prependedItems = items
+            shared += 1
+
+        layer.Save()
+        return shared
+
+    def share_mjcf(self, xml_file_path: str) -> int:
+        tree = ET.parse(xml_file_path)
+        root = tree.getroot()
+        base_dir = os.path.dirname(xml_file_path)
+        compiler = root.find("compiler")
+        mesh_dir = base_dir
+        if compiler is not None and compiler.get("meshdir") is not None:
+            mesh_dir = os.path.join(base_dir, compiler.get("meshdir"))
+
+        canonical_meshes: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], ET.Element] = {}
+        mesh_renames: Dict[str, str] = {}
+        for asset in root.iter("asset"):
+            for mesh in list(asset.findall("mesh")):
+                mesh_file_path = resolve_path(mesh.get("file", ""), mesh_dir)
+                if mesh_file_path is None:
+                    continue
+                self.referenced_before.add(mesh_file_path)
+                # Besides the file, every attribute of the mesh asset (scale, refpos, refquat, ...) has to match
+                mesh_attributes = tuple(sorted((name, value) for name, value in mesh.attrib.items()
+                                               if name not in ["name", "file"]))
+                key = (self.get_file_hash(mesh_file_path), mesh_attributes)
+                if key not in canonical_meshes:
+                    canonical_meshes[key] = mesh
+                    mesh.set("_path", mesh_file_path)
+                    continue
+                canonical_mesh = canonical_meshes[key]
+                if mesh_file_path < canonical_mesh.get("_path"):
+                    canonical_mesh.set("file", mesh.get("file"))
+                    canonical_mesh.set("_path", mesh_file_path)
+                mesh_renames[mesh.get("name")] = canonical_mesh.get("name")
+                asset.remove(mesh)
+
+        for mesh in canonical_meshes.values():
+            self.referenced_after.add(mesh.attrib.pop("_path"))
+
+        for geom in root.iter("geom"):
+            if geom.get("mesh") in mesh_renames:
+                geom.set("mesh", mesh_renames[geom.get("mesh")])
+
+        tree.write(xml_file_path)
+        return len(mesh_renames)
+
+    def share_urdf(self, urdf_file_path: str) -> int:
+        tree = ET.parse(urdf_file_path)
+        base_dir = os.path.dirname(urdf_file_path)
+        meshes = []
+        canonicals: Dict[str, str] = {}
+        for mesh in tree.getroot().iter("mesh"):
+            mesh_file_path = resolve_path(mesh.get("filename", ""), base_dir)
+            if mesh_file_path is None:
+                continue
+            self.referenced_before.add(mesh_file_path)
+            mesh_hash = self.get_file_hash(mesh_file_path)
+            meshes.append((mesh, mesh_file_path, mesh_hash))
+            if mesh_hash not in canonicals or mesh_file_path < canonicals[mesh_hash]:
+                canonicals[mesh_hash] = mesh_file_path
+
+        shared = 0
+        for mesh, mesh_file_path, mesh_hash in meshes:
+            canonical_file_path = canonicals[mesh_hash]
+            self.referenced_after.add(canonical_file_path)
+            if canonical_file_path != mesh_file_path:
+                mesh.set("filename", relative_path(canonical_file_path, base_dir, mesh.get("filename")))
+                shared += 1
+
+        tree.write(urdf_file_path)
+        return shared
+
+    def remove_unreferenced(self) -> int:
+        removed = 0
+        for mesh_file_path in self.referenced_before - self.referenced_after:
+            if os.path.exists(mesh_file_path):
+                os.remove(mesh_file_path)
+                removed += 1
+        return removed
+
+
+def share_meshes(usd_file_path: Optional[str] = None,
+                 urdf_file_path: Optional[str] = None,
+                 mjcf_file_path: Optional[str] = None) -> None:
+    mesh_sharer = MeshSharer()
+    if usd_file_path is not None and os.path.exists(usd_file_path):
+        print(f"Shared {mesh_sharer.share_usd(usd_file_path)} mesh references in {usd_file_path}")
+    if urdf_file_path is not None and os.path.exists(urdf_file_path):
+        print(f"Shared {mesh_sharer.share_urdf(urdf_file_path)} mesh references in {urdf_file_path}")
+    if mjcf_file_path is not None and os.path.exists(mjcf_file_path):
+        print(f"Shared {mesh_sharer.share_mjcf(mjcf_file_path)} mesh assets in {mjcf_file_path}")
+    print(f"Removed {mesh_sharer.remove_unreferenced()} duplicated mesh files")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write each distinct mesh once and reference it from every body")
+    parser.add_argument("--in_usd", type=str, required=False, help="Input USD")
+    parser.add_argument("--in_urdf", type=str, required=False, help="Input URDF")
+    parser.add_argument("--in_mjcf", type=str, required=False, help="Input MJCF")
+    args = parser.parse_args()
+    share_meshes(args.in_usd, args.in_urdf, args.in_mjcf)
+
+
+if __name__ == "__main__":
+    main()
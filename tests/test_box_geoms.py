@@ -0,0 +1,52 @@
+import numpy
+from scipy.spatial.transform import Rotation
+from pxr import Gf, UsdGeom
+
+import multiverse_stand_in
+
+# procthor_to_scene imports multiverse_parser, the stand-in is used where Multiverse is not installed
+multiverse_stand_in.install()
+from procthor_to_scene import add_box_geom  # noqa: E402
+from wall_geometry import box_corner_signs  # noqa: E402
+
+
+def get_cube_corners(cube: UsdGeom.Cube) -> numpy.ndarray:
+    # The corners of the cube in the frame of its body
+    transformation = cube.GetLocalTransformation()
+    corners = box_corner_signs * cube.GetSizeAttr().Get() / 2
+    return numpy.array([transformation.Transform(Gf.Vec3d(*[float(value) for value in corner]))
+                        for corner in corners])
+
+
+def test_box_geom_scale_is_half_extents(tmp_path):
+    world_builder = multiverse_stand_in.WorldBuilder(str(tmp_path / "house.usda"))
+    body_builder = world_builder.add_body(body_name="Box")
+    center = numpy.array([1.0, -2.0, 0.5])
+    half_extents = numpy.array([0.4, 0.05, 1.25])
+    rotation = Rotation.from_euler("xyz", [10, 20, 30], degrees=True)
+    geom_builder = add_box_geom(body_builder, "Box", center, half_extents, rotation.as_quat())
+
+    # A USD cube is 2 units wide, so its corners are the box corners
+    cube = UsdGeom.Cube(geom_builder.gprim.GetPrim())
+    assert cube.GetSizeAttr().Get() == 2.0
+    numpy.testing.assert_allclose(get_cube_corners(cube),
+                                  center + rotation.apply(box_corner_signs * half_extents), atol=1e-6)
+
+    # The MJCF exporter takes the scale as the box size, which MuJoCo reads as half extents,
+    # and the URDF exporter twice the scale as the full extents
+    transformation = cube.GetLocalTransformation()
+    scale = numpy.array([transformation.GetRow(i).GetLength() for i in range(3)])
+    numpy.testing.assert_allclose(scale, half_extents, atol=1e-6)
+    box_corners = rotation.inv().apply(get_cube_corners(cube) - center)
+    numpy.testing.assert_allclose(scale * 2, numpy.ptp(box_corners, axis=0), atol=1e-6)
+
+
+def test_wall_box_geom_matches_wall_points(tmp_path):
+    # As import_wall adds a wall segment with --wall_geom=box, without a rotation
+    world_builder = multiverse_stand_in.WorldBuilder(str(tmp_path / "house.usda"))
+    body_builder = world_builder.add_body(body_name="Wall_0")
+    points = numpy.array([0.0, 0.0, -0.05]) + (box_corner_signs + 1) / 2 * [3.0, 2.5, 0.1]
+    geom_builder = add_box_geom(body_builder, "Wall_0", (points.min(axis=0) + points.max(axis=0)) / 2,
+                                (points.max(axis=0) - points.min(axis=0)) / 2)
+    cube = UsdGeom.Cube(geom_builder.gprim.GetPrim())
+    numpy.testing.assert_allclose(get_cube_corners(cube), points, atol=1e-6)
@@ -0,0 +1,134 @@
+import io
+import os
+import glob
+import contextlib
+import pytest
+
+pxr = pytest.importorskip("pxr")
+from pxr import Usd, UsdGeom, Sdf
+
+from usd_layer_edit import get_class_parent_root_paths
+
+try:
+    from pxr import UsdOntology
+except ImportError:
+    UsdOntology = None
+
+# Only the clean up itself reads the SemanticTagAPI and RdfAPI schemas, choosing the roots it removes is plain pxr
+requires_ontology = pytest.mark.skipif(UsdOntology is None, reason="pxr has no UsdOntology")
+
+ontology_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "ontology")
+
+ontology_usd_files = sorted(glob.glob(os.path.join(ontology_dir, "*.usda")))
+
+
+def get_reference_remove_prim_paths(stage: Usd.Stage):
+    # The roots the clean up of the baseline removes
+    return [prim.GetPath() for prim in stage.GetPseudoRoot().GetChildren()
+            if any([child_prim.IsAbstract() for child_prim in prim.GetAllChildren()])]
+
+
+def reference_clean_up(stage: Usd.Stage) -> None:
+    # The clean up of the baseline through the Usd API, without the export
+    keep_prims = {}
+
+    for xform_prim in [prim for prim in stage.TraverseAll() if prim.IsA(UsdGeom.Xform)]:
+        if xform_prim.HasAPI(UsdOntology.SemanticTagAPI):
+            semanticTagAPI = UsdOntology.SemanticTagAPI(xform_prim)
+            for prim_path in semanticTagAPI.GetSemanticLabelsRel().GetTargets():
+                prim = stage.GetPrimAtPath(prim_path)
+                if prim not in keep_prims:
+                    rdf_api = UsdOntology.RdfAPI(prim)
+                    keep_prims[prim] = [rdf_api.GetRdfConceptNameAttr().Get(),
+                                        rdf_api.GetRdfNamespaceAttr().Get(),
+                                        rdf_api.GetRdfDefinitionAttr().Get()]
+
+            for prim_path in semanticTagAPI.GetSemanticReportsRel().GetTargets():
+                prim = stage.GetPrimAtPath(prim_path)
+                if prim not in keep_prims:
+                    rdf_api = UsdOntology.RdfAPI(prim)
+                    keep_prims[prim] = [rdf_api.GetRdfConceptNameAttr().Get(),
+                                        rdf_api.GetRdfNamespaceAttr().Get(),
+                                        rdf_api.GetRdfDefinitionAttr().Get()]
+
+    for prim in stage.GetPseudoRoot().GetChildren():
+        if any([child_prim.IsAbstract() for child_prim in prim.GetAllChildren()]):
+            stage.RemovePrim(prim.GetPath())
+
+    for prim in keep_prims:
+        class_prim = stage.CreateClassPrim(prim.GetPath())
+        rdf_api = UsdOntology.RdfAPI.Apply(class_prim)
+        rdf_api.CreateRdfConceptNameAttr().Set(keep_prims[prim][0])
+        rdf_api.CreateRdfNamespaceAttr().Set(keep_prims[prim][1])
+        if isinstance(keep_prims[prim][2], str):
+            rdf_api.CreateRdfDefinitionAttr().Set(keep_prims[prim][2])
+
+
+def copy_layer(flatten_layer: Sdf.Layer) -> Sdf.Layer:
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    layer.TransferContent(flatten_layer)
+    return layer
+
+
+def clean_up_all_modes(flatten_layer: Sdf.Layer):
+    from clean_up_usd import clean_up_layer, clean_up_stage
+
+    reference_stage = Usd.Stage.Open(copy_layer(flatten_layer))
+    reference_clean_up(reference_stage)
+
+    stage = Usd.Stage.Open(copy_layer(flatten_layer))
+    clean_up_stage(stage)
+
+    layer = copy_layer(flatten_layer)
+    clean_up_layer(layer)
+    return reference_stage.GetRootLayer(), stage.GetRootLayer(), layer
+
+
+def test_remove_prim_paths_match_on_root_kinds():
+    layer = Sdf.Layer.CreateAnonymous(".usda")
+    for root_name, specifier, active in [("Ontology", Sdf.SpecifierDef, True),
+                                         ("_class_namespace", Sdf.SpecifierClass, True),
+                                         ("Over", Sdf.SpecifierOver, True),
+                                         ("Inactive", Sdf.SpecifierDef, False),
+                                         ("House", Sdf.SpecifierDef, True),
+                                         ("Nested", Sdf.SpecifierDef, True)]:
+        root_prim_spec = Sdf.PrimSpec(layer, root_name, specifier, "Xform")
+        root_prim_spec.active = active
+        child_prim_spec = Sdf.PrimSpec(root_prim_spec, "Child", Sdf.SpecifierDef, "Xform")
+        if root_name == "Nested":
+            Sdf.PrimSpec(child_prim_spec, "Class", Sdf.SpecifierClass)
+        elif root_name != "House":
+            Sdf.PrimSpec(root_prim_spec, "Class", Sdf.SpecifierClass)
+    remove_prim_paths = get_class_parent_root_paths(layer)
+    assert remove_prim_paths == get_reference_remove_prim_paths(Usd.Stage.Open(layer))
+    assert remove_prim_paths == [Sdf.Path("/Ontology")]
+
+
+@pytest.mark.parametrize("ontology_usd_file", ontology_usd_files)
+def test_remove_prim_paths_match_on_ontology(ontology_usd_file):
+    # The ontology has class prims at the root, e.g. _class_SOMA_namespace, which the baseline keeps
+    flatten_layer = Usd.Stage.Open(ontology_usd_file).Flatten()
+    remove_prim_paths = get_class_parent_root_paths(flatten_layer)
+    assert remove_prim_paths == get_reference_remove_prim_paths(Usd.Stage.Open(flatten_layer))
+    assert len(remove_prim_paths) > 0
+    assert any(prim_spec.specifier == Sdf.SpecifierClass and prim_spec.path not in remove_prim_paths
+               for prim_spec in flatten_layer.rootPrims)
+
+
+@requires_ontology
+@pytest.mark.parametrize("ontology_usd_file", ontology_usd_files)
+def test_modes_match_reference_on_ontology(ontology_usd_file):
+    reference_layer, stage_layer, layer = clean_up_all_modes(Usd.Stage.Open(ontology_usd_file).Flatten())
+    assert stage_layer.ExportToString() == reference_layer.ExportToString()
+    assert layer.ExportToString() == reference_layer.ExportToString()
+
+
+@requires_ontology
+@pytest.mark.parametrize("ontology_usd_file", ontology_usd_files)
+def test_modes_match_reference_on_house_tagged_with_ontology(tmp_path, ontology_usd_file):
+    from benchmark_clean_up import make_synthetic_flatten_usd
+    with contextlib.redirect_stdout(io.StringIO()):
+        flatten_raw_usd = make_synthetic_flatten_usd(str(tmp_path), 50, ontology_usd_file)
+    reference_layer, stage_layer, layer = clean_up_all_modes(Sdf.Layer.FindOrOpen(flatten_raw_usd))
+    assert stage_layer.ExportToString() == reference_layer.ExportToString()
+    assert layer.ExportToString() == reference_layer.ExportToString()
@@ -0,0 +1,85 @@
+import numpy
+import pytest
+
+from collision_mesh import is_closed, fit_box, cluster_vertices
+from wall_geometry import box_corner_signs, box_face_vertex_indices
+
+# Unit cube from 0 to 1, the faces of the box in wall_geometry.py point outwards
+cube_points = (box_corner_signs + 1) / 2.0
+
+# The two triangles of every face, in the order of box_face_vertex_indices: -x, +y, +x, -y, -z, +z
+cube_face_triangles = {"-x": [0, 6], "+y": [1, 7], "+x": [2, 8], "-y": [3, 9], "-z": [4, 10], "+z": [5, 11]}
+
+
+def get_open_cube(missing_face: str) -> numpy.ndarray:
+    return numpy.delete(box_face_vertex_indices, cube_face_triangles[missing_face], axis=0)
+
+
+def test_closed_cube_is_closed():
+    assert is_closed(box_face_vertex_indices)
+
+
+def test_open_cube_is_not_closed():
+    assert not is_closed(get_open_cube("+x"))
+
+
+def test_flipped_face_is_not_closed():
+    face_vertex_indices = box_face_vertex_indices.copy()
+    face_vertex_indices[0] = face_vertex_indices[0][::-1]
+    assert not is_closed(face_vertex_indices)
+
+
+@pytest.mark.parametrize("offset", [0.0, 10.0, -10.0])
+def test_fit_box_accepts_closed_cube(offset):
+    box = fit_box(cube_points + offset, box_face_vertex_indices)
+    assert box is not None
+    center, half_extents, rotation = box
+    numpy.testing.assert_allclose(center, numpy.full(3, 0.5 + offset), atol=1e-9)
+    numpy.testing.assert_allclose(numpy.sort(half_extents), numpy.full(3, 0.5), atol=1e-9)
+    numpy.testing.assert_allclose(rotation.T @ rotation, numpy.eye(3), atol=1e-9)
+
+
+@pytest.mark.parametrize("missing_face", sorted(cube_face_triangles))
+@pytest.mark.parametrize("offset", [0.0, 10.0, -10.0])
+def test_fit_box_rejects_open_cube(missing_face, offset):
+    # Whether an open mesh is accepted must not depend on where it sits relative to the origin
+    assert fit_box(cube_points + offset, get_open_cube(missing_face)) is None
+
+
+def test_fit_box_rejects_non_box():
+    # A closed tetrahedron fills a sixth of its bounding box
+    points = numpy.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=float)
+    face_vertex_indices = numpy.array([[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]])
+    assert is_closed(face_vertex_indices)
+    assert fit_box(points, face_vertex_indices) is None
+
+
+def test_cluster_vertices_keeps_coarse_mesh():
+    # One cell per corner: nothing merges
+    points, face_vertex_indices = cluster_vertices(cube_points, box_face_vertex_indices, 2)
+    numpy.testing.assert_allclose(points[face_vertex_indices], cube_points[box_face_vertex_indices])
+
+
+def test_cluster_vertices_merges_close_points():
+    # A second cube 0.01 away from the corners of the first falls into the same cells, so the merged mesh is one
+    # cube at the middle and the faces that end up twice are dropped
+    points = numpy.concatenate([cube_points, cube_points * 0.98 + 0.01])
+    face_vertex_indices = numpy.concatenate([box_face_vertex_indices, box_face_vertex_indices + 8])
+    merged_points, merged_face_vertex_indices = cluster_vertices(points, face_vertex_indices, 2)
+    assert merged_points.shape == (8, 3) and merged_face_vertex_indices.shape == (12, 3)
+    assert merged_points.dtype == numpy.float32 and merged_face_vertex_indices.dtype == numpy.int32
+    assert is_closed(merged_face_vertex_indices)
+    numpy.testing.assert_allclose(numpy.sort(merged_points, axis=0), numpy.sort(cube_points * 0.99 + 0.005, axis=0),
+                                  atol=1e-6)
+
+
+def test_cluster_vertices_drops_collapsed_faces():
+    # At one cell along every side the whole mesh collapses into a point
+    points, face_vertex_indices = cluster_vertices(cube_points, box_face_vertex_indices, 1)
+    assert len(points) == 0 and len(face_vertex_indices) == 0
+
+
+def test_cluster_vertices_single_point():
+    points = numpy.zeros((3, 3))
+    merged_points, merged_face_vertex_indices = cluster_vertices(points, numpy.array([[0, 1, 2]]), 4)
+    assert len(merged_points) == 0 and len(merged_face_vertex_indices) == 0
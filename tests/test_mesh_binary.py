@@ -0,0 +1,69 @@
+import os
+import numpy
+
+from collision_mesh import is_closed
+from mesh_binary import (stl_record_dtype, weld_triangles, write_mesh_binary, read_mesh_binary, load_stl_mesh,
+                         get_triangle_count)
+from wall_geometry import box_corner_signs, box_face_vertex_indices
+
+cube_points = (box_corner_signs + 1) / 2.0
+
+# Every corner once per triangle, as an STL stores them
+cube_triangles = cube_points[box_face_vertex_indices].astype(numpy.float32)
+
+
+def write_binary_stl(stl_file_path: str, triangles: numpy.ndarray):
+    records = numpy.zeros(len(triangles), dtype=stl_record_dtype)
+    records["vertices"] = triangles
+    with open(stl_file_path, "wb") as f:
+        f.write(bytes(80))
+        f.write(numpy.uint32(len(triangles)).tobytes())
+        f.write(records.tobytes())
+
+
+def test_weld_triangles_cube():
+    points, face_vertex_indices = weld_triangles(cube_triangles)
+    assert points.shape == (8, 3) and face_vertex_indices.shape == (12, 3)
+    assert points.dtype == numpy.float32 and face_vertex_indices.dtype == numpy.int32
+    numpy.testing.assert_array_equal(points[face_vertex_indices], cube_triangles)
+    assert is_closed(face_vertex_indices)
+
+
+def test_weld_triangles_keeps_first_appearance_order():
+    triangles = numpy.array([[[2, 0, 0], [0, 1, 0], [0, 0, 0]],
+                             [[0, 0, 0], [0, 1, 0], [1, 1, 1]]], dtype=numpy.float32)
+    points, face_vertex_indices = weld_triangles(triangles)
+    numpy.testing.assert_array_equal(points, [[2, 0, 0], [0, 1, 0], [0, 0, 0], [1, 1, 1]])
+    numpy.testing.assert_array_equal(face_vertex_indices, [[0, 1, 2], [2, 1, 3]])
+
+
+def test_weld_triangles_merges_negative_zero():
+    triangles = numpy.array([[[0, 0, 0], [1, 0, 0], [0, 1, 0]],
+                             [[-0.0, -0.0, -0.0], [0, 1, 0], [0, 0, 1]]], dtype=numpy.float32)
+    points, face_vertex_indices = weld_triangles(triangles)
+    assert len(points) == 4
+    numpy.testing.assert_array_equal(face_vertex_indices, [[0, 1, 2], [0, 2, 3]])
+
+
+def test_weld_triangles_empty():
+    points, face_vertex_indices = weld_triangles(numpy.zeros((0, 3, 3), dtype=numpy.float32))
+    assert points.shape == (0, 3) and face_vertex_indices.shape == (0, 3)
+
+
+def test_mesh_binary_matches_stl(tmp_path):
+    stl_file_path = str(tmp_path / "cube.stl")
+    write_binary_stl(stl_file_path, cube_triangles)
+    assert read_mesh_binary(stl_file_path) is None
+    assert get_triangle_count(stl_file_path) == 12
+
+    write_mesh_binary(stl_file_path)
+    mesh_arrays = read_mesh_binary(stl_file_path)
+    for array_name, array in load_stl_mesh(stl_file_path).items():
+        numpy.testing.assert_array_equal(mesh_arrays[array_name], array)
+    assert get_triangle_count(stl_file_path) == 12
+
+    # A changed STL makes the mesh binary stale
+    write_binary_stl(stl_file_path, cube_triangles[:6])
+    os.utime(stl_file_path, ns=(0, 0))
+    assert read_mesh_binary(stl_file_path) is None
+    assert get_triangle_count(stl_file_path) == 6
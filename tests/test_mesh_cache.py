@@ -0,0 +1,25 @@
+import multiverse_stand_in
+from mesh_cache import MeshCache
+
+# procthor_to_scene imports multiverse_parser, the stand-in is used where Multiverse is not installed
+multiverse_stand_in.install()
+from procthor_to_scene import get_config_settings, get_multiverse_parser_version  # noqa: E402
+
+
+def test_key_changes_with_settings(tmp_path):
+    stl_file_path = tmp_path / "mesh.stl"
+    stl_file_path.write_bytes(b"solid mesh\nendsolid mesh\n")
+    mesh_cache = MeshCache(cache_dir=str(tmp_path / "cache"))
+    settings = {"merge_mesh": True, "format": ".usda",
+                "config": get_config_settings(multiverse_stand_in.Configuration(model_name="house_0")),
+                "multiverse_parser": get_multiverse_parser_version()}
+    key = mesh_cache.get_key(str(stl_file_path), settings)
+    assert mesh_cache.get_key(str(stl_file_path), dict(settings)) == key
+
+    other_config = get_config_settings(multiverse_stand_in.Configuration(model_name="house_0", with_physics=False))
+    assert mesh_cache.get_key(str(stl_file_path), {**settings, "config": other_config}) != key
+    assert mesh_cache.get_key(str(stl_file_path), {**settings, "multiverse_parser": "0.0.0"}) != key
+    assert mesh_cache.get_key(str(stl_file_path), {**settings, "format": ".usdc"}) != key
+
+    stl_file_path.write_bytes(b"solid other\nendsolid other\n")
+    assert mesh_cache.get_key(str(stl_file_path), settings) != key
@@ -0,0 +1,14 @@
+import pytest
+
+import multiverse_stand_in
+
+
+def test_stand_in_refuses_mesh_conversion_and_exports(tmp_path):
+    factory = multiverse_stand_in.Factory(str(tmp_path / "house.usda"), multiverse_stand_in.Configuration())
+    with pytest.raises(RuntimeError, match="--stl_loader=numpy"):
+        factory.import_mesh(str(tmp_path / "mesh.stl"), merge_mesh=True)
+    for exporter_class in [multiverse_stand_in.MjcfExporter, multiverse_stand_in.UrdfExporter]:
+        with pytest.raises(RuntimeError, match="--formats=usd"):
+            exporter_class(str(tmp_path / "house.xml"), factory)
+    with pytest.raises(RuntimeError, match="--formats"):
+        multiverse_stand_in.UsdImporter(str(tmp_path / "house.usda"), fixed_base=None)
@@ -0,0 +1,91 @@
+import os
+import xml.etree.ElementTree as ET
+from typing import List, Optional
+
+from pxr import Sdf, Usd, UsdGeom, UsdShade
+
+from share_meshes import MeshSharer, get_usd_mesh_hash
+
+
+def write_mesh_usd(usd_file_path: str, mesh_name: str, material_name: Optional[str]) -> None:
+    # A mesh file as the exporters write it: the mesh under a default prim named after it, bound to a material
+    # next to it in the same file
+    stage = Usd.Stage.CreateNew(usd_file_path)
+    root = UsdGeom.Xform.Define(stage, f"/{mesh_name}")
+    stage.SetDefaultPrim(root.GetPrim())
+    mesh = UsdGeom.Mesh.Define(stage, f"/{mesh_name}/mesh")
+    mesh.CreatePointsAttr([(0, 0, 0), (1, 0, 0), (0, 1, 0)])
+    mesh.CreateFaceVertexCountsAttr([3])
+    mesh.CreateFaceVertexIndicesAttr([0, 1, 2])
+    if material_name is not None:
+        material = UsdShade.Material.Define(stage, f"/Materials/{material_name}")
+        UsdShade.MaterialBindingAPI.Apply(mesh.GetPrim()).Bind(material)
+    stage.Save()
+
+
+def write_house_usd(usd_file_path: str, mesh_names: List[str]) -> None:
+    stage = Usd.Stage.CreateNew(usd_file_path)
+    for mesh_name in mesh_names:
+        body = UsdGeom.Xform.Define(stage, f"/house/{mesh_name}_body")
+        body.GetPrim().GetReferences().AddReference(f"./meshes/{mesh_name}.usda")
+    stage.Save()
+
+
+def get_references(usd_file_path: str):
+    layer = Sdf.Layer.FindOrOpen(usd_file_path)
+    layer.Reload()
+    return {prim_spec.name: prim_spec.referenceList.prependedItems[0].assetPath
+            for prim_spec in layer.GetPrimAtPath("/house").nameChildren}
+
+
+def test_usd_mesh_hash_ignores_the_mesh_name(tmp_path):
+    write_mesh_usd(str(tmp_path / "a.usda"), "a", "Red")
+    write_mesh_usd(str(tmp_path / "b.usda"), "b", "Red")
+    assert (get_usd_mesh_hash(Sdf.Layer.FindOrOpen(str(tmp_path / "a.usda")), Sdf.Path("/a"))
+            == get_usd_mesh_hash(Sdf.Layer.FindOrOpen(str(tmp_path / "b.usda")), Sdf.Path("/b")))
+
+
+def test_share_usd_keeps_meshes_with_other_materials_apart(tmp_path):
+    os.makedirs(tmp_path / "meshes")
+    write_mesh_usd(str(tmp_path / "meshes" / "red_0.usda"), "red_0", "Red")
+    write_mesh_usd(str(tmp_path / "meshes" / "red_1.usda"), "red_1", "Red")
+    write_mesh_usd(str(tmp_path / "meshes" / "blue.usda"), "blue", "Blue")
+    write_mesh_usd(str(tmp_path / "meshes" / "plain.usda"), "plain", None)
+    house_usd_file_path = str(tmp_path / "house.usda")
+    write_house_usd(house_usd_file_path, ["red_0", "red_1", "blue", "plain"])
+
+    mesh_sharer = MeshSharer()
+    assert mesh_sharer.share_usd(house_usd_file_path) == 1
+    assert get_references(house_usd_file_path) == {"red_0_body": "./meshes/red_0.usda",
+                                                   "red_1_body": "./meshes/red_0.usda",
+                                                   "blue_body": "./meshes/blue.usda",
+                                                   "plain_body": "./meshes/plain.usda"}
+    assert mesh_sharer.remove_unreferenced() == 1
+    assert sorted(os.listdir(tmp_path / "meshes")) == ["blue.usda", "plain.usda", "red_0.usda"]
+
+
+def test_share_mjcf_keeps_meshes_with_other_attributes_apart(tmp_path):
+    for mesh_name in ["a", "b", "c"]:
+        (tmp_path / f"{mesh_name}.obj").write_text("v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n")
+    xml_file_path = str(tmp_path / "house.xml")
+    with open(xml_file_path, "w") as f:
+        f.write('<mujoco><asset>'
+                '<mesh name="a" file="a.obj" refquat="1 0 0 0"/>'
+                '<mesh name="b" file="b.obj" refquat="1 0 0 0"/>'
+                '<mesh name="c" file="c.obj" refquat="0 1 0 0"/>'
+                '</asset><worldbody>'
+                '<geom type="mesh" mesh="a"/><geom type="mesh" mesh="b"/><geom type="mesh" mesh="c"/>'
+                '</worldbody></mujoco>')
+
+    assert MeshSharer().share_mjcf(xml_file_path) == 1
+    root = ET.parse(xml_file_path).getroot()
+    assert [mesh.get("name") for mesh in root.iter("mesh")] == ["a", "c"]
+    assert [geom.get("mesh") for geom in root.iter("geom")] == ["a", "a", "c"]
+
+
+def test_usd_mesh_hash_sees_time_samples(tmp_path):
+    write_mesh_usd(str(tmp_path / "a.usda"), "a", None)
+    layer = Sdf.Layer.FindOrOpen(str(tmp_path / "a.usda"))
+    mesh_hash = get_usd_mesh_hash(layer, Sdf.Path("/a"))
+    layer.SetTimeSample(Sdf.Path("/a/mesh.points"), 1.0, [(0, 0, 0), (2, 0, 0), (0, 2, 0)])
+    assert get_usd_mesh_hash(layer, Sdf.Path("/a")) != mesh_hash
@@ -0,0 +1,76 @@
+import io
+import shutil
+import contextlib
+
+import numpy
+import pytest
+
+import multiverse_stand_in
+
+# import_mesh converts the STL with the Blender of Multiverse, the stand-in can't
+if multiverse_stand_in.install():
+    pytest.skip("multiverse_parser is the stand-in, import_mesh needs Multiverse", allow_module_level=True)
+
+from multiverse_parser import Configuration, Factory, MeshProperty  # noqa: E402
+from procthor_to_scene import ProcthorImporter  # noqa: E402
+from mesh_binary import stl_record_dtype, load_stl_mesh  # noqa: E402
+from wall_geometry import box_corner_signs, box_face_vertex_indices  # noqa: E402
+
+if shutil.which("blender") is None:
+    pytest.skip("import_mesh needs Blender", allow_module_level=True)
+
+
+@pytest.fixture
+def stl_file_path(tmp_path) -> str:
+    # A box with a roof, shifted off the origin, so that the faces have different normals and sizes
+    box_points = (box_corner_signs + 1) / 2.0 * [0.4, 0.3, 0.2] + [1.0, -2.0, 0.5]
+    top = box_points[:, 2].max()
+    top_points = box_points[box_points[:, 2] == top]
+    apex = numpy.append(top_points[:, :2].mean(axis=0), top + 0.1)
+    # The top of the box is replaced by the four sides of the roof, which point outwards like the box faces
+    box_triangles = [triangle for triangle in box_points[box_face_vertex_indices]
+                     if not numpy.all(triangle[:, 2] == top)]
+    center = top_points[:, :2].mean(axis=0)
+    angles = numpy.arctan2(top_points[:, 1] - center[1], top_points[:, 0] - center[0])
+    top_points = top_points[numpy.argsort(angles)]
+    roof_triangles = [[top_points[i], top_points[(i + 1) % 4], apex] for i in range(4)]
+    triangles = numpy.array(box_triangles + roof_triangles, dtype=numpy.float32)
+
+    stl_file_path = str(tmp_path / "Roofed_Box.stl")
+    records = numpy.zeros(len(triangles), dtype=stl_record_dtype)
+    records["vertices"] = triangles
+    with open(stl_file_path, "wb") as f:
+        f.write(bytes(80))
+        f.write(numpy.uint32(len(triangles)).tobytes())
+        f.write(records.tobytes())
+    return stl_file_path
+
+
+def get_corners(mesh_property: MeshProperty) -> numpy.ndarray:
+    # The point and the normal of every face corner, each face starts at its smallest point to keep its winding,
+    # and the faces are sorted by their points, so that the order of the points and the faces does not matter
+    points = numpy.asarray(mesh_property.points, dtype=numpy.float64)
+    face_vertex_indices = numpy.asarray(mesh_property.face_vertex_indices).reshape(-1, 3)
+    normals = numpy.asarray(mesh_property.normals, dtype=numpy.float64).reshape(-1, 3)
+    if len(normals) != face_vertex_indices.size:
+        normals = normals[face_vertex_indices.ravel()]
+    corners = numpy.concatenate([points[face_vertex_indices], normals.reshape(-1, 3, 3)], axis=2)
+    faces = []
+    for face in corners:
+        start = min(range(3), key=lambda corner_idx: tuple(face[corner_idx, :3].round(4)))
+        faces.append(numpy.roll(face, -start, axis=0))
+    return numpy.array(sorted(faces, key=lambda face: tuple(face[:, :3].round(4).ravel())))
+
+
+def test_numpy_loader_matches_import_mesh(stl_file_path):
+    factory = Factory(file_path=stl_file_path, config=Configuration())
+    with contextlib.redirect_stdout(io.StringIO()):
+        tmp_usd_mesh_file_path, _ = factory.import_mesh(mesh_file_path=stl_file_path, merge_mesh=True)
+    import_mesh_meshes = ProcthorImporter.read_usd_meshes(tmp_usd_mesh_file_path)
+    numpy_meshes = [ProcthorImporter.get_array_mesh(stl_file_path, load_stl_mesh(stl_file_path))]
+
+    assert [mesh_name for mesh_name, _ in numpy_meshes] == [mesh_name for mesh_name, _ in import_mesh_meshes]
+    for (_, numpy_mesh), (_, import_mesh_mesh) in zip(numpy_meshes, import_mesh_meshes):
+        assert len(numpy_mesh.points) == len(import_mesh_mesh.points)
+        numpy.testing.assert_array_equal(numpy_mesh.face_vertex_counts, import_mesh_mesh.face_vertex_counts)
+        numpy.testing.assert_allclose(get_corners(numpy_mesh), get_corners(import_mesh_mesh), atol=1e-5)
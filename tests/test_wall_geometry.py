@@ -0,0 +1,144 @@
+from typing import List, Tuple
+import numpy
+import pytest
+
+from house_model import Wall, Opening
+from wall_geometry import wall_half_thickness, subtract_intervals, cut_holes, get_wall_boxes
+
+wall_height = 2.5
+
+
+def get_area(boxes: numpy.ndarray) -> float:
+    return float(numpy.sum((boxes[:, 1] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 2])))
+
+
+def assert_partition(length: float, bottom: float, top: float, holes: numpy.ndarray, boxes: numpy.ndarray):
+    # The boxes stay in the wall, do not overlap each other or a hole, and cover the wall around the holes
+    assert numpy.all(boxes[:, 0] >= 0.0) and numpy.all(boxes[:, 1] <= length)
+    assert numpy.all(boxes[:, 2] >= bottom) and numpy.all(boxes[:, 3] <= top)
+    assert numpy.all(boxes[:, 1] > boxes[:, 0]) and numpy.all(boxes[:, 3] > boxes[:, 2])
+    rects = numpy.concatenate([boxes, holes])
+    for i in range(len(rects)):
+        for j in range(i + 1, len(rects)):
+            overlap_s = min(rects[i, 1], rects[j, 1]) - max(rects[i, 0], rects[j, 0])
+            overlap_y = min(rects[i, 3], rects[j, 3]) - max(rects[i, 2], rects[j, 2])
+            assert overlap_s <= 1e-9 or overlap_y <= 1e-9
+    assert get_area(boxes) + get_area(holes) == pytest.approx(length * (top - bottom))
+
+
+def test_subtract_intervals():
+    free = subtract_intervals(0.0, 10.0, numpy.array([[6.0, 8.0], [1.0, 3.0], [2.0, 4.0]]))
+    numpy.testing.assert_allclose(free, [[0.0, 1.0], [4.0, 6.0], [8.0, 10.0]])
+
+
+def test_cut_holes_without_holes():
+    numpy.testing.assert_allclose(cut_holes(4.0, 0.0, 2.5, numpy.zeros((0, 4))), [[0.0, 4.0, 0.0, 2.5]])
+
+
+def test_cut_holes_door_and_window():
+    holes = numpy.array([[0.5, 1.5, 0.0, 2.1], [2.5, 3.5, 1.0, 2.0]])
+    boxes = cut_holes(4.0, 0.0, 2.5, holes)
+    assert_partition(4.0, 0.0, 2.5, holes, boxes)
+
+
+def test_cut_holes_takes_vertical_bands_when_fewer():
+    # Two windows above each other: 7 boxes in horizontal bands, 5 in vertical bands
+    holes = numpy.array([[1.0, 2.0, 0.5, 1.0], [1.0, 2.0, 1.5, 2.0]])
+    boxes = cut_holes(3.0, 0.0, 2.5, holes)
+    assert len(boxes) == 5
+    assert_partition(3.0, 0.0, 2.5, holes, boxes)
+
+
+def test_cut_holes_clips_holes_to_the_wall():
+    boxes = cut_holes(4.0, 0.0, 2.5, numpy.array([[-1.0, 1.0, -1.0, 3.0]]))
+    numpy.testing.assert_allclose(boxes, [[1.0, 4.0, 0.0, 2.5]])
+
+
+def test_cut_holes_random():
+    rng = numpy.random.default_rng(0)
+    for _ in range(50):
+        starts = rng.uniform(0.0, 4.0, size=(3, 2))
+        holes = numpy.stack([starts[:, 0], starts[:, 0] + 0.3, starts[:, 1] / 2, starts[:, 1] / 2 + 0.3], axis=1)
+        holes[:, [0, 1]] = numpy.clip(holes[:, [0, 1]], 0.0, 4.0)
+        holes[:, [2, 3]] = numpy.clip(holes[:, [2, 3]], 0.0, 2.5)
+        boxes = cut_holes(4.0, 0.0, 2.5, holes)
+        # Overlapping holes are merged by the split, so only the covered area is compared
+        assert get_area(boxes) <= 4.0 * 2.5
+        assert numpy.all(boxes[:, 1] > boxes[:, 0]) and numpy.all(boxes[:, 3] > boxes[:, 2])
+
+
+def make_wall(start: Tuple[float, float], end: Tuple[float, float]) -> Wall:
+    # Corners as in ProcTHOR: bottom start, bottom end, top start, top end, with x and z of the floor plan
+    return Wall({"id": f"wall|0|{start[0]}|{start[1]}|{end[0]}|{end[1]}",
+                 "polygon": [{"x": start[0], "y": 0.0, "z": start[1]},
+                             {"x": end[0], "y": 0.0, "z": end[1]},
+                             {"x": start[0], "y": wall_height, "z": start[1]},
+                             {"x": end[0], "y": wall_height, "z": end[1]}]}, 0)
+
+
+def make_opening(wall: Wall, hole: List[float]) -> Opening:
+    # hole is start and end along the wall, bottom and top
+    return Opening({"id": f"opening|{hole}", "wall0": wall.id,
+                    "holePolygon": [{"x": hole[0], "y": hole[2], "z": 0.0},
+                                    {"x": hole[1], "y": hole[3], "z": 0.0}]}, 0)
+
+
+def get_bounds(box_points: numpy.ndarray) -> numpy.ndarray:
+    # (K, 8, 3) box corners -> (K, 2, 3) lower and upper corners
+    return numpy.stack([box_points.min(axis=1), box_points.max(axis=1)], axis=1)
+
+
+def get_volume(box_points: numpy.ndarray) -> float:
+    bounds = get_bounds(box_points)
+    return float(numpy.sum(numpy.prod(bounds[:, 1] - bounds[:, 0], axis=1)))
+
+
+@pytest.mark.parametrize("start, end", [((0.0, 1.0), (4.0, 1.0)), ((4.0, 1.0), (0.0, 1.0)),
+                                        ((1.0, 0.0), (1.0, 4.0)), ((1.0, 4.0), (1.0, 0.0))])
+def test_get_wall_boxes_solid_wall(start: Tuple[float, float], end: Tuple[float, float]):
+    wall = make_wall(start, end)
+    boxes = get_wall_boxes([wall], {}, {})
+    assert len(boxes) == 1 and boxes[0].shape == (1, 8, 3)
+    bounds = get_bounds(boxes[0])[0]
+    lower = numpy.minimum(wall.polygon[0], wall.polygon[3])
+    upper = numpy.maximum(wall.polygon[0], wall.polygon[3])
+    across = 0 if start[0] == end[0] else 2
+    lower[across] -= wall_half_thickness
+    upper[across] += wall_half_thickness
+    numpy.testing.assert_allclose(bounds, [lower, upper], atol=1e-9)
+
+
+@pytest.mark.parametrize("start, end", [((0.0, 1.0), (4.0, 1.0)), ((1.0, 0.0), (1.0, 4.0))])
+def test_get_wall_boxes_single_door_matches_cut_holes(start: Tuple[float, float], end: Tuple[float, float]):
+    # The three boxes around a single door cover the same wall as the split of cut_holes does
+    wall = make_wall(start, end)
+    door = make_opening(wall, [1.0, 2.0, 0.0, 2.1])
+    door_boxes = get_wall_boxes([wall], {wall.id: [door]}, {})[0]
+    # A window outside of the wall leaves the wall as it is, but takes the path through cut_holes
+    window = make_opening(wall, [5.0, 6.0, 1.0, 2.0])
+    cut_boxes = get_wall_boxes([wall], {wall.id: [door]}, {wall.id: [window]})[0]
+    assert len(door_boxes) == 3
+    expected_volume = (4.0 * wall_height - 1.0 * 2.1) * 2 * wall_half_thickness
+    assert get_volume(door_boxes) == pytest.approx(expected_volume)
+    assert get_volume(cut_boxes) == pytest.approx(expected_volume)
+    for boxes in [door_boxes, cut_boxes]:
+        bounds = get_bounds(boxes)
+        numpy.testing.assert_allclose(bounds[:, 0].min(axis=0), get_bounds(get_wall_boxes([wall], {}, {})[0])[0, 0])
+        numpy.testing.assert_allclose(bounds[:, 1].max(axis=0), get_bounds(get_wall_boxes([wall], {}, {})[0])[0, 1])
+
+
+def test_get_wall_boxes_door_and_windows():
+    wall = make_wall((0.0, 1.0), (6.0, 1.0))
+    door = make_opening(wall, [0.5, 1.5, 0.0, 2.1])
+    windows = [make_opening(wall, [2.5, 3.5, 1.0, 2.0]), make_opening(wall, [4.0, 5.5, 0.8, 1.8])]
+    boxes = get_wall_boxes([wall], {wall.id: [door]}, {wall.id: windows})[0]
+    hole_area = 1.0 * 2.1 + 1.0 * 1.0 + 1.5 * 1.0
+    assert get_volume(boxes) == pytest.approx((6.0 * wall_height - hole_area) * 2 * wall_half_thickness)
+    # No box reaches into the window holes
+    bounds = get_bounds(boxes)
+    for window in windows:
+        (start, bottom, _), (end, top, _) = window.hole_polygon
+        overlap_x = numpy.minimum(bounds[:, 1, 0], end) - numpy.maximum(bounds[:, 0, 0], start)
+        overlap_y = numpy.minimum(bounds[:, 1, 1], top) - numpy.maximum(bounds[:, 0, 1], bottom)
+        assert numpy.all((overlap_x <= 1e-9) | (overlap_y <= 1e-9))
+
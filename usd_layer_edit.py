@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+from typing import Any, List
+from pxr import Usd, Sdf
+
+
+# Edits written straight to the prim specs of a layer, so that many of them can be batched in one Sdf.ChangeBlock
+# and the stage recomposes once. They author the same opinions as the Usd API they replace.
+
+def get_applied_schema_name(schema_class: type) -> str:
+    # The name an API schema is applied with, read from the schema itself
+    stage = Usd.Stage.CreateInMemory()
+    prim = stage.DefinePrim("/Probe")
+    schema_class.Apply(prim)
+    return prim.GetAppliedSchemas()[-1]
+
+
+def create_prim_spec(layer: Sdf.Layer, prim_path: Sdf.Path, specifier: Sdf.Specifier = Sdf.SpecifierOver,
+                     ancestor_specifier: Sdf.Specifier = Sdf.SpecifierOver) -> Sdf.PrimSpec:
+    # Like Usd.Stage.OverridePrim (the defaults) or CreateClassPrim (class with def ancestors)
+    prim_spec = layer.GetPrimAtPath(prim_path)
+    if prim_spec is None:
+        prim_spec = Sdf.CreatePrimInLayer(layer, prim_path)
+        prim_spec.specifier = specifier
+    elif specifier != Sdf.SpecifierOver:
+        prim_spec.specifier = specifier
+    if ancestor_specifier != Sdf.SpecifierOver:
+        for ancestor_path in prim_path.GetParentPath().GetPrefixes():
+            ancestor_spec = layer.GetPrimAtPath(ancestor_path)
+            if ancestor_spec.specifier == Sdf.SpecifierOver:
+                ancestor_spec.specifier = ancestor_specifier
+    return prim_spec
+
+
+def apply_api_schema(prim_spec: Sdf.PrimSpec, schema_name: str) -> None:
+    # Like Usd.Prim.ApplyAPI, the schema is added to the explicit or else to the prepended apiSchemas
+    api_schemas = prim_spec.GetInfo("apiSchemas")
+    if api_schemas.isExplicit:
+        items = list(api_schemas.explicitItems)
+    else:
+        items = list(api_schemas.prependedItems)
+    if schema_name in items:
+        return
+    items.append(schema_name)
+    if api_schemas.isExplicit:
+        api_schemas.explicitItems = items
+    else:
+        api_schemas.prependedItems = items
+    prim_spec.SetInfo("apiSchemas", api_schemas)
+
+
+def add_relationship_target(prim_spec: Sdf.PrimSpec, relationship_name: str, target_path: Sdf.Path) -> None:
+    # Like Usd.Relationship.AddTarget after CreateRelationship
+    relationship_spec = prim_spec.relationships.get(relationship_name)
+    if relationship_spec is None:
+        relationship_spec = Sdf.RelationshipSpec(prim_spec, relationship_name, False)
+    target_path_list = relationship_spec.targetPathList
+    if target_path_list.isExplicit:
+        target_paths = target_path_list.explicitItems
+    else:
+        target_paths = target_path_list.prependedItems
+    # A target that is already there moves to the back
+    if target_path in target_paths:
+        target_paths.remove(target_path)
+    target_paths.append(target_path)
+
+
+def set_attribute(prim_spec: Sdf.PrimSpec, attribute_name: str, type_name: Sdf.ValueTypeName, value: Any,
+                  variability: Sdf.Variability = Sdf.VariabilityVarying) -> None:
+    # Like Usd.Attribute.Set after CreateAttribute, on the default time
+    attribute_spec = prim_spec.attributes.get(attribute_name)
+    if attribute_spec is None:
+        attribute_spec = Sdf.AttributeSpec(prim_spec, attribute_name, type_name, variability, False)
+    attribute_spec.default = value
+
+
+def get_class_parent_root_paths(layer: Sdf.Layer) -> List[Sdf.Path]:
+    # Like the root prims of GetPseudoRoot().GetChildren() that have an abstract child, on a flattened layer.
+    # The children of the pseudo root are only the active, defined and not abstract root prims, so the root class
+    # prims (e.g. _class_SOMA_namespace) are never in it
+    return [prim_spec.path for prim_spec in layer.rootPrims
+            if prim_spec.specifier == Sdf.SpecifierDef and prim_spec.active
+            and any([child_prim_spec.specifier == Sdf.SpecifierClass for child_prim_spec in prim_spec.nameChildren])]
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+from typing import Dict, List
+import numpy
+
+from house_model import Wall, Opening
+
+wall_half_thickness = 0.05
+
+# Corners of a box as signs of the half extents, in the vertex order of box_face_vertex_indices
+box_corner_signs = numpy.array([[-1, -1, -1], [-1, -1, 1], [-1, 1, -1], [-1, 1, 1],
+                                [1, -1, -1], [1, -1, 1], [1, 1, -1], [1, 1, 1]])
+
+box_normals = numpy.array([[-1, 0, 0], [-1, 0, 0], [-1, 0, 0],
+                           [0, 1, 0], [0, 1, 0], [0, 1, 0],
+                           [1, 0, 0], [1, 0, 0], [1, 0, 0],
+                           [0, -1, 0], [0, -1, 0], [0, -1, 0],
+                           [0, 0, -1], [0, 0, -1], [0, 0, -1],
+                           [0, 0, 1], [0, 0, 1], [0, 0, 1],
+                           [-1, 0, 0], [-1, 0, 0], [-1, 0, 0],
+                           [0, 1, 0], [0, 1, 0], [0, 1, 0],
+                           [1, 0, 0], [1, 0, 0], [1, 0, 0],
+                           [0, -1, 0], [0, -1, 0], [0, -1, 0],
+                           [0, 0, -1], [0, 0, -1], [0, 0, -1],
+                           [0, 0, 1], [0, 0, 1], [0, 0, 1]])
+
+box_face_vertex_counts = numpy.array([3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3])
+
+box_face_vertex_indices = numpy.array(
+    [[1, 2, 0], [3, 6, 2],
+     [7, 4, 6], [5, 0, 4],
+     [6, 0, 2], [3, 5, 7],
+     [1, 3, 2], [3, 7, 6],
+     [7, 5, 4], [5, 1, 0],
+     [6, 4, 0], [3, 1, 5]])
+
+
+def get_wall_points(walls: List[Wall]) -> numpy.ndarray:
+    return numpy.array([wall.polygon for wall in walls], dtype=float).reshape(-1, 4, 3)
+
+
+def get_wall_normals(points: numpy.ndarray) -> numpy.ndarray:
+    # Compute normal from faces
+    normal_1 = numpy.cross(points[:, 1] - points[:, 0], points[:, 2] - points[:, 0])
+    normal_2 = numpy.cross(points[:, 3] - points[:, 1], points[:, 2] - points[:, 1])
+    normals = (normal_1 + normal_2) / 2
+    normals /= numpy.linalg.norm(normals, axis=1, keepdims=True)
+    return normals
+
+
+def get_box_points(centers: numpy.ndarray, half_extents: numpy.ndarray) -> numpy.ndarray:
+    # (N, 3) centers and (N, 3) half extents -> (N, 8, 3) corners
+    return centers[:, None, :] + box_corner_signs[None, :, :] * half_extents[:, None, :]
+
+
+def subtract_intervals(start: float, end: float, intervals: numpy.ndarray) -> numpy.ndarray:
+    # Remove the union of (N, 2) intervals from [start, end], returns the remaining (M, 2) intervals in order
+    if len(intervals) == 0:
+        return numpy.array([[start, end]])
+    intervals = intervals[numpy.argsort(intervals[:, 0], kind="stable")]
+    ends = numpy.maximum.accumulate(intervals[:, 1])
+    is_group_start = numpy.r_[True, intervals[1:, 0] > ends[:-1]]
+    is_group_end = numpy.r_[is_group_start[1:], True]
+    free_starts = numpy.r_[start, ends[is_group_end]]
+    free_ends = numpy.r_[intervals[is_group_start, 0], end]
+    is_free = free_ends > free_starts
+    return numpy.stack([free_starts[is_free], free_ends[is_free]], axis=1)
+
+
+def cut_bands(s_start: float, s_end: float, y_start: float, y_end: float, holes: numpy.ndarray) -> numpy.ndarray:
+    # The rectangle [s_start, s_end] x [y_start, y_end] is cut into bands along y at the hole edges, every band keeps
+    # the intervals that no hole covers, and a box grows along y as long as the next band has its interval
+    heights = numpy.unique(numpy.r_[y_start, y_end, holes[:, 2:4].ravel()])
+    boxes = []
+    open_boxes = {}
+    for band_bottom, band_top in zip(heights[:-1], heights[1:]):
+        is_covering = (holes[:, 2] <= band_bottom) & (holes[:, 3] >= band_top)
+        free = subtract_intervals(s_start, s_end, holes[is_covering, 0:2])
+        band_boxes = {}
+        for s_min, s_max in free:
+            box = open_boxes.get((s_min, s_max))
+            if box is None:
+                box = [s_min, s_max, band_bottom, band_top]
+                boxes.append(box)
+            box[3] = band_top
+            band_boxes[(s_min, s_max)] = box
+        open_boxes = band_boxes
+    return numpy.array(boxes, dtype=float).reshape(-1, 4)
+
+
+def cut_holes(length: float, bottom: float, top: float, holes: numpy.ndarray) -> numpy.ndarray:
+    # Split the wall rectangle [0, length] x [bottom, top] minus the (N, 4) holes (s_min, s_max, y_min, y_max)
+    # into (K, 4) boxes of the same form. This is a greedy split, not the smallest partition: the wall is cut into
+    # horizontal and into vertical bands (see cut_bands) and the split with fewer boxes is taken, horizontal on a tie
+    holes = numpy.asarray(holes, dtype=float).reshape(-1, 4).copy()
+    holes[:, 0:2] = numpy.clip(holes[:, 0:2], 0.0, length)
+    holes[:, 2:4] = numpy.clip(holes[:, 2:4], bottom, top)
+    holes = holes[(holes[:, 1] > holes[:, 0]) & (holes[:, 3] > holes[:, 2])]
+
+    horizontal_boxes = cut_bands(0.0, length, bottom, top, holes)
+    vertical_boxes = cut_bands(bottom, top, 0.0, length, holes[:, [2, 3, 0, 1]])[:, [2, 3, 0, 1]]
+    return vertical_boxes if len(vertical_boxes) < len(horizontal_boxes) else horizontal_boxes
+
+
+def get_hole(opening: Opening, is_door: bool, bottom: float) -> List[float]:
+    hole_polygon = opening.hole_polygon
+    # Doors always start at the floor, as in the single door layout
+    hole_bottom = bottom if is_door else hole_polygon[0][1]
+    return [hole_polygon[0][0], hole_polygon[1][0], hole_bottom, hole_polygon[1][1]]
+
+
+def get_wall_boxes(walls: List[Wall],
+                   walls_with_door: Dict[str, List[Opening]],
+                   walls_with_window: Dict[str, List[Opening]]) -> List[numpy.ndarray]:
+    # Returns the (K, 8, 3) box corners of every wall in the ProcTHOR frame: one box for a wall without holes,
+    # the three boxes around the door for a wall with a single door, and the greedy split of cut_holes otherwise
+    if len(walls) == 0:
+        return []
+
+    points = get_wall_points(walls)
+    normals = get_wall_normals(points)
+    along_z = normals[:, 0] != 0
+    along_x = ~along_z & (normals[:, 2] != 0)
+    if not numpy.all(along_z | along_x):
+        raise ValueError("Invalid normal")
+
+    p_1, p_2, p_3 = points[:, 0], points[:, 1], points[:, 2]
+    wall_boxes: List[numpy.ndarray] = [None] * len(walls)
+
+    # Walls without holes
+    is_solid = numpy.array([wall.id not in walls_with_door and wall.id not in walls_with_window for wall in walls])
+    centers = numpy.where(along_z[:, None],
+                          numpy.stack([p_1[:, 0], (p_1[:, 1] + p_3[:, 1]) / 2.0, (p_1[:, 2] + p_2[:, 2]) / 2.0], axis=1),
+                          numpy.stack([(p_2[:, 0] + p_3[:, 0]) / 2.0, (p_1[:, 1] + p_3[:, 1]) / 2.0, p_1[:, 2]], axis=1))
+    half_extents = numpy.where(along_z[:, None],
+                               numpy.stack([-wall_half_thickness * normals[:, 0],
+                                            (p_3[:, 1] - p_1[:, 1]) / 2.0,
+                                            (p_2[:, 2] - p_1[:, 2]) / 2.0], axis=1),
+                               numpy.stack([(p_3[:, 0] - p_2[:, 0]) / 2.0,
+                                            (p_3[:, 1] - p_1[:, 1]) / 2.0,
+                                            -wall_half_thickness * normals[:, 2]], axis=1))
+    solid_box_points = get_box_points(centers[is_solid], half_extents[is_solid])
+    for wall_idx, box_points in zip(numpy.flatnonzero(is_solid), solid_box_points):
+        wall_boxes[wall_idx] = box_points[None]
+
+    # Walls with a single door: a box on each side of the door and one above it
+    is_single_door = numpy.array([len(walls_with_door.get(wall.id, [])) == 1 and wall.id not in walls_with_window
+                                  for wall in walls])
+    if numpy.any(is_single_door):
+        doors = [walls_with_door[wall.id][0] for wall, single_door in zip(walls, is_single_door) if single_door]
+        hole_polygons = numpy.array([door.hole_polygon[:2] for door in doors], dtype=float)
+        hole_starts = hole_polygons[:, 0, 0]
+        hole_ends = hole_polygons[:, 1, 0]
+        hole_heights = hole_polygons[:, 1, 1]
+        d_p_1, d_p_2, d_p_3 = p_1[is_single_door], p_2[is_single_door], p_3[is_single_door]
+        d_normals = normals[is_single_door]
+        d_along_z = along_z[is_single_door][:, None]
+        n = len(doors)
+
+        y_min = numpy.where(d_p_1[:, 1] < d_p_3[:, 1], d_p_1[:, 1], d_p_3[:, 1])
+        y_max = numpy.where(d_p_1[:, 1] < d_p_3[:, 1], d_p_3[:, 1], d_p_1[:, 1])
+        y = numpy.stack([(y_min + hole_heights) / 2.0, (hole_heights + y_max) / 2.0, (y_min + hole_heights) / 2.0],
+                        axis=1)
+        dy = numpy.stack([(hole_heights - y_min) / 2.0, (y_max - hole_heights) / 2.0, (hole_heights - y_min) / 2.0],
+                         axis=1)
+
+        # Along the wall, a is z for walls along z and x for walls along x
+        a_1 = numpy.where(d_along_z[:, 0], d_p_1[:, 2], d_p_3[:, 0])
+        a_2 = numpy.where(d_along_z[:, 0], d_p_2[:, 2], d_p_2[:, 0])
+        normal_a = numpy.where(d_along_z[:, 0], d_normals[:, 0], d_normals[:, 2])
+        a_center = numpy.where(d_along_z[:, 0], (d_p_1[:, 2] + d_p_2[:, 2]) / 2.0, (d_p_2[:, 0] + d_p_3[:, 0]) / 2.0)
+        a_half = numpy.where(d_along_z[:, 0], (d_p_1[:, 2] - d_p_2[:, 2]) * normal_a / 2.0,
+                             (d_p_2[:, 0] - d_p_3[:, 0]) * normal_a / 2.0)
+        da_0 = hole_starts / 2.0
+        a_min = numpy.minimum(a_1, a_2)
+        a_max = numpy.maximum(a_1, a_2)
+        da_2 = (a_max - a_min - hole_ends) / 2.0
+        a = numpy.stack([a_min + da_0, a_center, a_max - da_2], axis=1)
+        da = numpy.stack([da_0, a_half, da_2], axis=1)
+
+        # Across the wall
+        t = numpy.where(d_along_z[:, 0], d_p_1[:, 0], d_p_1[:, 2])[:, None].repeat(3, axis=1)
+        dt = numpy.full((n, 3), wall_half_thickness)
+
+        door_centers = numpy.where(d_along_z[:, :, None],
+                                   numpy.stack([t, y, a], axis=2),
+                                   numpy.stack([a, y, t], axis=2))
+        door_half_extents = numpy.where(d_along_z[:, :, None],
+                                        numpy.stack([dt, dy, da], axis=2),
+                                        numpy.stack([da, dy, dt], axis=2))
+        door_box_points = get_box_points(door_centers.reshape(-1, 3), door_half_extents.reshape(-1, 3))
+        for wall_idx, box_points in zip(numpy.flatnonzero(is_single_door), door_box_points.reshape(n, 3, 8, 3)):
+            wall_boxes[wall_idx] = box_points
+
+    # Walls with several doors or windows
+    for wall_idx in numpy.flatnonzero(~is_solid & ~is_single_door):
+        wall = walls[wall_idx]
+        wall_points = points[wall_idx]
+        axis = 2 if along_z[wall_idx] else 0
+        a_min = min(wall_points[0][axis], wall_points[1][axis])
+        a_max = max(wall_points[0][axis], wall_points[1][axis])
+        bottom = min(wall_points[0][1], wall_points[2][1])
+        top = max(wall_points[0][1], wall_points[2][1])
+        holes = [get_hole(door, True, bottom) for door in walls_with_door.get(wall.id, [])]
+        holes += [get_hole(window, False, bottom) for window in walls_with_window.get(wall.id, [])]
+        boxes = cut_holes(a_max - a_min, bottom, top, numpy.array(holes))
+
+        k = len(boxes)
+        a = a_min + (boxes[:, 0] + boxes[:, 1]) / 2.0
+        da = (boxes[:, 1] - boxes[:, 0]) / 2.0
+        y = (boxes[:, 2] + boxes[:, 3]) / 2.0
+        dy = (boxes[:, 3] - boxes[:, 2]) / 2.0
+        t = numpy.full(k, wall_points[0][0] if along_z[wall_idx] else wall_points[0][2])
+        dt = numpy.full(k, wall_half_thickness)
+        if along_z[wall_idx]:
+            hole_centers = numpy.stack([t, y, a], axis=1)
+            hole_half_extents = numpy.stack([dt, dy, da], axis=1)
+        else:
+            hole_centers = numpy.stack([a, y, t], axis=1)
+            hole_half_extents = numpy.stack([da, dy, dt], axis=1)
+        wall_boxes[wall_idx] = get_box_points(hole_centers, hole_half_extents)
+
+    return wall_boxes